@@ -1,18 +1,28 @@
-import math
 from dataclasses import asdict
 from logging import getLogger
 
 import dash
 import dash_bootstrap_components as dbc
+import numpy as np
 import pandas as pd
-from dash import dcc, Output, Input, dash_table, html, State
+import plotly.io as pio
+from dash import dcc, Output, Input, dash_table, html, State, ClientsideFunction
 
-from mydash.figures import do_scatter_plot_play_time, do_bar_plot_player_count, do_histogram_play_time, HistogramConfig
+from mydash.figures import do_scatter_plot_play_time, do_histogram_play_time, HistogramConfig, \
+    get_bar_plot_template, BAR_COLOR_COLUMNS, get_histogram_minutes_range, do_bar_plot_player_count, get_player_counts
+from mydash.figures.cache import FigureCache
+from mydash.figures.compact import FIGURE_PRECISION
 from mydash.ui import wrap_with_card, STYLE_CELL, STYLE_HEADER, STYLE_DROPBOX, STYLE_SLIDER, STYLE_CONTAINER, \
     STYLE_RADIO_LABEL, STYLE_RADIO_INPUT, META_TAGS
 from mydash.utils.categorize import TeamCategory
 from mydash.utils.constants import FIRST_YEAR, LAST_YEAR
-from mydash.utils.df import filter_rookie_df, get_avg_stats_df, load_rookie_df, load_stats_df, filter_stats_df
+from mydash.utils.cube import StatsCube, load_stats_cube
+from mydash.utils.df import filter_rookie_df, get_avg_stats_df, load_rookie_df, load_stats_df, filter_stats_df, \
+    get_data_version, get_table_page
+from mydash.utils.index import RookieIndex, TeamNameIndex
+from mydash.utils.metrics import instrument_app, phase
+from mydash.utils.profiling import install_profiler
+from mydash.utils.store import FilterResultStore, normalize_filters, ROOKIE_FILTER_TYPES
 
 LOGGER = getLogger(__name__)
 
@@ -23,12 +33,40 @@ app = dash.Dash(
     meta_tags=META_TAGS,
 )
 server = app.server
+instrument_app(app)
+install_profiler(server)
 
 rookie_df = load_rookie_df()
 stats_df = load_stats_df(rookie_df)
+data_version = get_data_version()
+rookie_index = RookieIndex(rookie_df)
+joined_team_index = TeamNameIndex(rookie_df['joined_team_name'])
+prev_team_index = TeamNameIndex(rookie_df['prev_team_name'])
+stats_cube = load_stats_cube(rookie_df, stats_df, data_version=data_version)
 
-joined_team_options = [{'label': x, 'value': x} for x in rookie_df['joined_team_name'].unique()]
-prev_team_options = [{'label': x, 'value': x} for x in rookie_df['prev_team_name'].unique()]
+
+def resolve_rookie_rows(filters):
+    with phase('filter'):
+        rows = rookie_index.filter_rows(joined_teams=filters.get('joined_teams'),
+                                        prev_teams=filters.get('prev_teams'),
+                                        joined_league_ids=filters.get('joined_league_ids'),
+                                        prev_categories=filters.get('prev_categories'),
+                                        positions=filters.get('positions'),
+                                        joined_year_range=filters.get('joined_year_range'))
+        if 'histogram' in filters:
+            histogram = filters['histogram']
+            f_stats_df = filter_stats_df(stats_df,
+                                         rookie_year_range=[histogram['rookie_year'], histogram['rookie_year']],
+                                         league_id=histogram['league_id'],
+                                         minutes_range=histogram['minutes_range'])
+            rows = rows[np.isin(rookie_df['player_id'].values[rows], f_stats_df['player_id'].values)]
+        return rows
+
+
+rookie_store = FilterResultStore(resolve_rookie_rows, name='rookie', filter_types=ROOKIE_FILTER_TYPES)
+figure_cache = FigureCache(name='figure', precision=FIGURE_PRECISION)
+
+team_option_limit = 20
 league_options = [{'label': f'J{x}', 'value': x} for x in [1, 2, 3]]
 category_options = [{'label': x.value, 'value': x.name} for x in TeamCategory]
 position_options = [{'label': x, 'value': x} for x in ['GK', 'DF', 'MF', 'FW']]
@@ -43,12 +81,140 @@ table_columns = {
     'position': 'Position',
 }
 table_columns = [{'id': col, 'name': label} for col, label in table_columns.items()]
+table_page_size = 5
+default_joined_year_range = [FIRST_YEAR, LAST_YEAR]
+
+table_record_columns = ['player_id'] + [x['id'] for x in table_columns]
+
+# payload for clientside callbacks, which is embedded in the layout once
+player_count_templates = {
+    'template': pio.templates[pio.templates.default].to_plotly_json(),
+    'columns': {x: get_bar_plot_template(x) for x in BAR_COLOR_COLUMNS}
+}
+
+
+def get_team_options(index, search_value=None, values=None):
+    """
+    options of a team dropdown, i.e. the selected values and the teams matching `search_value` in the index.
+    Matched options carry `search_value` as their search text (`search` of options requires dash>=2.5), so that the
+    dropdown does not hide teams which are matched by aliases or normalized names.
+    """
+
+    values = values or []
+    options = [{'label': x, 'value': x} for x in values]
+    for name in index.search(search_value, limit=team_option_limit):
+        if name not in values:
+            options.append({'label': name, 'value': name, 'search': search_value} if search_value else
+                           {'label': name, 'value': name})
+    return options
+
+
+def get_rookie_handle(filters):
+    handle = rookie_store.put(filters)
+    f_rookie_df = rookie_df.iloc[rookie_store.resolve(handle)]
+    # for clientside callbacks, which receive the counts instead of the rows
+    handle['count'] = len(f_rookie_df)
+    handle['counts'] = get_player_counts(f_rookie_df)
+    return handle
+
+
+def get_play_time_plot(filtered_rookie_handle, player_ids):
+    key = (data_version, rookie_store.get_key(filtered_rookie_handle), 'play-time', tuple(player_ids))
+    return figure_cache.get_or_build(key, lambda: build_play_time_plot(filtered_rookie_handle, player_ids))
+
+
+def build_play_time_plot(filtered_rookie_handle, player_ids):
+    # calculate AVG stats, using the pre-aggregated cube unless filtered by teams or histogram
+    filters = filtered_rookie_handle['filters']
+    f_rookie_df = rookie_df.iloc[rookie_store.resolve(filtered_rookie_handle)]
+    if 'histogram' not in filters and StatsCube.supports(**filters):
+        with phase('aggregate'):
+            avg_stats_df = stats_cube.get_avg_stats_df(**filters)
+    else:
+        with phase('filter'):
+            f_stats_df = filter_stats_df(stats_df, player_ids=f_rookie_df['player_id'].values)
+        with phase('aggregate'):
+            avg_stats_df = get_avg_stats_df(f_rookie_df, f_stats_df)
+
+    # build data frames for AVG player
+    player_name = 'Avg.'
+    d_rookie_df = pd.DataFrame([{'player_id': 0, 'player_name': player_name, 'player_label': player_name}])
+    d_stats_df = avg_stats_df
+    d_stats_df['player_id'] = 0
+    d_stats_df['player_name'] = player_name
+    d_stats_df['stats_label'] = player_name
+    d_stats_df['league'] = d_stats_df['league_id'].map(lambda x: f'J{x}')
+
+    # build data frames for table records
+    with phase('filter'):
+        t_rookie_df = filter_rookie_df(f_rookie_df, player_ids=player_ids)
+        t_stats_df = filter_stats_df(stats_df, player_ids=t_rookie_df['player_id'].values)
+
+    # concat data frames for plotting
+    p_rookie_df = d_rookie_df.append(t_rookie_df)
+    p_stats_df = d_stats_df.append(t_stats_df)
+
+    with phase('figure'):
+        fig = do_scatter_plot_play_time(
+            p_rookie_df,
+            p_stats_df,
+            hover_name='stats_label',
+            hover_data={'minutes': ':.1f', 'apps': ':.1f', 'goals': ':.1f',
+                        'rookie_year': False, 'y': False, 'league': False}
+        )
+    return fig
+
+
+def get_play_time_histogram(filtered_rookie_handle, config):
+    def build():
+        f_rookie_df = rookie_df.iloc[rookie_store.resolve(filtered_rookie_handle)]
+        with phase('filter'):
+            f_stats_df = filter_stats_df(stats_df, player_ids=f_rookie_df['player_id'].values,
+                                         rookie_year_range=[config.rookie_year, config.rookie_year],
+                                         league_id=config.league_id)
+        with phase('figure'):
+            return do_histogram_play_time(f_stats_df, config)
+
+    key = (data_version, rookie_store.get_key(filtered_rookie_handle), 'play-time-histogram',
+           config.rookie_year, config.league_id)
+    return figure_cache.get_or_build(key, build)
+
+
+def build_initial_state():
+    """
+    outputs of the callbacks for the default filters, which are embedded in the layout so that the first page load
+    fires no callbacks. Figures are built via `figure_cache` with the same keys as the callbacks, i.e. once per
+    data version.
+
+    :return: component ID -> props
+    """
+
+    handle = get_rookie_handle(normalize_filters(joined_year_range=default_joined_year_range))
+    table_records, page_count = get_table_page(rookie_df, rookie_store.resolve(handle), 0, table_page_size,
+                                               table_record_columns)
+    color_column = count_plot_options[0]['value']
+    f_rookie_df = rookie_df.iloc[rookie_store.resolve(handle)]
+    key = (data_version, rookie_store.get_key(handle), 'player-count', color_column)
+    player_count_plot = figure_cache.get_or_build(key, lambda: do_bar_plot_player_count(f_rookie_df, color_column))
+    histogram_config = HistogramConfig()
+    return {
+        'filtered-rookie-handle': {'data': handle},
+        'player-table': {'data': table_records, 'page_count': page_count},
+        'play-time-plot': {'figure': get_play_time_plot(handle, [x['player_id'] for x in table_records])},
+        'player-count-plot': {'figure': player_count_plot},
+        'play-time-histogram': {'figure': get_play_time_histogram(handle, histogram_config)},
+        'histogram-config-json': {'data': asdict(histogram_config)},
+    }
+
+
+initial_state = build_initial_state()
+
 
 selector_container = dbc.Row(
     children=[
-        dcc.Dropdown(id='joined-team-dropdown', placeholder='加入チーム', options=joined_team_options,
+        dcc.Dropdown(id='joined-team-dropdown', placeholder='加入チーム', options=get_team_options(joined_team_index),
                      multi=True, style=STYLE_DROPBOX),
-        dcc.Dropdown(id='prev-team-dropdown', placeholder='前所属チーム', options=prev_team_options,
+        dcc.Dropdown(id='prev-team-dropdown', placeholder='前所属チーム', options=get_team_options(prev_team_index),
                      multi=True, style=STYLE_DROPBOX),
         dcc.Dropdown(id='joined-league-dropdown', placeholder='加入リーグ', options=league_options,
                      multi=True, style=STYLE_DROPBOX),
@@ -58,7 +224,7 @@ selector_container = dbc.Row(
                      multi=True, style=STYLE_DROPBOX),
         html.Div(
             dcc.RangeSlider(
-                id='joined-year-range-slider', min=FIRST_YEAR, max=LAST_YEAR, value=[FIRST_YEAR, LAST_YEAR],
+                id='joined-year-range-slider', min=FIRST_YEAR, max=LAST_YEAR, value=default_joined_year_range,
                 marks={i: str(i) for i in range(FIRST_YEAR, LAST_YEAR + 1)}
             ),
             style=STYLE_SLIDER
@@ -72,16 +238,18 @@ player_container = html.Div([
         id='player-table',
         columns=table_columns,
         page_current=0,
-        page_size=5,
+        page_size=table_page_size,
         page_action='custom',
         style_cell=STYLE_CELL,
-        style_header=STYLE_HEADER
+        style_header=STYLE_HEADER,
+        **initial_state['player-table']
     )),
     wrap_with_card([
         html.Div('出場時間の新卒年次推移。バブルの面積は出場時間に比例します。'),
         dcc.Graph(
             id='play-time-plot',
-            clickData=None
+            clickData=None,
+            **initial_state['play-time-plot']
         )
     ]),
 ])
@@ -93,14 +261,16 @@ summary_container = html.Div([
                        value=count_plot_options[0]['value'],
                        labelStyle=STYLE_RADIO_LABEL, inputStyle=STYLE_RADIO_INPUT),
         dcc.Graph(
-            id='player-count-plot'
+            id='player-count-plot',
+            **initial_state['player-count-plot']
         ),
     ]),
     wrap_with_card([
         html.Div('出場時間のヒストグラム。左のバブルプロットをクリックすると、対応するリーグと新卒年度に切り替わります。'
                  'また図右上のBox Select機能を使えば出場時間から選手を絞り込むことができます。'),
         dcc.Graph(
-            id='play-time-histogram'
+            id='play-time-histogram',
+            **initial_state['play-time-histogram']
         )
     ])
 ])
@@ -125,15 +295,36 @@ app.layout = dbc.Container(
             html.Div(summary_container, className='col-lg-6')
         ]),
         html.Div(about_container),
-        dcc.Store(id='filtered-rookie-json'),
-        dcc.Store(id='histogram-config-json')
+        dcc.Store(id='filtered-rookie-handle', **initial_state['filtered-rookie-handle']),
+        dcc.Store(id='player-count-templates', data=player_count_templates),
+        dcc.Store(id='histogram-config-json', **initial_state['histogram-config-json'])
     ],
     fluid=True
 )
 
 
 @app.callback(
-    Output('filtered-rookie-json', 'data'),
+    Output('joined-team-dropdown', 'options'),
+    Input('joined-team-dropdown', 'search_value'),
+    State('joined-team-dropdown', 'value'),
+    prevent_initial_call=True
+)
+def update_joined_team_options(search_value, joined_teams):
+    return get_team_options(joined_team_index, search_value, joined_teams)
+
+
+@app.callback(
+    Output('prev-team-dropdown', 'options'),
+    Input('prev-team-dropdown', 'search_value'),
+    State('prev-team-dropdown', 'value'),
+    prevent_initial_call=True
+)
+def update_prev_team_options(search_value, prev_teams):
+    return get_team_options(prev_team_index, search_value, prev_teams)
+
+
+@app.callback(
+    Output('filtered-rookie-handle', 'data'),
     Input('joined-team-dropdown', 'value'),
     Input('prev-team-dropdown', 'value'),
     Input('joined-league-dropdown', 'value'),
@@ -141,113 +332,72 @@ app.layout = dbc.Container(
     Input('position-dropdown', 'value'),
     Input('joined-year-range-slider', 'value'),
     Input('play-time-histogram', 'selectedData'),
-    State('histogram-config-json', 'data')
+    State('histogram-config-json', 'data'),
+    prevent_initial_call=True  # the outputs for the default filters are embedded in the layout
 )
-def update_filtered_rookie_json(joined_teams, prev_teams, joined_league_ids, prev_categories, positions,
-                                joined_year_range, histogram_selected_data, histogram_config_json):
-    f_rookie_df = filter_rookie_df(rookie_df, joined_teams=joined_teams, prev_teams=prev_teams,
-                                   joined_league_ids=joined_league_ids,
-                                   prev_categories=prev_categories, positions=positions,
-                                   joined_year_range=joined_year_range)
-
+def update_filtered_rookie_handle(joined_teams, prev_teams, joined_league_ids, prev_categories, positions,
+                                  joined_year_range, histogram_selected_data, histogram_config_json):
+    histogram = None
     is_histogram_selected = any([x['prop_id'] == 'play-time-histogram.selectedData'
                                  for x in dash.callback_context.triggered])
     if is_histogram_selected and 'range' in histogram_selected_data:
         histogram_config = HistogramConfig(**histogram_config_json)
-        f_stats_df = filter_stats_df(stats_df,
-                                     rookie_year_range=[histogram_config.rookie_year, histogram_config.rookie_year],
-                                     league_id=histogram_config.league_id,
-                                     minutes_range=histogram_selected_data['range']['x'])
-        f_rookie_df = pd.merge(f_rookie_df, f_stats_df[['player_name']], on='player_name')
-    return f_rookie_df.to_json(orient='split')
+        histogram = dict(rookie_year=histogram_config.rookie_year, league_id=histogram_config.league_id,
+                         minutes_range=get_histogram_minutes_range(histogram_selected_data['range']['x']))
+
+    filters = normalize_filters(joined_teams=joined_teams, prev_teams=prev_teams,
+                                joined_league_ids=joined_league_ids, prev_categories=prev_categories,
+                                positions=positions, joined_year_range=joined_year_range, histogram=histogram)
+    return get_rookie_handle(filters)
 
 
 @app.callback(
     Output('player-table', 'data'),
     Output('player-table', 'page_count'),
-    Input('filtered-rookie-json', 'data'),
+    Input('filtered-rookie-handle', 'data'),
     Input('player-table', 'page_current'),
     Input('player-table', 'page_size'),
     prevent_initial_call=True
 )
-def update_player_table(filtered_rookie_json, page_current, page_size):
-    f_rookie_df = pd.read_json(filtered_rookie_json, orient='split')
-    records = f_rookie_df.iloc[page_current * page_size:(page_current + 1) * page_size].to_dict('records')
-    page_count = math.ceil(len(f_rookie_df) / page_size)
-    return [records, page_count]
+def update_player_table(filtered_rookie_handle, page_current, page_size):
+    rows = rookie_store.resolve(filtered_rookie_handle)
+    return get_table_page(rookie_df, rows, page_current, page_size, table_record_columns)
 
 
 @app.callback(
     Output('play-time-plot', 'figure'),
-    Input('filtered-rookie-json', 'data'),
+    Input('filtered-rookie-handle', 'data'),
     Input('player-table', 'data'),
     prevent_initial_call=True
 )
-def update_play_time_plot(filtered_rookie_json, table_records):
-    # calculate AVG stats
-    f_rookie_df = pd.read_json(filtered_rookie_json, orient='split')
-    f_stats_df = pd.merge(stats_df, f_rookie_df['player_name'], on='player_name')
-    avg_stats_df = get_avg_stats_df(f_rookie_df, f_stats_df)
+def update_play_time_plot(filtered_rookie_handle, table_records):
+    return get_play_time_plot(filtered_rookie_handle, [record['player_id'] for record in table_records])
 
-    # build data frames for AVG player
-    player_name = 'Avg.'
-    d_rookie_df = pd.DataFrame([{'player_name': player_name, 'player_label': player_name}])
-    d_stats_df = avg_stats_df
-    d_stats_df['player_name'] = player_name
-    d_stats_df['stats_label'] = player_name
-    d_stats_df['league'] = d_stats_df['league_id'].map(lambda x: f'J{x}')
-
-    # build data frames for table records
-    player_names = [record['player_name'] for record in table_records]
-    t_rookie_df = filter_rookie_df(f_rookie_df, player_names=player_names)
-    t_stats_df = pd.merge(stats_df, t_rookie_df['player_name'], on='player_name')
-
-    # concat data frames for plotting
-    p_rookie_df = d_rookie_df.append(t_rookie_df)
-    p_stats_df = d_stats_df.append(t_stats_df)
-
-    fig = do_scatter_plot_play_time(
-        p_rookie_df,
-        p_stats_df,
-        hover_name='stats_label',
-        hover_data={'minutes': ':.1f', 'apps': ':.1f', 'goals': ':.1f',
-                    'rookie_year': False, 'y': False, 'league': False}
-    )
-    return fig
 
-
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='mydash', function_name='updatePlayerCountPlot'),
     Output('player-count-plot', 'figure'),
-    Input('filtered-rookie-json', 'data'),
+    Input('filtered-rookie-handle', 'data'),
     Input('player-count-plot-radio', 'value'),
+    State('player-count-templates', 'data'),
     prevent_initial_call=True
 )
-def update_player_count_plot(filtered_rookie_json, color_column):
-    f_rookie_df = pd.read_json(filtered_rookie_json, orient='split')
-    fig = do_bar_plot_player_count(f_rookie_df, color_column=color_column)
-    return fig
 
 
 @app.callback(
     Output('play-time-histogram', 'figure'),
     Output('histogram-config-json', 'data'),
-    Input('filtered-rookie-json', 'data'),
+    Input('filtered-rookie-handle', 'data'),
     Input('play-time-plot', 'clickData'),
     prevent_initial_call=True
 )
-def update_play_time_histogram(filtered_rookie_json, clickData):
+def update_play_time_histogram(filtered_rookie_handle, clickData):
     config = HistogramConfig()
     if clickData:
         point = clickData['points'][0]
         config.rookie_year = point['x']
         config.league_id = point['y'] % 4
-
-    f_rookie_df = pd.read_json(filtered_rookie_json, orient='split')
-    f_stats_df = filter_stats_df(stats_df, player_names=set(f_rookie_df['player_name']),
-                                 rookie_year_range=[config.rookie_year, config.rookie_year],
-                                 league_id=config.league_id)
-    fig = do_histogram_play_time(f_stats_df, config)
-    return fig, asdict(config)
+    return get_play_time_histogram(filtered_rookie_handle, config), asdict(config)
 
 
 if __name__ == '__main__':
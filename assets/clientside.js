@@ -0,0 +1,78 @@
+/*
+ * Clientside callbacks of app.py, which run without server round trips.
+ *
+ * `handle` is the filtered rookie handle with `count` (number of rookies) and `counts` (number of rookies for each
+ * joined year and value of the color columns) built by `mydash.figures.get_player_counts`.
+ */
+(function () {
+    // same figure as `mydash.figures.do_bar_plot_player_count`, filled into `get_bar_plot_template`
+    function updatePlayerCountPlot(handle, colorColumn, templates) {
+        const spec = templates.columns[colorColumn];
+
+        // [year, #players] for each value, and the first year of the value
+        const counts = {};
+        const firstYears = {};
+        handle.counts[colorColumn].forEach(function (item) {
+            const year = item[0], value = item[1], count = item[2];
+            if (count === 0) {
+                return;
+            }
+            if (!(value in counts)) {
+                counts[value] = [];
+                firstYears[value] = year;
+            }
+            counts[value].push([year, count]);
+            firstYears[value] = Math.min(firstYears[value], year);
+        });
+
+        // same order as plotly.express, i.e. category orders first, and then the others in order of appearance
+        const others = Object.keys(firstYears).filter(function (value) {
+            return spec.orders.indexOf(value) < 0;
+        }).sort(function (a, b) {
+            return firstYears[a] - firstYears[b] || (a < b ? -1 : (a > b ? 1 : 0));
+        });
+
+        const data = [];
+        spec.orders.concat(others).forEach(function (value, i) {
+            if (!(value in firstYears)) {
+                return;
+            }
+            const items = counts[value].slice().sort(function (a, b) {
+                return a[0] - b[0];
+            });
+            data.push(Object.assign({}, spec.trace, {
+                hovertemplate: spec.trace.hovertemplate.replace('{value}', value),
+                legendgroup: value,
+                marker: Object.assign({}, spec.trace.marker, {color: spec.colors[i % spec.colors.length]}),
+                name: value,
+                offsetgroup: value,
+                x: items.map(function (item) {
+                    return item[0];
+                }),
+                y: items.map(function (item) {
+                    return item[1];
+                })
+            }));
+        });
+
+        const layout = Object.assign({}, spec.layout, {
+            template: templates.template,
+            title: {text: '#players=' + handle.count, x: 0.5}
+        });
+        if (data.length === 0) {
+            // plotly.express does not set the legend title without traces
+            layout.legend = {tracegroupgap: 0};
+        }
+        return {data: data, layout: layout};
+    }
+
+    const functions = {
+        updatePlayerCountPlot: updatePlayerCountPlot
+    };
+    if (typeof window !== 'undefined') {
+        window.dash_clientside = Object.assign({}, window.dash_clientside, {mydash: functions});
+    }
+    if (typeof module !== 'undefined') {
+        module.exports = functions;
+    }
+})();
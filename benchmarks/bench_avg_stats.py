@@ -0,0 +1,80 @@
+import argparse
+from logging import getLogger
+
+import pandas as pd
+
+from benchmarks.common import measure, format_seconds
+from mydash.utils.cube import StatsCube
+from mydash.utils.df import load_rookie_df, load_stats_df, filter_rookie_df, get_avg_stats_df, assert_columns
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+FILTERS = {
+    'none': dict(),
+    'league': dict(joined_league_ids=[1]),
+    'position+year': dict(positions=['DF', 'MF'], joined_year_range=[2017, 2020]),
+}
+
+
+def get_avg_stats_df_legacy(rookie_df, stats_df, stats_cols=None):
+    """
+    `get_avg_stats_df` before the integer-coded rewrite, kept as the reference implementation
+    """
+
+    if stats_cols is None:
+        stats_cols = ['minutes', 'apps', 'goals']
+    assert_columns(rookie_df, ['cur_rookie_year'])
+    assert_columns(stats_df, ['rookie_year', 'league_id'] + stats_cols)
+
+    agg_rookie_df = rookie_df.groupby('cur_rookie_year').size().reset_index() \
+        .rename(columns={'cur_rookie_year': 'rookie_year', 0: 'player_count'})
+    count_df = pd.DataFrame({'rookie_year': range(1, 8)})  # max 7 as of 2021
+    count_df = pd.merge(count_df, agg_rookie_df, on='rookie_year', how='left').fillna(0).astype(int)
+    count_df['player_count'] = count_df['player_count'][::-1].cumsum()[::-1]
+    count_df = count_df[count_df['player_count'] > 0]
+
+    agg_stats_df = stats_df.groupby(['rookie_year', 'league_id'])[stats_cols].sum() \
+        .reset_index()
+    agg_stats_df = pd.merge(agg_stats_df, count_df, on='rookie_year')
+    for col in stats_cols:
+        agg_stats_df[col] = agg_stats_df[col] / agg_stats_df['player_count']
+    return agg_stats_df
+
+
+def main():
+    rookie_df = load_rookie_df()
+    stats_df = load_stats_df(rookie_df)
+    cube = StatsCube.build(rookie_df, stats_df)
+    # scaled players are distinguished by their IDs
+    id_offset = int(rookie_df['player_id'].max()) + 1
+    s_rookie_df = pd.concat([rookie_df.assign(player_id=rookie_df['player_id'] + i * id_offset)
+                             for i in range(args.scale)], ignore_index=True)
+    s_stats_df = pd.concat([stats_df.assign(player_id=stats_df['player_id'] + i * id_offset)
+                            for i in range(args.scale)], ignore_index=True)
+    LOGGER.info(f'#rookies={len(s_rookie_df)}, #stats={len(s_stats_df)}')
+
+    for name, kwargs in FILTERS.items():
+        f_rookie_df = filter_rookie_df(s_rookie_df, **kwargs)
+        f_stats_df = pd.merge(s_stats_df, f_rookie_df['player_id'], on='player_id')
+        expected = get_avg_stats_df_legacy(f_rookie_df, f_stats_df)
+        pd.testing.assert_frame_equal(get_avg_stats_df(f_rookie_df, f_stats_df), expected)
+        # avg stats do not change by scaling
+        pd.testing.assert_frame_equal(cube.get_avg_stats_df(**kwargs)[expected.columns].drop(columns='player_count'),
+                                      expected.drop(columns='player_count'))
+
+        t_legacy = measure(lambda: get_avg_stats_df_legacy(f_rookie_df, f_stats_df), args.repeat)
+        t_new = measure(lambda: get_avg_stats_df(f_rookie_df, f_stats_df), args.repeat)
+        t_cube = measure(lambda: cube.get_avg_stats_df(**kwargs), args.repeat)
+        LOGGER.info(f'{name:>14}: legacy={format_seconds(t_legacy)}, integer-coded={format_seconds(t_new)} '
+                    f'({t_legacy / t_new:.1f}x), cube={format_seconds(t_cube)} ({t_legacy / t_cube:.1f}x)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='get_avg_stats_dfの速度を比較する')
+    parser.add_argument('-s', '--scale', help='rookie, statsを何倍に水増しするか', type=int, default=100)
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=20)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
@@ -0,0 +1,55 @@
+import argparse
+from logging import getLogger
+
+import plotly.io as pio
+
+from benchmarks.bench_scatter import build_plot_dfs, HOVER_DATA
+from benchmarks.common import measure, format_seconds
+from benchmarks.synthetic import load_synthetic_dfs
+from mydash.figures import do_scatter_plot_play_time, do_histogram_play_time, HistogramConfig
+from mydash.figures.compact import compact_figure, to_json, orjson
+from mydash.utils.df import filter_stats_df
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+
+def compare(name, fig):
+    default_size = len(pio.to_json(fig, validate=False, engine='json').encode('utf-8'))
+    compact_size = len(to_json(compact_figure(fig, args.precision)))
+    t_json = measure(lambda: pio.to_json(fig, validate=False, engine='json'), args.repeat)
+    t_compact = measure(lambda: to_json(compact_figure(fig, args.precision)), args.repeat)
+    log = (f'{name:>16}: default={default_size / 1024:.1f}KB ({format_seconds(t_json)}), '
+           f'compact={compact_size / 1024:.1f}KB ({format_seconds(t_compact)}), '
+           f'reduction={default_size / compact_size:.1f}x')
+    if orjson is not None:
+        t_orjson = measure(lambda: pio.to_json(fig, validate=False, engine='orjson'), args.repeat)
+        log += f', default with orjson={format_seconds(t_orjson)}'
+    LOGGER.info(log)
+
+
+def main():
+    rookie_df, stats_df = load_synthetic_dfs(args.scale)
+    LOGGER.info(f'#rookies={len(rookie_df)}, #stats={len(stats_df)}, orjson={orjson is not None}')
+
+    for page_size in args.page_sizes:
+        p_rookie_df, p_stats_df = build_plot_dfs(rookie_df, stats_df, 0, page_size)
+        fig = do_scatter_plot_play_time(p_rookie_df, p_stats_df, hover_name='stats_label', hover_data=HOVER_DATA)
+        compare(f'scatter ({page_size})', fig)
+
+    config = HistogramConfig()
+    f_stats_df = filter_stats_df(stats_df, rookie_year_range=[config.rookie_year, config.rookie_year],
+                                 league_id=config.league_id)
+    compare('histogram', do_histogram_play_time(f_stats_df, config))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='図のJSONのサイズとエンコード時間を比較する')
+    parser.add_argument('-s', '--scale', help='実データの何倍の合成データを使うか', type=int, default=100)
+    parser.add_argument('--page-sizes', help='バブルプロットの選手数', type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument('-p', '--precision', help='小数点以下の桁数', type=int, default=2)
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=20)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
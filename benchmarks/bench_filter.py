@@ -0,0 +1,45 @@
+import argparse
+from logging import getLogger
+
+import numpy as np
+
+from benchmarks.common import scale_df, measure, format_seconds
+from mydash.utils.df import load_rookie_df, filter_rookie_df
+from mydash.utils.index import RookieIndex
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+FILTERS = {
+    'none': dict(),
+    'year': dict(joined_year_range=[2017, 2019]),
+    'league+position': dict(joined_league_ids=[1, 2], positions=['DF', 'MF']),
+    'category+year': dict(prev_categories=['UNIV'], joined_year_range=[2015, 2018]),
+    'teams': dict(joined_teams=['FC東京', '川崎フロンターレ'], prev_teams=['FC東京U-18', '流通経済大']),
+}
+
+
+def main():
+    rookie_df = scale_df(load_rookie_df(), args.scale)
+    index = RookieIndex(rookie_df)
+    LOGGER.info(f'#rows={len(rookie_df)}, build index={format_seconds(measure(lambda: RookieIndex(rookie_df), 1))}')
+
+    for name, kwargs in FILTERS.items():
+        expected = filter_rookie_df(rookie_df, **kwargs).index.values
+        assert np.array_equal(index.filter_rows(**kwargs), expected), name
+
+        t_df = measure(lambda: filter_rookie_df(rookie_df, **kwargs), args.repeat)
+        t_index = measure(lambda: index.filter_rows(**kwargs), args.repeat)
+        t_index_df = measure(lambda: rookie_df.iloc[index.filter_rows(**kwargs)], args.repeat)
+        LOGGER.info(f'{name:>16}: filter_rookie_df={format_seconds(t_df)}, RookieIndex={format_seconds(t_index)} '
+                    f'({format_seconds(t_index_df)} with iloc), speedup={t_df / t_index:.1f}x, #matched={len(expected)}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='filter_rookie_dfとRookieIndexの速度を比較する')
+    parser.add_argument('-s', '--scale', help='rookieを何倍に水増しするか', type=int, default=100)
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=20)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
@@ -0,0 +1,70 @@
+import argparse
+from logging import getLogger
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import DEFAULT_PLOTLY_COLORS
+
+from benchmarks.common import scale_df, measure, format_seconds
+from mydash.figures import do_histogram_play_time, HistogramConfig
+from mydash.utils.df import load_rookie_df, load_stats_df, filter_stats_df
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+
+def do_histogram_play_time_raw(stats_df, config: HistogramConfig):
+    """
+    `do_histogram_play_time` before server-side binning, which sends raw minutes, kept as the reference
+    """
+
+    fig = go.Figure()
+    for league_id, color in zip(range(1, 4), DEFAULT_PLOTLY_COLORS):
+        fig.add_trace(go.Histogram(
+            x=stats_df[stats_df['league_id'] == league_id]['minutes'],
+            name=f'J{league_id}',
+            marker_color=color,
+            xbins=dict(start=0, end=3600, size=100)
+        ))
+    fig.update_xaxes(range=[0, 3600])
+    fig.update_layout(
+        title=dict(
+            text=f'league=J{config.league_id}, rookie year={config.rookie_year}, #stats={len(stats_df)}',
+            x=0.5
+        ),
+        xaxis_title_text='minutes',
+        yaxis_title_text='#players',
+        bargap=0.2,
+        bargroupgap=0.1
+    )
+    return fig
+
+
+def main():
+    rookie_df = load_rookie_df()
+    stats_df = load_stats_df(rookie_df)
+    config = HistogramConfig()
+
+    for scale in args.scales:
+        s_stats_df = scale_df(stats_df, scale)
+        f_stats_df = filter_stats_df(s_stats_df, rookie_year_range=[config.rookie_year, config.rookie_year],
+                                     league_id=config.league_id)
+        raw_size = len(pio.to_json(do_histogram_play_time_raw(f_stats_df, config)))
+        binned_size = len(pio.to_json(do_histogram_play_time(f_stats_df, config)))
+        t_raw = measure(lambda: pio.to_json(do_histogram_play_time_raw(f_stats_df, config)), args.repeat)
+        t_binned = measure(lambda: pio.to_json(do_histogram_play_time(f_stats_df, config)), args.repeat)
+        LOGGER.info(f'scale={scale:>4}, #stats={len(f_stats_df):>6}: '
+                    f'raw={raw_size / 1024:.1f}KB ({format_seconds(t_raw)}), '
+                    f'binned={binned_size / 1024:.1f}KB ({format_seconds(t_binned)}), '
+                    f'reduction={raw_size / binned_size:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ヒストグラムのペイロードサイズを比較する')
+    parser.add_argument('-s', '--scales', help='statsを何倍に水増しするか', type=int, nargs='+',
+                        default=[1, 10, 100, 1000])
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=5)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
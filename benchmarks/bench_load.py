@@ -0,0 +1,392 @@
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from logging import getLogger
+from typing import List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+LAYOUT_PATH = '/_dash-layout'
+DEPENDENCIES_PATH = '/_dash-dependencies'
+CALLBACK_PATH = '/_dash-update-component'
+SERVER_COMMAND = 'gunicorn app:server --workers {workers} --threads {threads} --bind {host}:{port}'
+
+
+@dataclass
+class Callback:
+    name: str
+    output: str
+    outputs: List[Tuple[str, str]]
+    inputs: List[Tuple[str, str]]
+    state: List[Tuple[str, str]]
+    clientside_function: Optional[str] = None
+    prevent_initial_call: bool = False
+
+    @property
+    def is_multi(self):
+        return self.output.startswith('..')
+
+    @classmethod
+    def from_dependency(cls, dependency):
+        """
+        :param dependency: item of `/_dash-dependencies`
+        """
+
+        output = dependency['output']
+        parts = output[2:-2].split('...') if output.startswith('..') else [output]
+        outputs = [tuple(x.rsplit('.', 1)) for x in parts]
+        clientside_function = dependency.get('clientside_function')
+        return cls(
+            name='+'.join(x for x, _ in outputs),
+            output=output,
+            outputs=outputs,
+            inputs=[(x['id'], x['property']) for x in dependency['inputs']],
+            state=[(x['id'], x['property']) for x in dependency['state']],
+            clientside_function=clientside_function['function_name'] if clientside_function else None,
+            prevent_initial_call=dependency.get('prevent_initial_call', False)
+        )
+
+
+def collect_props(component, props):
+    """
+    collect props of components with IDs in a layout returned by `/_dash-layout`
+
+    :param props: dictionary to be updated, component ID -> props
+    """
+
+    if isinstance(component, list):
+        for child in component:
+            collect_props(child, props)
+    elif isinstance(component, dict) and 'props' in component:
+        if 'id' in component['props']:
+            props[component['props']['id']] = dict(component['props'])
+        collect_props(component['props'].get('children'), props)
+
+
+# ports of clientside callbacks whose outputs are inputs of server callbacks, the others are skipped.
+# `updatePlayerCountPlot` only updates a figure, so there are none for now.
+CLIENTSIDE_FUNCTIONS = dict()
+
+
+class Recorder:
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, ok):
+        with self._lock:
+            self.records.append((name, seconds, ok))
+
+
+class DashSession:
+    """
+    Emulation of a browser tab of the app, which keeps the props of the components and fires callbacks triggered by
+    changed props in the same order as the Dash renderer, i.e. a callback waits for pending callbacks which update
+    its inputs. Server callbacks are sent to `/_dash-update-component` with the same payloads as the renderer.
+    """
+
+    def __init__(self, http, base_url, recorder):
+        self.http = http
+        self.base_url = base_url
+        self.recorder = recorder
+        self.props = dict()
+        self.callbacks = []
+
+    def _get(self, path):
+        start = time.perf_counter()
+        response = self.http.get(self.base_url + path)
+        self.recorder.add(path, time.perf_counter() - start, response.ok)
+        response.raise_for_status()
+        return response.json()
+
+    def get(self, component_id, prop, default=None):
+        return self.props.get(component_id, dict()).get(prop, default)
+
+    def load(self):
+        """
+        fetch the layout and the callbacks as the page is loaded, and fire initial callbacks
+        """
+
+        self.props = dict()
+        collect_props(self._get(LAYOUT_PATH), self.props)
+        self.callbacks = [Callback.from_dependency(x) for x in self._get(DEPENDENCIES_PATH)]
+        self._propagate({i: [] for i, callback in enumerate(self.callbacks) if not callback.prevent_initial_call})
+
+    def update(self, changes):
+        """
+        :param changes: list of (component ID, prop, value) changed by a user action
+        """
+
+        for component_id, prop, value in changes:
+            self.props.setdefault(component_id, dict())[prop] = value
+        self._propagate(self._get_triggered([(component_id, prop) for component_id, prop, _ in changes]))
+
+    def _get_triggered(self, changed):
+        triggered = dict()
+        for i, callback in enumerate(self.callbacks):
+            prop_ids = [f'{component_id}.{prop}' for component_id, prop in changed
+                        if (component_id, prop) in callback.inputs]
+            if prop_ids:
+                triggered[i] = prop_ids
+        return triggered
+
+    def _propagate(self, pending):
+        """
+        :param pending: index of callback -> IDs of changed props
+        """
+
+        while pending:
+            outputs = {i: set(self.callbacks[i].outputs) for i in pending}
+            ready = [i for i in pending
+                     if not any(set(self.callbacks[i].inputs) & outputs[j] for j in pending if j != i)] or list(pending)
+            for i in ready:
+                changed = self._fire(self.callbacks[i], pending.pop(i))
+                for j, prop_ids in self._get_triggered(changed).items():
+                    pending[j] = sorted(set(pending.get(j, [])) | set(prop_ids))
+
+    def _set_outputs(self, callback, values):
+        changed = []
+        for (component_id, prop), value in zip(callback.outputs, values):
+            self.props.setdefault(component_id, dict())[prop] = value
+            changed.append((component_id, prop))
+        return changed
+
+    def _fire(self, callback, changed_prop_ids):
+        """
+        :return: list of (component ID, prop) updated by the callback
+        """
+
+        if callback.clientside_function is not None:
+            func = CLIENTSIDE_FUNCTIONS.get(callback.clientside_function)
+            if func is None:
+                return []
+            values = func(*[self.get(*x) for x in callback.inputs + callback.state])
+            return self._set_outputs(callback, values if callback.is_multi else [values])
+
+        def to_payload(items):
+            payload = []
+            for component_id, prop in items:
+                item = {'id': component_id, 'property': prop}
+                if prop in self.props.get(component_id, dict()):  # undefined props are omitted by the renderer
+                    item['value'] = self.props[component_id][prop]
+                payload.append(item)
+            return payload
+
+        outputs = [{'id': component_id, 'property': prop} for component_id, prop in callback.outputs]
+        body = {
+            'output': callback.output,
+            'outputs': outputs if callback.is_multi else outputs[0],
+            'inputs': to_payload(callback.inputs),
+            'changedPropIds': changed_prop_ids,
+            'state': to_payload(callback.state)
+        }
+        start = time.perf_counter()
+        response = self.http.post(self.base_url + CALLBACK_PATH, json=body)
+        self.recorder.add(callback.name, time.perf_counter() - start, response.ok)
+        if response.status_code != 200:  # 204 on PreventUpdate
+            if not response.ok:
+                LOGGER.debug(f'callback {callback.name} failed: status={response.status_code}')
+            return []
+        result = response.json()['response']
+        return self._set_outputs(callback, [result.get(component_id, dict()).get(prop)
+                                            for component_id, prop in callback.outputs])
+
+
+def select_dropdowns(session, rng):
+    dropdown_ids = ['joined-team-dropdown', 'prev-category-dropdown', 'position-dropdown', 'joined-league-dropdown']
+    for dropdown_id in dropdown_ids:
+        options = [x['value'] for x in session.get(dropdown_id, 'options', [])]
+        yield [(dropdown_id, 'value', rng.sample(options, rng.randint(1, min(2, len(options)))))]
+    yield [(dropdown_id, 'value', []) for dropdown_id in dropdown_ids]
+
+
+def search_teams(session, rng):
+    dropdown_id = rng.choice(['joined-team-dropdown', 'prev-team-dropdown'])
+    name = rng.choice(session.get(dropdown_id, 'options', []))['value']
+    for i in range(1, min(3, len(name)) + 1):
+        yield [(dropdown_id, 'search_value', name[:i])]
+    options = [x['value'] for x in session.get(dropdown_id, 'options', [])]
+    yield [(dropdown_id, 'value', [rng.choice(options)]), (dropdown_id, 'search_value', '')]
+    yield [(dropdown_id, 'value', [])]
+
+
+def drag_year_slider(session, rng):
+    slider_min = session.get('joined-year-range-slider', 'min')
+    slider_max = session.get('joined-year-range-slider', 'max')
+    for _ in range(3):
+        start = rng.randint(slider_min, slider_max)
+        yield [('joined-year-range-slider', 'value', [start, rng.randint(start, slider_max)])]
+    yield [('joined-year-range-slider', 'value', [slider_min, slider_max])]
+
+
+def click_bubbles(session, rng):
+    for _ in range(3):
+        traces = [x for x in (session.get('play-time-plot', 'figure') or dict()).get('data', []) if x.get('x')]
+        if not traces:
+            return
+        curve_number = rng.randrange(len(traces))
+        trace = traces[curve_number]
+        point_number = rng.randrange(len(trace['x']))
+        yield [('play-time-plot', 'clickData', {'points': [{
+            'curveNumber': curve_number, 'pointNumber': point_number, 'pointIndex': point_number,
+            'x': trace['x'][point_number], 'y': trace['y'][point_number]
+        }]})]
+
+
+def select_histogram(session, rng):
+    for _ in range(2):
+        start = rng.uniform(0, 3000)
+        yield [('play-time-histogram', 'selectedData', {'points': [], 'range': {'x': [start, start + 600]}})]
+    # clear the selection by the other filters
+    yield [('joined-year-range-slider', 'value', [session.get('joined-year-range-slider', 'min'),
+                                                  session.get('joined-year-range-slider', 'max')])]
+
+
+def page_table(session, rng):
+    for _ in range(3):
+        page_count = session.get('player-table', 'page_count') or 1
+        yield [('player-table', 'page_current', rng.randrange(page_count))]
+    yield [('player-table', 'page_current', 0)]
+
+
+SCENARIOS = {
+    'dropdowns': select_dropdowns,
+    'team-search': search_teams,
+    'year-slider': drag_year_slider,
+    'bubble-click': click_bubbles,
+    'histogram-select': select_histogram,
+    'paging': page_table,
+}
+
+
+def run_user(base_url, recorder, deadline, seed):
+    """
+    a virtual user, who loads the page and plays all the scenarios in random order repeatedly until `deadline`
+    """
+
+    rng = random.Random(seed)
+    with requests.Session() as http:
+        session = DashSession(http, base_url, recorder)
+        while time.monotonic() < deadline:
+            session.load()
+            for name in rng.sample(list(SCENARIOS), len(SCENARIOS)):
+                for changes in SCENARIOS[name](session, rng):
+                    if time.monotonic() >= deadline:
+                        return
+                    session.update(changes)
+                    time.sleep(args.think)
+
+
+def run_load(base_url):
+    """
+    :return: list of summaries of latencies for each request name, and for all requests ("total")
+    """
+
+    # warm up the workers, e.g. caches of compiled templates
+    run_user(base_url, Recorder(), time.monotonic() + args.warmup, seed=-1)
+
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        for future in [executor.submit(run_user, base_url, recorder, deadline, i) for i in range(args.users)]:
+            future.result()
+    elapsed = time.monotonic() - start
+
+    names = sorted({name for name, _, _ in recorder.records})
+    summaries = []
+    for name in names + ['total']:
+        records = [x for x in recorder.records if name in (x[0], 'total')]
+        seconds = np.array([x[1] for x in records])
+        summaries.append({
+            'name': name,
+            'requests': len(records),
+            'errors': sum(not x[2] for x in records),
+            'throughput': len(records) / elapsed,
+            'p50': float(np.percentile(seconds, 50)),
+            'p95': float(np.percentile(seconds, 95)),
+            'p99': float(np.percentile(seconds, 99)),
+        })
+    return summaries
+
+
+def wait_until_ready(base_url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode}')
+        try:
+            if requests.get(base_url + DEPENDENCIES_PATH, timeout=5).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f'server is not ready in {timeout}s: {base_url}')
+
+
+def run_config(workers, threads):
+    command = args.command.format(workers=workers, threads=threads, host=args.host, port=args.port)
+    LOGGER.info(f'start server: {command}')
+    process = subprocess.Popen(command.split(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f'http://{args.host}:{args.port}'
+        wait_until_ready(base_url, process)
+        return run_load(base_url)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def log_summaries(config, summaries):
+    LOGGER.info(f'{config}: {args.users} users, {args.duration}s')
+    for x in summaries:
+        LOGGER.info(f'{x["name"]:>48}: {x["requests"]:>6} requests ({x["errors"]} errors), '
+                    f'{x["throughput"]:7.1f} req/s, p50={x["p50"] * 1e3:7.1f}ms, p95={x["p95"] * 1e3:7.1f}ms, '
+                    f'p99={x["p99"] * 1e3:7.1f}ms')
+
+
+def main():
+    results = dict()
+    if args.url:
+        results[args.url] = run_load(args.url.rstrip('/'))
+        log_summaries(args.url, results[args.url])
+    else:
+        for config in args.configs:
+            workers, threads = map(int, config.split('x'))
+            results[config] = run_config(workers, threads)
+            log_summaries(config, results[config])
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'users': args.users, 'duration': args.duration, 'think': args.think, 'results': results},
+                      f, indent=1)
+        LOGGER.info(f'saved results in {args.save}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='操作シナリオを再生してアプリに負荷をかけ、コールバックごとのスループットとレイテンシを計測する')
+    parser.add_argument('-u', '--url', help='起動済みのアプリのURL。指定しない場合は --configs ごとにサーバーを起動する')
+    parser.add_argument('-c', '--configs', help='サーバーの構成（ワーカー数xスレッド数）', nargs='+',
+                        default=['1x1', '1x4', '2x4'])
+    parser.add_argument('--command', help='サーバーの起動コマンド', default=SERVER_COMMAND)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('-n', '--users', help='同時ユーザー数', type=int, default=8)
+    parser.add_argument('-d', '--duration', help='計測時間（秒）', type=float, default=30)
+    parser.add_argument('-w', '--warmup', help='計測前のウォームアップ時間（秒）', type=float, default=5)
+    parser.add_argument('--think', help='ユーザー操作の間隔（秒）', type=float, default=0)
+    parser.add_argument('-o', '--save', help='計測結果を保存するJSONファイル')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from logging import getLogger
+
+import pandas as pd
+
+from benchmarks.common import scale_df, format_seconds
+from mydash.scripts.process_stats import RAW_COLUMNS, process_stats, write_stats_chunked
+from mydash.utils.canonicalize import CanonicalMemo
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+
+def measure_once(func):
+    """
+    :return: result, seconds and peak bytes allocated by `func`. Seconds are measured without tracing allocations,
+        which slows down code allocating many small objects.
+    """
+
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    stats_raw_df = pd.read_csv(args.stats)
+    rookie_df = pd.read_csv(args.rookie)
+    # dropped stats are not used, since each of them matches one row per replica in scaled stats
+    drop_df = pd.DataFrame(columns=['player_name', 'year', 'team_name'])
+    memo = CanonicalMemo()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in args.scales:
+            path = os.path.join(tmp_dir, f'stats_raw_{scale}.csv')
+            out_path = os.path.join(tmp_dir, f'stats_{scale}.csv')
+            # sorted by year as `fetch_stats.py` writes, which chunked processing requires
+            scale_df(stats_raw_df, scale).sort_values('year', kind='stable').to_csv(path, index=False)
+
+            full_df, full_seconds, full_peak = measure_once(
+                lambda: process_stats(pd.read_csv(path)[RAW_COLUMNS], rookie_df, drop_df.copy(), memo))
+            _, chunked_seconds, chunked_peak = measure_once(
+                lambda: write_stats_chunked(pd.read_csv(path, usecols=RAW_COLUMNS, chunksize=args.chunksize),
+                                            rookie_df, drop_df, out_path, memo))
+            assert pd.read_csv(out_path).equals(full_df)
+            LOGGER.info(f'scale={scale:3d} (#rows={len(stats_raw_df) * scale}): '
+                        f'full={format_seconds(full_seconds)}, {full_peak / 1e6:.1f}MB, '
+                        f'chunked={format_seconds(chunked_seconds)}, {chunked_peak / 1e6:.1f}MB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='process_statsの処理時間とピークメモリを計測する')
+    parser.add_argument('-s', '--stats', help='fetch_stats.pyで取得したstatsファイル', default='./data/stats_raw.csv')
+    parser.add_argument('-r', '--rookie', help='処理済みのrookieファイル', default='./data/rookie.csv')
+    parser.add_argument('--scales', help='statsを複製する回数', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('-k', '--chunksize', help='チャンクの行数', type=int, default=10000)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from logging import getLogger
+
+import pandas as pd
+
+from benchmarks.common import measure, format_seconds
+from benchmarks.fixtures import build_rookie_page
+from mydash.scripts.fetch_rookie import parse_pages
+from mydash.utils.constants import LEAGUE_IDS, YEARS
+from mydash.utils.log import init_logger
+from tests.scripts.test_fetch_rookie import parse_players_bs4
+
+LOGGER = getLogger(__name__)
+
+
+def load_pages():
+    """
+    :return: list of (html, year, league_id), read from `{year}_{league_id}.html` in `--pages` if given,
+        or built from the raw rookies otherwise
+    """
+
+    pages = []
+    rookie_raw_df = None if args.pages else pd.read_csv(args.rookie)
+    for year in YEARS:
+        for league_id in LEAGUE_IDS:
+            if args.pages:
+                path = os.path.join(args.pages, f'{year}_{league_id}.html')
+                if not os.path.exists(path):
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    html = f.read()
+            else:
+                html = build_rookie_page(rookie_raw_df, year, league_id)
+            pages.append((html, year, league_id))
+    return pages
+
+
+def main():
+    pages = load_pages()
+    LOGGER.info(f'#pages={len(pages)}, total size={sum(len(html) for html, _, _ in pages) / 1e6:.1f}MB')
+
+    bs4_seconds = measure(lambda: [parse_players_bs4(*page) for page in pages], args.repeat)
+    xpath_seconds = measure(lambda: parse_pages(pages), args.repeat)
+    LOGGER.info(f'all pages: bs4={format_seconds(bs4_seconds)}, xpath={format_seconds(xpath_seconds)}, '
+                f'speedup={bs4_seconds / xpath_seconds:.1f}x')
+    LOGGER.info(f'per page: bs4={format_seconds(bs4_seconds / len(pages))}, '
+                f'xpath={format_seconds(xpath_seconds / len(pages))}')
+
+    if args.processes > 1:
+        with ProcessPoolExecutor(args.processes) as executor:
+            parse_pages(pages, executor)  # warm up workers
+            pool_seconds = measure(lambda: parse_pages(pages, executor), args.repeat)
+        LOGGER.info(f'all pages with {args.processes} processes: xpath={format_seconds(pool_seconds)}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Soccer D.B.の新人選手ページのパースを計測する')
+    parser.add_argument('-r', '--rookie', help='fetch_rookie.pyで取得したrookieファイル', default='./data/rookie_raw.csv')
+    parser.add_argument('-p', '--pages', help='保存したHTMLのディレクトリ（{year}_{league_id}.html）')
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=5)
+    parser.add_argument('--processes', help='パースするプロセス数', type=int, default=4)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
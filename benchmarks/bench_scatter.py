@@ -0,0 +1,106 @@
+import argparse
+import json
+from logging import getLogger
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+from benchmarks.common import measure, format_seconds
+from mydash.figures import do_scatter_plot_play_time
+from mydash.utils.constants import FIRST_YEAR, LAST_YEAR
+from mydash.utils.df import load_rookie_df, load_stats_df, get_avg_stats_df
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+HOVER_DATA = {'minutes': ':.1f', 'apps': ':.1f', 'goals': ':.1f', 'rookie_year': False, 'y': False, 'league': False}
+
+
+def do_scatter_plot_play_time_px(rookie_df, stats_df, **kwargs):
+    """
+    `do_scatter_plot_play_time` before the template-based rewrite, kept as the reference implementation
+    """
+
+    rookie_df = rookie_df.reset_index(drop=True) \
+        .reset_index(drop=False) \
+        .rename(columns={'index': 'player_index'})
+    stats_df = pd.merge(stats_df, rookie_df[['player_id', 'player_index']], on='player_id')
+    stats_df['y'] = 4 * stats_df['player_index'] + stats_df['league_id']
+
+    fig = px.scatter(stats_df, x='rookie_year', y='y', size='minutes',
+                     color='league',
+                     category_orders={'league': ['J1', 'J2', 'J3']},
+                     height=max(230, (len(rookie_df) + 1) * 80),
+                     **kwargs)
+    fig.update_yaxes(range=[4 * len(rookie_df), 0])
+    fig.update_xaxes(range=[0.5, LAST_YEAR - FIRST_YEAR + 1.5])
+    fig.update_traces(
+        marker=dict(
+            sizemode='area',
+            sizeref=2. * 3600 / (30. ** 2)
+        )
+    )
+    fig.update_layout(
+        yaxis=dict(
+            title_text='',
+            ticktext=rookie_df['player_label'],
+            tickvals=rookie_df['player_index'] * 4 + 2
+        ),
+        xaxis=dict(
+            title_text='rookie year'
+        )
+    )
+    return fig
+
+
+def build_plot_dfs(rookie_df, stats_df, page_current, page_size):
+    """
+    build data frames in the same way as `update_play_time_plot` without filters
+    """
+
+    d_rookie_df = pd.DataFrame([{'player_id': 0, 'player_name': 'Avg.', 'player_label': 'Avg.'}])
+    d_stats_df = get_avg_stats_df(rookie_df, stats_df)
+    d_stats_df['player_id'] = 0
+    d_stats_df['player_name'] = 'Avg.'
+    d_stats_df['stats_label'] = 'Avg.'
+    d_stats_df['league'] = 'J' + d_stats_df['league_id'].astype(str)
+
+    t_rookie_df = rookie_df.iloc[page_current * page_size:(page_current + 1) * page_size]
+    t_stats_df = pd.merge(stats_df, t_rookie_df['player_id'], on='player_id')
+    return pd.concat([d_rookie_df, t_rookie_df]), pd.concat([d_stats_df, t_stats_df])
+
+
+def main():
+    rookie_df = load_rookie_df()
+    stats_df = load_stats_df(rookie_df)
+
+    for page_current in [0, 10, 100]:
+        p_rookie_df, p_stats_df = build_plot_dfs(rookie_df, stats_df, page_current, args.page_size)
+
+        def run_px():
+            return do_scatter_plot_play_time_px(p_rookie_df, p_stats_df, hover_name='stats_label',
+                                                hover_data=HOVER_DATA)
+
+        def run_template():
+            return do_scatter_plot_play_time(p_rookie_df, p_stats_df, hover_name='stats_label',
+                                             hover_data=HOVER_DATA)
+
+        expected = json.loads(pio.to_json(run_px()))
+        assert json.loads(pio.to_json(run_template(), validate=False)) == expected, page_current
+
+        t_px = measure(run_px, args.repeat)
+        t_template = measure(run_template, args.repeat)
+        LOGGER.info(f'page={page_current:>3}: px.scatter={format_seconds(t_px)}, '
+                    f'template={format_seconds(t_template)}, speedup={t_px / t_template:.1f}x, '
+                    f'#points={sum(len(x["x"]) for x in expected["data"])}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='do_scatter_plot_play_timeの速度を比較する')
+    parser.add_argument('-p', '--page-size', help='1ページあたりの選手数', type=int, default=5)
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=20)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
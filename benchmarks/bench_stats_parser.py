@@ -0,0 +1,82 @@
+import argparse
+import io
+import tracemalloc
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import measure, format_seconds
+from benchmarks.fixtures import build_stats_page
+from mydash.scripts.fetch_stats import Stats, parse_stats
+from mydash.utils.log import init_logger
+
+LOGGER = getLogger(__name__)
+
+
+def parse_stats_read_html(html):
+    """
+    `fetch_stats.fetch_stats` before the dedicated extractor, which parses all tables by `pd.read_html` and
+    iterates rows, kept as the reference
+    """
+
+    dfs = pd.read_html(io.StringIO(html))
+    assert len(dfs) == 2
+    df = dfs[0]
+
+    records = []
+    for _, row in df.iterrows():
+        records.append(Stats(
+            player_name=row[1].strip(),
+            apps=int(row[2]),
+            minutes=int(row[3]),
+            goals=int(row[4])
+        ))
+    return records
+
+
+def measure_memory(func):
+    """
+    :return: peak bytes allocated by `func`
+    """
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    stats_raw_df = pd.read_csv(args.stats)
+    keys = stats_raw_df[['year', 'league_id', 'team_name']].drop_duplicates().head(args.pages)
+    pages = [build_stats_page(stats_raw_df, *key) for key in keys.itertuples(index=False)]
+    contents = [html.encode('utf-8') for html in pages]
+    LOGGER.info(f'#pages={len(pages)}, total size={sum(map(len, contents)) / 1e6:.1f}MB')
+
+    for html, content in zip(pages, contents):
+        records = parse_stats_read_html(html)
+        stats = parse_stats(content, 'utf-8')
+        assert [Stats(*values) for values in zip(*(stats[col].tolist() for col in Stats.__annotations__))] == records
+
+    read_html_seconds = measure(lambda: [parse_stats_read_html(html) for html in pages], args.repeat)
+    extractor_seconds = measure(lambda: [parse_stats(content, 'utf-8') for content in contents], args.repeat)
+    LOGGER.info(f'per page: read_html={format_seconds(read_html_seconds / len(pages))}, '
+                f'extractor={format_seconds(extractor_seconds / len(pages))}, '
+                f'speedup={read_html_seconds / extractor_seconds:.1f}x')
+
+    read_html_bytes = np.median([measure_memory(lambda: parse_stats_read_html(html)) for html in pages])
+    extractor_bytes = np.median([measure_memory(lambda: parse_stats(content, 'utf-8')) for content in contents])
+    LOGGER.info(f'peak memory per page: read_html={read_html_bytes / 1e3:.1f}KB, '
+                f'extractor={extractor_bytes / 1e3:.1f}KB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='J.LEAGUE Data Siteの出場記録ページのパースを計測する')
+    parser.add_argument('-s', '--stats', help='fetch_stats.pyで取得したstatsファイル', default='./data/stats_raw.csv')
+    parser.add_argument('-p', '--pages', help='ページ数', type=int, default=50)
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=5)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import contextvars
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+from logging import getLogger
+
+import dash
+import numpy as np
+import pandas as pd
+import plotly
+
+from benchmarks.common import measure, format_seconds
+from benchmarks.synthetic import load_synthetic_dfs
+from mydash.figures import do_scatter_plot_play_time, do_histogram_play_time, do_bar_plot_player_count, \
+    HistogramConfig
+from mydash.figures.cache import FigureCache
+from mydash.utils.cube import StatsCube
+from mydash.utils.df import filter_rookie_df, filter_stats_df, get_avg_stats_df
+from mydash.utils.index import RookieIndex, TeamNameIndex
+from mydash.utils.log import init_logger
+from mydash.utils.store import FilterResultStore, ROOKIE_FILTER_TYPES
+
+LOGGER = getLogger(__name__)
+
+BASELINE_VERSION = 1
+# differences below these are regarded as noise when compared to a baseline
+SECONDS_NOISE = 1e-3
+PEAK_BYTES_NOISE = 1 << 20
+
+FILTERS = {
+    'none': dict(),
+    'league+position': dict(joined_league_ids=[1, 2], positions=['DF', 'MF']),
+    'teams': dict(joined_teams=['FC東京', '川崎フロンターレ'], prev_teams=['FC東京U-18', '流通経済大']),
+}
+HOVER_DATA = {'minutes': ':.1f', 'apps': ':.1f', 'goals': ':.1f', 'rookie_year': False, 'y': False, 'league': False}
+PAGE_SIZE = 5
+
+
+def measure_peak(func):
+    """
+    :return: peak bytes allocated by a call to `func`
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_callback(func, *args, triggered=()):
+    """
+    call a Dash callback outside of a request, with `dash.callback_context.triggered` set to `triggered` prop IDs
+    """
+
+    def run():
+        dash._callback_context.context_value.set(dash._utils.AttributeDict(
+            triggered_inputs=[{'prop_id': prop_id, 'value': None} for prop_id in triggered]
+        ))
+        return func(*args)
+
+    return contextvars.copy_context().run(run)
+
+
+def build_function_cases(rookie_df, stats_df):
+    """
+    :return: case name -> function without arguments, for the data and figure functions
+    """
+
+    index = RookieIndex(rookie_df)
+    cube = StatsCube.build(rookie_df, stats_df)
+    team_index = TeamNameIndex(rookie_df['prev_team_name'])
+    cases = {
+        'RookieIndex': lambda: RookieIndex(rookie_df),
+        'StatsCube.build': lambda: StatsCube.build(rookie_df, stats_df),
+        'TeamNameIndex': lambda: TeamNameIndex(rookie_df['prev_team_name']),
+    }
+    for query in ['大', '明治', 'ユース', 'u18']:
+        cases[f'TeamNameIndex.search[{query}]'] = lambda query=query: team_index.search(query)
+    for name, kwargs in FILTERS.items():
+        f_rookie_df = filter_rookie_df(rookie_df, **kwargs)
+        f_stats_df = filter_stats_df(stats_df, player_ids=f_rookie_df['player_id'].values)
+        cases.update({
+            f'filter_rookie_df[{name}]': lambda kwargs=kwargs: filter_rookie_df(rookie_df, **kwargs),
+            f'RookieIndex.filter_rows[{name}]': lambda kwargs=kwargs: index.filter_rows(**kwargs),
+            f'filter_stats_df[{name}]':
+                lambda f_rookie_df=f_rookie_df: filter_stats_df(stats_df, player_ids=f_rookie_df['player_id'].values),
+            f'get_avg_stats_df[{name}]':
+                lambda f_rookie_df=f_rookie_df, f_stats_df=f_stats_df: get_avg_stats_df(f_rookie_df, f_stats_df),
+        })
+        if StatsCube.supports(**kwargs):
+            cases[f'StatsCube.get_avg_stats_df[{name}]'] = lambda kwargs=kwargs: cube.get_avg_stats_df(**kwargs)
+
+    config = HistogramConfig()
+    h_stats_df = filter_stats_df(stats_df, rookie_year_range=[config.rookie_year, config.rookie_year],
+                                 league_id=config.league_id)
+    p_rookie_df = rookie_df.iloc[:PAGE_SIZE]
+    p_stats_df = filter_stats_df(stats_df, player_ids=p_rookie_df['player_id'].values)
+    cases.update({
+        'filter_stats_df[histogram]': lambda: filter_stats_df(
+            stats_df, rookie_year_range=[config.rookie_year, config.rookie_year], league_id=config.league_id),
+        'do_scatter_plot_play_time': lambda: do_scatter_plot_play_time(p_rookie_df, p_stats_df,
+                                                                       hover_data=HOVER_DATA),
+        'do_histogram_play_time': lambda: do_histogram_play_time(h_stats_df, config),
+        'do_bar_plot_player_count': lambda: do_bar_plot_player_count(rookie_df),
+    })
+    return cases
+
+
+def build_callback_cases(rookie_df, stats_df):
+    """
+    :return: case name -> function without arguments, for the callbacks of app.py on the given data frames.
+        Each call starts with empty filter and figure caches, i.e. measures the cost on cache miss.
+    """
+
+    import app
+
+    app.rookie_df = rookie_df
+    app.stats_df = stats_df
+    app.rookie_index = RookieIndex(rookie_df)
+    app.stats_cube = StatsCube.build(rookie_df, stats_df)
+
+    def reset_caches():
+        app.rookie_store = FilterResultStore(app.resolve_rookie_rows, filter_types=ROOKIE_FILTER_TYPES)
+        app.figure_cache = FigureCache()
+
+    def update_handle(kwargs, histogram_selected_data=None, triggered=()):
+        reset_caches()
+        return run_callback(app.update_filtered_rookie_handle, kwargs.get('joined_teams'), kwargs.get('prev_teams'),
+                            kwargs.get('joined_league_ids'), kwargs.get('prev_categories'), kwargs.get('positions'),
+                            kwargs.get('joined_year_range'), histogram_selected_data, {'rookie_year': 1, 'league_id': 1},
+                            triggered=triggered)
+
+    cases = dict()
+    for name, kwargs in FILTERS.items():
+        handle = update_handle(kwargs)
+        table_records, _ = app.update_player_table(handle, 0, PAGE_SIZE)
+
+        def update_player_table(handle=handle):
+            reset_caches()
+            return run_callback(app.update_player_table, handle, 0, PAGE_SIZE)
+
+        def update_play_time_plot(handle=handle, table_records=table_records):
+            reset_caches()
+            return run_callback(app.update_play_time_plot, handle, table_records)
+
+        def update_play_time_histogram(handle=handle):
+            reset_caches()
+            return run_callback(app.update_play_time_histogram, handle, None)
+
+        cases.update({
+            f'update_filtered_rookie_handle[{name}]': lambda kwargs=kwargs: update_handle(kwargs),
+            f'update_player_table[{name}]': update_player_table,
+            f'update_play_time_plot[{name}]': update_play_time_plot,
+            f'update_play_time_histogram[{name}]': update_play_time_histogram,
+        })
+    cases['update_filtered_rookie_handle[histogram]'] = lambda: update_handle(
+        dict(), {'range': {'x': [0, 1000]}}, triggered=['play-time-histogram.selectedData'])
+    return cases
+
+
+def get_meta():
+    return {
+        'version': BASELINE_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'packages': {module.__name__: module.__version__ for module in [np, pd, plotly, dash]},
+    }
+
+
+def run_cases(group, cases, scale, n_rookies, n_stats):
+    results = []
+    for name, func in cases.items():
+        if args.cases and not any(x in name for x in args.cases):
+            continue
+        func()  # warm up
+        result = {
+            'group': group,
+            'case': name,
+            'scale': scale,
+            'n_rookies': n_rookies,
+            'n_stats': n_stats,
+            'seconds': measure(func, args.repeat),
+            'peak_bytes': measure_peak(func),
+        }
+        LOGGER.info(f'scale={scale:>4} {name:>48}: {format_seconds(result["seconds"]):>9}, '
+                    f'peak={result["peak_bytes"] / 1e6:.1f}MB')
+        results.append(result)
+    return results
+
+
+def compare(results, baseline):
+    """
+    log the ratios to the baseline
+
+    :return: number of cases which are slower or use more memory than `--tolerance` times the baseline, beyond
+        the noise level
+    """
+
+    baseline_results = {(x['case'], x['scale']): x for x in baseline['results']}
+    n_regressions = 0
+    for result in results:
+        base = baseline_results.get((result['case'], result['scale']))
+        if base is None:
+            continue
+        time_ratio = result['seconds'] / base['seconds']
+        memory_ratio = result['peak_bytes'] / max(base['peak_bytes'], 1)
+        is_regression = (time_ratio > args.tolerance and result['seconds'] - base['seconds'] > SECONDS_NOISE) or \
+            (memory_ratio > args.tolerance and result['peak_bytes'] - base['peak_bytes'] > PEAK_BYTES_NOISE)
+        n_regressions += is_regression
+        log = LOGGER.warning if is_regression else LOGGER.info
+        log(f'scale={result["scale"]:>4} {result["case"]:>48}: time={time_ratio:.2f}x, memory={memory_ratio:.2f}x')
+    return n_regressions
+
+
+def main():
+    warnings.simplefilter('ignore', FutureWarning)  # DataFrame.append in app.py
+    results = []
+    for scale in args.scales:
+        rookie_df, stats_df = load_synthetic_dfs(scale, args.seed)
+        LOGGER.info(f'scale={scale}: #rookies={len(rookie_df)}, #stats={len(stats_df)}')
+        for group, build_cases in [('function', build_function_cases), ('callback', build_callback_cases)]:
+            if group in args.groups:
+                results += run_cases(group, build_cases(rookie_df, stats_df), scale, len(rookie_df), len(stats_df))
+        del rookie_df, stats_df
+        gc.collect()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'meta': get_meta(), 'results': results}, f, ensure_ascii=False, indent=1)
+        LOGGER.info(f'saved {len(results)} results in {args.save}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        n_regressions = compare(results, baseline)
+        if n_regressions > 0:
+            LOGGER.warning(f'{n_regressions} cases regressed from {args.baseline}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='主要な関数とコールバックの処理時間とピークメモリを、合成データの規模ごとに計測する')
+    parser.add_argument('-s', '--scales', help='実データの何倍の合成データを使うか', type=int, nargs='+',
+                        default=[1, 10, 100, 1000])
+    parser.add_argument('-g', '--groups', help='計測対象', nargs='+', choices=['function', 'callback'],
+                        default=['function', 'callback'])
+    parser.add_argument('-c', '--cases', help='名前にいずれかを含むケースのみ計測する', nargs='+')
+    parser.add_argument('-n', '--repeat', help='計測回数', type=int, default=5)
+    parser.add_argument('--seed', help='合成データの乱数シード', type=int, default=0)
+    parser.add_argument('-o', '--save', help='計測結果を保存するJSONファイル')
+    parser.add_argument('-b', '--baseline', help='比較するベースラインのJSONファイル')
+    parser.add_argument('-t', '--tolerance', help='ベースラインの何倍までを許容するか', type=float, default=1.5)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
@@ -0,0 +1,33 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def scale_df(df, scale):
+    """
+    concat `df` for `scale` times
+    """
+
+    return pd.concat([df] * scale, ignore_index=True)
+
+
+def measure(func, repeat=100):
+    """
+    :return: median seconds of `repeat` calls to `func`
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f}us'
+    if seconds < 1:
+        return f'{seconds * 1e3:.2f}ms'
+    return f'{seconds:.2f}s'
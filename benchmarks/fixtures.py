@@ -0,0 +1,91 @@
+"""
+HTML fixtures which mimic the pages of the scraped sites, built from the raw data in ./data
+"""
+
+from html import escape
+
+NAV_ITEMS = 40
+SIDEBAR_ITEMS = 120
+
+
+def _build_chrome(title, body):
+    nav = ''.join(f'<li><div class="nav_item"><a href="/contents/{i}.php">メニュー{i}</a></div></li>'
+                  for i in range(NAV_ITEMS))
+    sidebar = ''.join(f'<div class="side_item"><div class="side_title">ランキング{i}</div>'
+                      f'<div class="side_body"><span>{i}位</span><a href="/players/{i}.php">選手{i}</a></div></div>'
+                      for i in range(SIDEBAR_ITEMS))
+    return f'''<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta charset="utf-8">
+<title>{escape(title)}</title>
+<script>var ads = [{', '.join(str(i) for i in range(200))}];</script>
+</head>
+<body>
+<div id="header"><div class="logo">Soccer D.B.</div><ul class="nav">{nav}</ul></div>
+<div id="wrapper">
+{body}
+<div class="side_contents">{sidebar}</div>
+</div>
+<div id="footer"><div class="copyright">Soccer D.B.</div></div>
+</body>
+</html>
+'''
+
+
+def _build_meta(row):
+    return (f'<div class="player_data"><table><tr>'
+            f'<th>ポジション</th><td>{escape(row.position)}</td>'
+            f'<th>身長/体重</th><td>180cm/70kg</td>'
+            f'<th>生年月日</th><td>{escape(row.birth)}</td>'
+            f'<th>前所属</th><td>{escape(row.prev_team_name)}</td>'
+            f'</tr></table></div>')
+
+
+def build_rookie_page(rookie_raw_df, year, league_id):
+    """
+    build a newcomers page of Soccer D.B. for `fetch_rookie.parse_players`, in the layout of the season
+    """
+
+    df = rookie_raw_df[(rookie_raw_df['year'] == year) & (rookie_raw_df['league_id'] == league_id)]
+    blocks = []
+    for team_name, team_df in df.groupby('team_name', sort=False):
+        if year < 2017:
+            blocks.append(f'<div class="group_title"><span class="gt_j">{escape(team_name)}</span>'
+                          f'<span class="gt_e">TEAM</span></div>')
+            for row in team_df.itertuples():
+                blocks.append(f'<div class="mini_jpn_title"> {escape(row.player_name)} </div>')
+                blocks.append(_build_meta(row))
+        else:
+            blocks.append(f'<div class="cp_middletitle"> {escape(team_name)} </div>')
+            for row in team_df.itertuples():
+                blocks.append(f'<div class="group_title"><span class="gt_j">{escape(row.player_name)}</span>'
+                              f'<span class="gt_e">PLAYER</span></div>')
+                blocks.append(_build_meta(row))
+                blocks.append('<div class="comment"><p>コメント</p></div>')
+
+    main_class = 'main_contents' if year < 2017 else 'full_contents'
+    body = f'<div class="{main_class}"><h1>{year} 新加入選手</h1>{"".join(blocks)}</div>'
+    return _build_chrome(f'{year} newcomers', body)
+
+
+def build_stats_page(stats_raw_df, year, league_id, team_name):
+    """
+    build a player stats page of the J.League Data Site for `fetch_stats.parse_stats`
+    """
+
+    df = stats_raw_df[(stats_raw_df['year'] == year) & (stats_raw_df['league_id'] == league_id) &
+                      (stats_raw_df['team_name'] == team_name)]
+    rows = ''.join(f'<tr><td>{i + 1}</td><td><a href="/SFIX04/?player_id={i}">\n{escape(row.player_name)}\n</a></td>'
+                   f'<td>{row.apps}</td><td>{row.minutes:,}</td><td>{row.goals}</td>'
+                   f'<td>0</td><td>0</td><td>0</td></tr>'
+                   for i, row in enumerate(df.itertuples()))
+    body = f'''<div class="search-result">
+<table class="table-base00 search-table">
+<thead><tr><th>背番号</th><th>選手名</th><th>出場</th><th>出場時間</th><th>得点</th>
+<th>警告</th><th>退場</th><th>PK</th></tr></thead>
+<tbody>{rows}</tbody>
+</table>
+<table class="table-base00"><tr><th>大会</th><td>{year} J{league_id}</td></tr></table>
+</div>'''
+    return _build_chrome(f'{year} J{league_id} {team_name}', body)
@@ -0,0 +1,56 @@
+"""
+Synthetic rookie/stats data frames in the same schema as the processed csv files, scaled from the real data in ./data
+"""
+
+import numpy as np
+import pandas as pd
+
+from mydash.utils.df import ROOKIE_CSV, STATS_CSV, add_rookie_columns, add_stats_columns
+
+
+def generate_dfs(rookie_df, stats_df, scale, seed=0):
+    """
+    generate `scale` times as many rookies and stats as the processed data frames.
+
+    The first replica is the real data itself, and every other replica is a bootstrap sample of the real rookies,
+    i.e. rookies are drawn with replacement together with all of their stats rows, so that the joint distributions
+    of rookie attributes (year, league, team, category, position) and of stats per player are kept.
+    Sampled rookies get new player IDs and names with the ID as a suffix, while team names are kept.
+
+    :param rookie_df: rookie data frame saved by `process_rookie`
+    :param stats_df: stats data frame saved by `process_stats`
+    :return: tuple of synthetic rookie and stats data frames
+    """
+
+    assert scale >= 1
+    rng = np.random.default_rng(seed)
+    n_rookies = len(rookie_df)
+    sources = np.concatenate([np.arange(n_rookies)] +
+                             [rng.integers(0, n_rookies, n_rookies) for _ in range(1, scale)])
+    is_real = np.arange(len(sources)) < n_rookies
+
+    source_ids = rookie_df['player_id'].values[sources]
+    player_ids = np.where(is_real, source_ids, int(source_ids.max()) + 1 + np.arange(len(sources)) - n_rookies)
+    player_names = rookie_df['player_name'].values[sources]
+    player_names = np.where(is_real, player_names, player_names + '_' + player_ids.astype(str).astype(object))
+
+    s_rookie_df = rookie_df.iloc[sources].reset_index(drop=True)
+    s_rookie_df['player_id'] = player_ids
+    s_rookie_df['player_name'] = player_names
+
+    players_df = pd.DataFrame({'source_id': source_ids, 'player_id': player_ids, 'player_name': player_names})
+    s_stats_df = pd.merge(stats_df.drop(columns='player_name').rename(columns={'player_id': 'source_id'}),
+                          players_df, on='source_id')
+    s_stats_df = s_stats_df.sort_values(by=['year', 'league_id', 'team_name'], kind='stable', ignore_index=True)
+    return s_rookie_df, s_stats_df[stats_df.columns]
+
+
+def load_synthetic_dfs(scale, seed=0, rookie_csv=ROOKIE_CSV, stats_csv=STATS_CSV):
+    """
+    :return: tuple of synthetic rookie and stats data frames with the columns used in the app, i.e. converted by
+        `add_rookie_columns` and `add_stats_columns`
+    """
+
+    rookie_df, stats_df = generate_dfs(pd.read_csv(rookie_csv), pd.read_csv(stats_csv), scale, seed)
+    rookie_df = add_rookie_columns(rookie_df)
+    return rookie_df, add_stats_columns(stats_df, rookie_df)
@@ -1,9 +1,12 @@
 from dataclasses import dataclass
+from functools import lru_cache
 from logging import getLogger
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.colors import DEFAULT_PLOTLY_COLORS
 
 from mydash.utils.constants import FIRST_YEAR, LAST_YEAR
@@ -12,52 +15,107 @@ from mydash.utils.df import assert_columns
 LOGGER = getLogger(__name__)
 
 
-def do_scatter_plot_play_time(rookie_df, stats_df, **kwargs):
-    assert_columns(rookie_df, ['player_name', 'player_label'])
-    assert_columns(stats_df, ['player_name', 'rookie_year', 'league_id', 'league', 'minutes'])
+SCATTER_LEAGUES = ['J1', 'J2', 'J3']
+
+
+@lru_cache(maxsize=None)
+def get_scatter_template(hover_items):
+    """
+    build skeletons of the layout and per-league traces of the play time scatter plot once, which are the same as
+    plotly.express builds for `px.scatter(..., size='minutes', color='league', hover_name=..., hover_data=...)`
+
+    :param hover_items: tuple of (column, d3-format) shown on hover
+    """
+
+    template = pio.templates[pio.templates.default]
+    hover_lines = [f'{col}=%{{customdata[{i}]{fmt}}}' for i, (col, fmt) in enumerate(hover_items)]
+    trace = {
+        'hovertemplate': '<b>%{hovertext}</b><br><br>' + '<br>'.join(hover_lines) + '<extra></extra>',
+        'marker': {
+            'sizemode': 'area',
+            'sizeref': 2. * 3600 / (30. ** 2),  # https://plotly.com/python/bubble-charts/
+            'symbol': 'circle'
+        },
+        'mode': 'markers',
+        'orientation': 'v',
+        'showlegend': True,
+        'type': 'scatter',
+        'xaxis': 'x',
+        'yaxis': 'y'
+    }
+    layout = {
+        'legend': {'itemsizing': 'constant', 'title': {'text': 'league'}, 'tracegroupgap': 0},
+        'margin': {'t': 60},
+        'template': template.to_plotly_json(),
+        'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0], 'range': [0.5, LAST_YEAR - FIRST_YEAR + 1.5],
+                  'title': {'text': 'rookie year'}},
+        'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': ''}}
+    }
+    return trace, layout, list(template.layout.colorway)
+
+
+def do_scatter_plot_play_time(rookie_df, stats_df, hover_name='stats_label', hover_data=None):
+    """
+    bubble plot of play time for each player (row) and rookie year (column).
+
+    The figure is the same as plotly.express builds, but is filled into pre-built skeletons as a plain dictionary
+    without validation, since plotly.express is the dominant cost of the callback.
+
+    :param hover_data: column -> d3-format shown on hover, or False to hide
+    """
+
+    if hover_data is None:
+        hover_data = {'minutes': ':.1f'}
+    assert_columns(rookie_df, ['player_id', 'player_label'])
+    assert_columns(stats_df, ['player_id', 'rookie_year', 'league_id', 'league', 'minutes', hover_name])
 
     rookie_df = rookie_df.reset_index(drop=True) \
         .reset_index(drop=False) \
         .rename(columns={'index': 'player_index'})
-    stats_df = pd.merge(stats_df, rookie_df[['player_name', 'player_index']], on='player_name')
+    stats_df = pd.merge(stats_df, rookie_df[['player_id', 'player_index']], on='player_id')
     stats_df['y'] = 4 * stats_df['player_index'] + stats_df['league_id']
 
-    fig = None
-    for _ in range(2):
-        # Plotly randomly fails. We can retry plotting, a hack found in the following discussion forum
-        # https://community.plotly.com/t/valueerror-invalid-value-in-basedatatypes-py/55993
-        try:
-            fig = px.scatter(stats_df, x='rookie_year', y='y', size='minutes',
-                             color='league',
-                             category_orders={'league': ['J1', 'J2', 'J3']},
-                             height=max(230, (len(rookie_df) + 1) * 80),
-                             **kwargs)
-            break
-        except Exception as e:
-            if _ == 0:
-                continue
-            LOGGER.exception(f'failed to scatter plot: {stats_df}')
-            raise e
-    assert fig is not None
-    fig.update_yaxes(range=[4 * len(rookie_df), 0])
-    fig.update_xaxes(range=[0.5, LAST_YEAR - FIRST_YEAR + 1.5])
-    fig.update_traces(
-        marker=dict(
-            sizemode='area',
-            sizeref=2. * 3600 / (30. ** 2)  # https://plotly.com/python/bubble-charts/
-        )
-    )
-    fig.update_layout(
-        yaxis=dict(
-            title_text='',
-            ticktext=rookie_df['player_label'],
-            tickvals=rookie_df['player_index'] * 4 + 2
-        ),
-        xaxis=dict(
-            title_text='rookie year'
-        )
-    )
-    return fig
+    hover_items = tuple((col, fmt) for col, fmt in hover_data.items() if fmt is not False)
+    trace_template, layout_template, colors = get_scatter_template(hover_items)
+    # plotly.express keeps the color column in customdata even if it is hidden from hover
+    custom_cols = [col for col, _ in hover_items] + ['league']
+
+    league_values = stats_df['league'].values
+    custom_values = stats_df[custom_cols].values
+    hover_values = stats_df[hover_name].values
+    size_values = stats_df['minutes'].values
+    x_values = stats_df['rookie_year'].values
+    y_values = stats_df['y'].values
+
+    leagues = SCATTER_LEAGUES + [x for x in pd.unique(league_values) if x not in SCATTER_LEAGUES]
+    data = []
+    for i, league in enumerate(leagues):
+        mask = league_values == league
+        if not mask.any():
+            continue
+        trace = dict(trace_template)
+        trace.update({
+            'customdata': custom_values[mask].tolist(),
+            'hovertext': hover_values[mask].tolist(),
+            'legendgroup': league,
+            'marker': dict(trace_template['marker'], color=colors[i % len(colors)], size=size_values[mask].tolist()),
+            'name': league,
+            'x': x_values[mask].tolist(),
+            'y': y_values[mask].tolist()
+        })
+        data.append(trace)
+
+    layout = dict(layout_template)
+    layout['height'] = max(230, (len(rookie_df) + 1) * 80)
+    layout['yaxis'] = dict(layout_template['yaxis'], range=[4 * len(rookie_df), 0],
+                           ticktext=rookie_df['player_label'].tolist(),
+                           tickvals=(rookie_df['player_index'] * 4 + 2).tolist())
+    return {'data': data, 'layout': layout}
+
+
+HISTOGRAM_BIN_SIZE = 100
+HISTOGRAM_MAX_MINUTES = 3600
+HISTOGRAM_BINS = np.arange(0, HISTOGRAM_MAX_MINUTES + HISTOGRAM_BIN_SIZE, HISTOGRAM_BIN_SIZE)
 
 
 @dataclass
@@ -67,17 +125,26 @@ class HistogramConfig:
 
 
 def do_histogram_play_time(stats_df, config: HistogramConfig):
+    """
+    histogram of play time. Minutes are binned on the server and sent as bar counts, so that the size of the figure
+    does not depend on the number of players.
+    """
+
     assert_columns(stats_df, ['league_id', 'minutes'])
 
+    starts, ends = HISTOGRAM_BINS[:-1], HISTOGRAM_BINS[1:]
     fig = go.Figure()
     for league_id, color in zip(range(1, 4), DEFAULT_PLOTLY_COLORS):
-        fig.add_trace(go.Histogram(
-            x=stats_df[stats_df['league_id'] == league_id]['minutes'],
+        counts, _ = np.histogram(stats_df[stats_df['league_id'] == league_id]['minutes'], bins=HISTOGRAM_BINS)
+        fig.add_trace(go.Bar(
+            x=(starts + ends) / 2,
+            y=counts,
+            customdata=np.stack([starts, ends - 1], axis=1),
+            hovertemplate='minutes=%{customdata[0]}-%{customdata[1]}<br>#players=%{y}',
             name=f'J{league_id}',
-            marker_color=color,
-            xbins=dict(start=0, end=3600, size=100)
+            marker_color=color
         ))
-    fig.update_xaxes(range=[0, 3600])
+    fig.update_xaxes(range=[0, HISTOGRAM_MAX_MINUTES])
     fig.update_layout(
         title=dict(
             text=f'league=J{config.league_id}, rookie year={config.rookie_year}, #stats={len(stats_df)}',
@@ -91,15 +158,47 @@ def do_histogram_play_time(stats_df, config: HistogramConfig):
     return fig
 
 
+def get_histogram_minutes_range(x_range):
+    """
+    map a box-selected range on the histogram to the minutes range of the selected bins, i.e. bins whose centers are
+    in the range. The raw range is returned when no bin is selected.
+
+    :return: [start, end] to be used as `minutes_range` of `filter_stats_df`
+    """
+
+    centers = (HISTOGRAM_BINS[:-1] + HISTOGRAM_BINS[1:]) / 2
+    selected = np.flatnonzero((centers >= x_range[0]) & (centers <= x_range[1]))
+    if len(selected) == 0:
+        return list(x_range)
+    start, end = HISTOGRAM_BINS[selected[0]], HISTOGRAM_BINS[selected[-1] + 1]
+    if end < HISTOGRAM_MAX_MINUTES:
+        end = np.nextafter(end, -np.inf)  # bins are half-open except the last one as in `np.histogram`
+    return [float(start), float(end)]
+
+
+BAR_COLOR_COLUMNS = {
+    'league': 'joined_league',
+    'category': 'prev_team_category',
+    'position': 'position'
+}
+BAR_CATEGORY_ORDERS = {
+    'league': ['J1', 'J2', 'J3'],
+    'category': ['HIGH', 'YOUTH', 'UNIV'],
+    'position': ['GK', 'DF', 'MF', 'FW']
+}
+
+
 def do_bar_plot_player_count(rookie_df, color_column='league'):
-    if color_column == 'league':
-        color_column_full = 'joined_league'
-    elif color_column == 'category':
-        color_column_full = 'prev_team_category'
-    elif color_column == 'position':
-        color_column_full = 'position'
-    else:
+    """
+    bar plot of player count for each joined year.
+
+    This is the reference implementation of `updatePlayerCountPlot` in assets/clientside.js, which builds the same
+    figure in the browser from `get_bar_plot_template`.
+    """
+
+    if color_column not in BAR_COLOR_COLUMNS:
         raise ValueError(f'unknown color column = {color_column}')
+    color_column_full = BAR_COLOR_COLUMNS[color_column]
 
     assert_columns(rookie_df, ['joined_year', color_column_full])
     count_df = rookie_df.groupby(['joined_year', color_column_full]).size() \
@@ -107,11 +206,7 @@ def do_bar_plot_player_count(rookie_df, color_column='league'):
                                        'joined_year': 'year',
                                        color_column_full: color_column})
     fig = px.bar(count_df, x='year', y='#players', color=color_column,
-                 category_orders={
-                     'league': ['J1', 'J2', 'J3'],
-                     'category': ['HIGH', 'YOUTH', 'UNIV'],
-                     'position': ['GK', 'DF', 'MF', 'FW']
-                 },
+                 category_orders=BAR_CATEGORY_ORDERS,
                  range_x=[FIRST_YEAR - 0.5, LAST_YEAR + 0.5])
     fig.update_traces(width=0.8)
     fig.update_layout(
@@ -121,3 +216,54 @@ def do_bar_plot_player_count(rookie_df, color_column='league'):
         )
     )
     return fig
+
+
+def get_player_counts(rookie_df):
+    """
+    number of players for each joined year and value of the color columns, i.e. the data of
+    `do_bar_plot_player_count` which is sent to `updatePlayerCountPlot` in assets/clientside.js instead of the rows
+
+    :return: color column -> list of [year, value, #players]
+    """
+
+    assert_columns(rookie_df, ['joined_year'] + list(BAR_COLOR_COLUMNS.values()))
+    counts = dict()
+    for color_column, col in BAR_COLOR_COLUMNS.items():
+        count_s = rookie_df.groupby(['joined_year', col]).size()
+        counts[color_column] = [[int(year), value, int(n)] for (year, value), n in count_s.items()]
+    return counts
+
+
+def get_bar_plot_template(color_column):
+    """
+    skeletons of the layout and traces of `do_bar_plot_player_count`, filled in the browser by clientside callbacks.
+    The plotly template is not included, and should be set to `layout.template` separately.
+    """
+
+    if color_column not in BAR_COLOR_COLUMNS:
+        raise ValueError(f'unknown color column = {color_column}')
+    return {
+        'column': BAR_COLOR_COLUMNS[color_column],
+        'orders': BAR_CATEGORY_ORDERS[color_column],
+        'colors': list(pio.templates[pio.templates.default].layout.colorway),
+        'trace': {
+            'alignmentgroup': 'True',
+            'hovertemplate': f'{color_column}={{value}}<br>year=%{{x}}<br>#players=%{{y}}<extra></extra>',
+            'marker': {'pattern': {'shape': ''}},
+            'orientation': 'v',
+            'showlegend': True,
+            'textposition': 'auto',
+            'xaxis': 'x',
+            'yaxis': 'y',
+            'type': 'bar',
+            'width': 0.8
+        },
+        'layout': {
+            'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0], 'title': {'text': 'year'},
+                      'range': [FIRST_YEAR - 0.5, LAST_YEAR + 0.5]},
+            'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': '#players'}},
+            'legend': {'title': {'text': color_column}, 'tracegroupgap': 0},
+            'margin': {'t': 60},
+            'barmode': 'relative'
+        }
+    }
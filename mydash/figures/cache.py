@@ -0,0 +1,95 @@
+import json
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+
+import plotly.io as pio
+
+from mydash.figures.compact import compact_figure, to_json
+from mydash.utils.metrics import CACHE_LOOKUPS, phase
+
+LOGGER = getLogger(__name__)
+
+
+class FigureCache:
+    """
+    LRU cache of serialized figures under a byte budget.
+
+    Keys should identify the data version, the normalized filters and the figure parameters, e.g.
+    `(data_version, filter_key, 'player-count', color_column)`.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, name='figure', precision=None):
+        """
+        :param name: name of the cache in metrics
+        :param precision: if given, figures are converted by `compact_figure` with the precision before caching
+        """
+
+        self.max_bytes = max_bytes
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+        self._hit_counter = CACHE_LOOKUPS.labels(name, 'hit')
+        self._miss_counter = CACHE_LOOKUPS.labels(name, 'miss')
+        self._figures = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._figures)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key):
+        with self._lock:
+            blob = self._figures.get(key)
+            if blob is None:
+                self.misses += 1
+                self._miss_counter.inc()
+                return None
+            self._figures.move_to_end(key)
+            self.hits += 1
+        self._hit_counter.inc()
+        with phase('serialize'):
+            return json.loads(blob)
+
+    def _encode(self, fig):
+        if self.precision is None:
+            return fig, pio.to_json(fig, validate=False).encode('utf-8')
+        fig = compact_figure(fig, self.precision)
+        return fig, to_json(fig)
+
+    def put(self, key, fig):
+        """
+        :return: the figure as cached, i.e. converted by `compact_figure` if `precision` is given
+        """
+
+        with phase('serialize'):
+            fig, blob = self._encode(fig)
+        if len(blob) > self.max_bytes:
+            LOGGER.debug(f'figure is too large to cache: {len(blob)} bytes')
+            return fig
+        with self._lock:
+            if key in self._figures:
+                self._bytes -= len(self._figures.pop(key))
+            self._figures[key] = blob
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._figures.popitem(last=False)
+                self._bytes -= len(evicted)
+        return fig
+
+    def get_or_build(self, key, build):
+        """
+        :param build: function which builds the figure on cache miss
+        """
+
+        fig = self.get(key)
+        if fig is None:
+            fig = self.put(key, build())
+        return fig
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self), 'bytes': self.nbytes}
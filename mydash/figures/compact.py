@@ -0,0 +1,137 @@
+import json
+import re
+from logging import getLogger
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional, a faster JSON encoder
+    orjson = None
+
+LOGGER = getLogger(__name__)
+
+FIGURE_PRECISION = 2  # decimals of numbers in compact figures, which is finer than hover formats (e.g. ":.1f")
+
+# trace types which are drawn on x/y axes, i.e. never use the other subplots of the template
+CARTESIAN_TRACE_TYPES = {'scatter', 'scattergl', 'bar', 'histogram', 'box', 'violin', 'heatmap', 'contour'}
+NON_CARTESIAN_SUBPLOTS = ['geo', 'mapbox', 'polar', 'scene', 'ternary']
+# per-point arrays of a trace which can be referred from `hovertemplate` instead of a copy in customdata
+SHARED_ARRAYS = ['x', 'y', 'marker.size', 'text', 'hovertext']
+
+RE_CUSTOMDATA = re.compile(r'customdata\[(\d+)\]')
+
+
+def _to_numeric_array(value):
+    try:
+        array = np.asarray(value)
+    except ValueError:  # ragged
+        return None
+    return array if array.dtype.kind in 'iuf' and array.size > 0 else None
+
+
+def round_values(value, precision=FIGURE_PRECISION):
+    """
+    round floats in nested lists/dicts/arrays to `precision` decimals, and write whole numbers as integers
+    """
+
+    if isinstance(value, float):
+        value = round(value, precision)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, (list, tuple, np.ndarray)):
+        array = _to_numeric_array(value)
+        if array is None:
+            return [round_values(x, precision) for x in value]
+        if array.dtype.kind == 'f':
+            array = np.round(array, precision)
+            if np.isfinite(array).all() and (array == np.floor(array)).all():
+                array = array.astype(np.int64)
+        return array.tolist()
+    if isinstance(value, dict):
+        return {k: round_values(v, precision) for k, v in value.items()}
+    return value
+
+
+def _get_path(trace, path):
+    for key in path.split('.'):
+        if not isinstance(trace, dict):
+            return None
+        trace = trace.get(key)
+    return trace
+
+
+def dedup_customdata(trace):
+    """
+    drop columns of customdata which are not used in `hovertemplate`, and refer to the per-point arrays of the trace
+    (e.g. `%{marker.size}`) instead of columns which are copies of them
+    """
+
+    customdata = trace.get('customdata')
+    hovertemplate = trace.get('hovertemplate')
+    if customdata is None or len(customdata) == 0 or hovertemplate is None:
+        return trace
+    columns = list(zip(*customdata))
+
+    shared = dict()
+    for i in sorted({int(x) for x in RE_CUSTOMDATA.findall(hovertemplate)}):
+        shared[i] = next((path for path in SHARED_ARRAYS if _get_path(trace, path) is not None and
+                          list(_get_path(trace, path)) == list(columns[i])), None)
+    kept = [i for i, path in shared.items() if path is None]
+
+    def replace(match):
+        i = int(match.group(1))
+        return shared[i] if shared[i] is not None else f'customdata[{kept.index(i)}]'
+
+    trace = dict(trace, hovertemplate=RE_CUSTOMDATA.sub(replace, hovertemplate))
+    if kept:
+        trace['customdata'] = [list(row) for row in zip(*[columns[i] for i in kept])]
+    else:
+        del trace['customdata']
+    return trace
+
+
+def prune_template(layout, trace_types):
+    """
+    drop defaults of the template for trace types and subplots which are not in the figure
+    """
+
+    template = layout.get('template')
+    if not template:
+        return layout
+    template = dict(template)
+    template['data'] = {k: v for k, v in template.get('data', dict()).items() if k in trace_types}
+    if trace_types <= CARTESIAN_TRACE_TYPES:
+        template['layout'] = {k: v for k, v in template.get('layout', dict()).items()
+                              if k not in NON_CARTESIAN_SUBPLOTS}
+    return dict(layout, template=template)
+
+
+def compact_figure(fig, precision=FIGURE_PRECISION):
+    """
+    convert a figure into a compact dictionary which is rendered in the same way, i.e.
+    numbers are rounded to `precision` decimals, duplicated or unused customdata is removed, and the template only
+    contains defaults for the traces in the figure.
+
+    :param fig: `go.Figure` or a dictionary with "data" and "layout"
+    """
+
+    if not isinstance(fig, dict):
+        fig = fig.to_plotly_json()
+    data = [dedup_customdata(trace) for trace in fig.get('data', [])]
+    layout = prune_template(fig.get('layout', dict()), {trace.get('type', 'scatter') for trace in data})
+    # numbers in the template are constants, which are not rounded
+    template = layout.pop('template', None)
+    layout = round_values(layout, precision)
+    if template is not None:
+        layout['template'] = template
+    return {'data': round_values(data, precision), 'layout': layout}
+
+
+def to_json(fig):
+    """
+    encode a plain figure dictionary (e.g. built by `compact_figure`) with orjson if available
+    """
+
+    if orjson is not None:
+        return orjson.dumps(fig, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(fig, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
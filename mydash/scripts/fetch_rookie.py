@@ -1,16 +1,31 @@
 import argparse
-import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from logging import getLogger
 
+import lxml.html
+from lxml import etree
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 
-from mydash.utils.constants import LEAGUE_IDS, YEARS
+from mydash.utils.constants import LAST_YEAR, LEAGUE_IDS, YEARS
+from mydash.utils.fetch import Fetcher
+from mydash.utils.http_cache import HTTP_CACHE, ResponseCache
 from mydash.utils.log import init_logger
+from mydash.utils.partition import PartitionedTable
 
 LOGGER = getLogger(__name__)
 
+BASE_URL = 'https://soccer-db.net/contents'
+
+UNIT_COLUMNS = ['year', 'league_id']
+RAW_COLUMNS = ['year', 'league_id', 'player_name', 'team_name', 'prev_team_name', 'birth', 'position']
+
+# classes of (main container, team, player) in the layouts before and after 2017
+LAYOUTS = [
+    ('main_contents', 'group_title', 'mini_jpn_title'),
+    ('full_contents', 'cp_middletitle', 'group_title'),
+]
+
 
 def build_rookie_url(year: int, league_id: int):
     """
@@ -18,50 +33,66 @@ def build_rookie_url(year: int, league_id: int):
     """
 
     league = 'j' if league_id == 1 else f'j{league_id}'
-    return f'https://soccer-db.net/contents/{year}_{league}_newcomers.php'
+    return f'{BASE_URL}/{year}_{league}_newcomers.php'
+
+
+# class attributes are pre-filtered by `contains` in XPath, and then matched exactly by `has_class`
+XPATH_CONTAINERS = etree.XPath('//*[contains(@class, $main)]')
+XPATH_ITEMS = etree.XPath('.//div[contains(@class, $team) or contains(@class, $player)]')
+XPATH_GT_J = etree.XPath('.//*[contains(@class, "gt_j")]')
+XPATH_FOLLOWING_DIV = etree.XPath('following::div[1]')
+XPATH_CELLS = etree.XPath('(.//table)[1]//td')
 
 
-def contains_class(div, class_name):
-    return class_name in div.attrs.get('class', [])
+def has_class(element, class_name):
+    return class_name in element.get('class', '').split()
 
 
 def extract_text(div):
-    if contains_class(div, 'group_title'):
-        return div.find(class_='gt_j').text.strip()
-    return div.text.strip()
+    if has_class(div, 'group_title'):
+        return next(e for e in XPATH_GT_J(div) if has_class(e, 'gt_j')).text_content().strip()
+    return div.text_content().strip()
+
+
+def find_next_div(div):
+    """
+    :return: the next div in document order, i.e. the first div inside `div` or the first div after `div`
+    """
+
+    next_div = next(div.iterdescendants('div'), None)
+    return next_div if next_div is not None else XPATH_FOLLOWING_DIV(div)[0]
 
 
 def extract_player_meta(div):
-    cells = div.find('table').find_all('td')
+    cells = XPATH_CELLS(div)
     meta = {
-        'position': cells[0].text.strip(),
-        'birth': cells[2].text.strip(),
-        'prev_team_name': cells[3].text.strip()
+        'position': cells[0].text_content().strip(),
+        'birth': cells[2].text_content().strip(),
+        'prev_team_name': cells[3].text_content().strip()
     }
     return meta
 
 
-def fetch_players(year, league_id):
-    url = build_rookie_url(year, league_id)
-    LOGGER.info(f'fetch players from {url}')
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, features="lxml")
-    time.sleep(1)
-
-    if soup.find(class_='main_contents'):
-        main_tag, team_tag, player_tag = 'main_contents', 'group_title', 'mini_jpn_title'
-    elif soup.find(class_='full_contents'):  # after 2017
-        main_tag, team_tag, player_tag = 'full_contents', 'cp_middletitle', 'group_title'
+def parse_players(html, year, league_id):
+    """
+    parse a newcomers page of Soccer D.B. Instead of walking all divs of the page, only divs of teams and players
+    in the main container are selected by XPath, together with the div next to each player which holds its table.
+    """
+
+    root = lxml.html.fromstring(html)
+    for main_tag, team_tag, player_tag in LAYOUTS:
+        containers = [e for e in XPATH_CONTAINERS(root, main=main_tag) if has_class(e, main_tag)]
+        if containers:
+            break
     else:
-        raise ValueError(f'failed to find main/full_contents in {url}')
+        raise ValueError(f'failed to find main/full_contents: year={year}, league_id={league_id}')
 
     records = []
     team_name = None
-    divs = soup.find(class_=main_tag).find_all('div')
-    for i, div in enumerate(divs):
-        if contains_class(div, team_tag):
+    for div in XPATH_ITEMS(containers[0], team=team_tag, player=player_tag):
+        if has_class(div, team_tag):
             team_name = extract_text(div)
-        if contains_class(div, player_tag):
+        if has_class(div, player_tag):
             assert team_name
             record = {
                 'year': year,
@@ -69,20 +100,90 @@ def fetch_players(year, league_id):
                 'team_name': team_name,
                 'player_name': extract_text(div)
             }
-            record.update(extract_player_meta(divs[i + 1]))
+            record.update(extract_player_meta(find_next_div(div)))
             records.append(record)
 
-    LOGGER.info(f'fetched {len(records)} players')
+    LOGGER.info(f'parsed {len(records)} players: year={year}, league_id={league_id}')
     return records
 
 
+def try_parse_players(page):
+    html, year, league_id = page
+    try:
+        return parse_players(html, year, league_id)
+    except Exception:
+        LOGGER.exception(f'failed to parse players: year={year}, league_id={league_id}')
+        return None
+
+
+def parse_pages(pages, executor=None):
+    """
+    :param pages: list of (html, year, league_id)
+    :param executor: `ProcessPoolExecutor` to parse pages in parallel, or None to parse them in this process
+    :return: list of records for each page, or None if failed to parse it
+    """
+
+    if executor is None:
+        return [try_parse_players(page) for page in pages]
+    return list(executor.map(try_parse_players, pages))
+
+
+def fetch_page(fetcher: Fetcher, year, league_id):
+    url = build_rookie_url(year, league_id)
+    LOGGER.info(f'fetch players from {url}')
+    return fetcher.get(url, immutable=year < LAST_YEAR).text
+
+
+def fetch_partitions(fetcher: Fetcher, table: PartitionedTable, years, resume=False, processes=1):
+    """
+    fetch rookies of each (year, league) unit into the season partitions
+
+    :param resume: skip units which have been fetched completely, except those of the current season
+    :param processes: number of processes to parse pages
+    :return: units which failed to be fetched
+    """
+
+    def try_fetch_page(unit):
+        try:
+            return fetch_page(fetcher, *unit)
+        except Exception:
+            LOGGER.exception(f'failed to fetch players: {unit}')
+            return None
+
+    failed_units = []
+    with ExitStack() as stack:
+        executor = stack.enter_context(ProcessPoolExecutor(processes)) if processes > 1 else None
+        for year in years:
+            units = [(year, league_id) for league_id in LEAGUE_IDS]
+            if resume and year < LAST_YEAR:
+                units = [unit for unit in units if not table.is_complete(unit)]
+
+            pages = fetcher.map(try_fetch_page, units)
+            failed_units += [unit for unit, page in zip(units, pages) if page is None]
+            fetched = [(unit, page) for unit, page in zip(units, pages) if page is not None]
+            records_list = parse_pages([(page, *unit) for unit, page in fetched], executor)
+
+            unit_dfs = dict()
+            for (unit, _), records in zip(fetched, records_list):
+                if records is None:
+                    failed_units.append(unit)
+                else:
+                    unit_dfs[unit] = pd.DataFrame(records, columns=RAW_COLUMNS)
+            table.write_units(year, unit_dfs)
+    return failed_units
+
+
 def main():
-    records = []
-    for year in YEARS:
-        for league_id in LEAGUE_IDS:
-            records += fetch_players(year, league_id)
-    out_df = pd.DataFrame(records)
-    out_df = out_df[['year', 'league_id', 'player_name', 'team_name', 'prev_team_name', 'birth', 'position']]
+    table = PartitionedTable(args.out_dir, UNIT_COLUMNS)
+    years = [year for year in YEARS if args.since is None or year >= args.since]
+    cache = None if args.no_cache else ResponseCache(args.cache, ttl=args.ttl, offline=args.offline)
+    with Fetcher(rate=args.rate, burst=args.burst, max_workers=args.workers, retries=args.retries,
+                 cache=cache) as fetcher:
+        failed_units = fetch_partitions(fetcher, table, years, resume=args.resume, processes=args.processes)
+    if failed_units:
+        raise RuntimeError(f'failed to fetch {len(failed_units)} units, run again with --resume: {failed_units}')
+
+    out_df = table.read_all()[RAW_COLUMNS]
     out_df.to_csv(args.out, index=False)
     LOGGER.info(f'saved rookies in {args.out}')
 
@@ -90,6 +191,19 @@ def main():
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Soccer D.B.から新卒選手を取得する')
     parser.add_argument('-o', '--out', help='出力ファイル名', default='./data/rookie_raw.csv')
+    parser.add_argument('-p', '--out-dir', help='シーズンごとのパーティションの出力先', default='./data/rookie_raw')
+    parser.add_argument('--since', help='この年以降のシーズンのみ取得する', type=int)
+    parser.add_argument('--resume', action='store_true', help='取得済みのユニットを飛ばす（今シーズンを除く）')
+    parser.add_argument('--processes', help='HTMLをパースするプロセス数', type=int, default=1)
+    parser.add_argument('-r', '--rate', help='ホストごとの最大リクエスト数 (毎秒)', type=float, default=1.0)
+    parser.add_argument('-b', '--burst', help='ホストごとの最大同時リクエスト数', type=int, default=1)
+    parser.add_argument('-w', '--workers', help='並列数', type=int, default=4)
+    parser.add_argument('--retries', help='リトライ回数', type=int, default=3)
+    parser.add_argument('--cache', help='レスポンスのキャッシュディレクトリ', default=HTTP_CACHE)
+    parser.add_argument('--ttl', help='キャッシュの有効期間 (秒)。過去シーズンのキャッシュは常に有効', type=int,
+                        default=24 * 60 * 60)
+    parser.add_argument('--offline', action='store_true', help='リクエストを送信せずにキャッシュのみを使う')
+    parser.add_argument('--no-cache', action='store_true', help='キャッシュを使わない')
     parser.add_argument('-v', '--verbose', action='store_true')
     args = parser.parse_args()
     init_logger(args.verbose)
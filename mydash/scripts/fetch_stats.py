@@ -1,20 +1,39 @@
 import argparse
-import time
+import re
 from dataclasses import dataclass, asdict
 from logging import getLogger
 
+import numpy as np
 import pandas as pd
-import requests
+import lxml.html
+from lxml import etree
 
 from mydash.utils.common import build_url
-from mydash.utils.constants import LEAGUE_IDS, YEARS
+from mydash.utils.constants import LAST_YEAR, LEAGUE_IDS, YEARS
+from mydash.utils.fetch import Fetcher
+from mydash.utils.http_cache import HTTP_CACHE, ResponseCache
 from mydash.utils.log import init_logger
+from mydash.utils.partition import PartitionedTable
 
 LOG_DATE_FORMAT = "%Y-%m-%d %I:%M:%S"
 LOG_FORMAT = '%(asctime)s [%(name)s] %(levelname)s: %(message)s'
 
 LOGGER = getLogger(__name__)
 
+BASE_URL = 'https://data.j-league.or.jp/SFPR01'
+
+UNIT_COLUMNS = ['year', 'comp_id', 'team_id']
+RAW_COLUMNS = ['year', 'league_id', 'comp_id', 'team_id', 'team_name', 'player_name', 'apps', 'minutes', 'goals']
+
+# same as `pd.read_html`, which strips cells and collapses line breaks or repeated spaces into a space
+RE_WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+RE_TABLE_TAG = re.compile(rb'<(/?)table\b', re.IGNORECASE)
+RE_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+XPATH_TABLE_ROWS = etree.XPath('./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr')
+XPATH_ROW_CELLS = etree.XPath('./td | ./th')
+# the player table and the competition table
+N_STATS_TABLES = 2
+
 
 @dataclass
 class Competition:
@@ -48,7 +67,7 @@ def build_stats_url(year, frame_id, comp_id, team_id):
     :param team_id: unique team ID. use `fetch_teams(comp_id)` to get available IDs
     """
 
-    url = 'https://data.j-league.or.jp/SFPR01/search'
+    url = f'{BASE_URL}/search'
     query = {
         'competition_year': year,
         'competition_frame_id': frame_id,
@@ -58,33 +77,114 @@ def build_stats_url(year, frame_id, comp_id, team_id):
     return build_url(url, query)
 
 
-def fetch_stats(comp: Competition, team: Team):
+def count_tables(content):
+    """
+    :return: number of top-level tables, counted without parsing the page
+    """
+
+    depth = 0
+    count = 0
+    for match in RE_TABLE_TAG.finditer(content):
+        if match.group(1):
+            depth = max(depth - 1, 0)
+        else:
+            count += depth == 0
+            depth += 1
+    return count
+
+
+def slice_first_table(content):
+    """
+    :return: bytes of the first table including nested tables, found without parsing the page
+    """
+
+    depth = 0
+    start = None
+    for match in RE_TABLE_TAG.finditer(content):
+        if start is None:
+            start = match.start()
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return content[start:content.index(b'>', match.end()) + 1]
+    if start is None:
+        raise ValueError('failed to find a table')
+    return content[start:]
+
+
+def extract_first_table(content, encoding=None):
+    """
+    :param content: HTML as bytes or str
+    :param encoding: encoding of `content` in bytes, or None to detect it from <meta>
+    :return: cell texts of the last header row (None without header rows) and of the other rows in the first table.
+        Only the table is parsed.
+    """
+
+    if isinstance(content, str):
+        content, encoding = content.encode('utf-8'), 'utf-8'
+    if encoding is None:
+        match = RE_META_CHARSET.search(content)
+        encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    table = lxml.html.fragment_fromstring(slice_first_table(content).decode(encoding, errors='replace'))
+
+    header = None
+    rows = []
+    is_header = True
+    for tr in XPATH_TABLE_ROWS(table):
+        cells = XPATH_ROW_CELLS(tr)
+        texts = [RE_WHITESPACE.sub(' ', cell.text_content().strip()) for cell in cells]
+        # leading rows only with <th>, or rows in <thead>, are header rows like `pd.read_html`
+        is_header = (is_header and all(cell.tag == 'th' for cell in cells)) or tr.getparent().tag == 'thead'
+        if is_header:
+            header = texts
+        else:
+            rows.append(texts)
+    return header, rows
+
+
+def parse_stats(content, encoding=None):
+    """
+    parse the player table of the J.League Data Site into typed column arrays, i.e. name, apps, minutes and goals
+    in 2nd-5th columns
+
+    :param content: HTML as bytes or str
+    :param encoding: encoding of `content` in bytes, or None to detect it from <meta>
+    :return: dict of column name to array
+    """
+
+    n_tables = count_tables(content.encode('utf-8') if isinstance(content, str) else content)
+    if n_tables != N_STATS_TABLES:
+        raise ValueError(f'expected {N_STATS_TABLES} tables but found {n_tables}')
+    header, rows = extract_first_table(content, encoding)
+    n_cells = len(header) if header is not None else len(rows[0]) if rows else 5
+    if n_cells < 5:
+        raise ValueError(f'expected at least 5 columns but found {n_cells}')
+    for i, row in enumerate(rows):
+        if len(row) != n_cells:
+            raise ValueError(f'expected {n_cells} cells but found {len(row)} in row {i}: {row}')
+    columns = list(zip(*rows)) if rows else [()] * 5
+    stats = {'player_name': np.array([s.strip() for s in columns[1]], dtype=object)}
+    for col, values in zip(['apps', 'minutes', 'goals'], columns[2:5]):
+        stats[col] = np.array([int(s.replace(',', '')) for s in values], dtype=np.int64)
+    return stats
+
+
+def fetch_stats(fetcher: Fetcher, comp: Competition, team: Team):
     stats_url = build_stats_url(comp.year, comp.frame_id, comp.comp_id, team.team_id)
     LOGGER.info(f'fetch stats from {stats_url}')
-    dfs = pd.read_html(stats_url)
-    assert len(dfs) == 2
-    df = dfs[0]
-    time.sleep(1)
+    response = fetcher.get(stats_url, immutable=comp.year < LAST_YEAR)
+    # let lxml detect the encoding from <meta> unless the charset is given in the header
+    encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else None
+    stats = parse_stats(response.content, encoding)
+    LOGGER.info(f'fetched {len(stats["player_name"])} stats')
+    return stats
 
-    records = []
-    for _, row in df.iterrows():
-        records.append(Stats(
-            player_name=row[1].strip(),
-            apps=int(row[2]),
-            minutes=int(row[3]),
-            goals=int(row[4])
-        ))
-    LOGGER.info(f'fetched {len(records)} stats')
-    return records
 
-
-def fetch_teams(comp: Competition):
-    url = 'https://data.j-league.or.jp/SFPR01/createTeams'
+def fetch_teams(fetcher: Fetcher, comp: Competition):
+    url = f'{BASE_URL}/createTeams'
     payload = {'competition_id': comp.comp_id}
     LOGGER.info(f'fetch teams from {url} : {payload}')
-    response = requests.post(url, payload)
+    response = fetcher.post(url, payload, immutable=comp.year < LAST_YEAR)
     data = response.json()
-    time.sleep(1)
 
     records = []
     for item in data['teamList']:
@@ -96,41 +196,90 @@ def fetch_teams(comp: Competition):
     return records
 
 
-def fetch_competitions(year):
+def fetch_competitions(fetcher: Fetcher, year, frame_id):
+    url = f'{BASE_URL}/createCompetitions'
+    payload = {'competition_year': year, 'competition_frame_id': frame_id}
+    LOGGER.info(f'fetch competitions from {url}: {payload}')
+    response = fetcher.post(url, payload, immutable=year < LAST_YEAR)
+    data = response.json()
+
     records = []
-    for frame_id in LEAGUE_IDS:
-        url = 'https://data.j-league.or.jp/SFPR01/createCompetitions'
-        payload = {'competition_year': year, 'competition_frame_id': frame_id}
-        LOGGER.info(f'fetch competitions from {url}: {payload}')
-        response = requests.post(url, payload)
-        data = response.json()
-        time.sleep(1)
-
-        for item in data['competitionList']:
-            records.append(Competition(
-                comp_id=int(item['selectValue']),
-                comp_name=item['displayName'].strip(),
-                year=int(year),
-                frame_id=int(frame_id)
-            ))
-        LOGGER.info(f'fetched {len(records)} competitions')
+    for item in data['competitionList']:
+        records.append(Competition(
+            comp_id=int(item['selectValue']),
+            comp_name=item['displayName'].strip(),
+            year=int(year),
+            frame_id=int(frame_id)
+        ))
+    LOGGER.info(f'fetched {len(records)} competitions')
     return records
 
 
+def fetch_comp_teams(fetcher: Fetcher, years):
+    keys = [(year, frame_id) for year in years for frame_id in LEAGUE_IDS]
+    comps = [comp for comps in fetcher.map(lambda key: fetch_competitions(fetcher, *key), keys) for comp in comps]
+    teams_list = fetcher.map(lambda comp: fetch_teams(fetcher, comp), comps)
+    return [(comp, team) for comp, teams in zip(comps, teams_list) for team in teams]
+
+
+def build_stats_df(comp: Competition, team: Team, stats):
+    """
+    :param stats: column arrays of `Stats` returned by `parse_stats`
+    """
+
+    stats_df = pd.DataFrame({col: stats[col] for col in Stats.__annotations__})
+    stats_df = stats_df.assign(**asdict(comp), **asdict(team))
+    return stats_df.rename(columns={'frame_id': 'league_id'})[RAW_COLUMNS]
+
+
+def fetch_partitions(fetcher: Fetcher, table: PartitionedTable, years, resume=False):
+    """
+    fetch stats of each (year, competition, team) unit into the season partitions. Competitions and teams are fetched
+    first, and then stats are fetched concurrently season by season, so that the progress is saved at every season.
+
+    :param resume: skip units which have been fetched completely, except those of the current season
+    :return: units which failed to be fetched
+    """
+
+    def try_fetch_stats(comp_team):
+        try:
+            return fetch_stats(fetcher, *comp_team)
+        except Exception:
+            LOGGER.exception(f'failed to fetch stats: {comp_team}')
+            return None
+
+    comp_teams = fetch_comp_teams(fetcher, years)
+    failed_units = []
+    for year in years:
+        year_comp_teams = [(comp, team) for comp, team in comp_teams if comp.year == year]
+        if resume and year < LAST_YEAR:
+            year_comp_teams = [(comp, team) for comp, team in year_comp_teams
+                               if not table.is_complete((year, comp.comp_id, team.team_id))]
+        LOGGER.info(f'fetch {len(year_comp_teams)} units of {year}')
+
+        unit_dfs = dict()
+        for (comp, team), stats in zip(year_comp_teams, fetcher.map(try_fetch_stats, year_comp_teams)):
+            unit = (year, comp.comp_id, team.team_id)
+            if stats is None:
+                failed_units.append(unit)
+            else:
+                unit_dfs[unit] = build_stats_df(comp, team, stats)
+        table.write_units(year, unit_dfs)
+    return failed_units
+
+
 def main():
-    records = []
-    for year in YEARS:
-        for comp in fetch_competitions(year):
-            for team in fetch_teams(comp):
-                for stat in fetch_stats(comp, team):
-                    record = dict()
-                    record.update(asdict(comp))
-                    record.update(asdict(team))
-                    record.update(asdict(stat))
-                    records.append(record)
-    out_df = pd.DataFrame(records)
-    out_df = out_df[['year', 'frame_id', 'team_name', 'player_name', 'apps', 'minutes', 'goals']]
-    out_df = out_df.rename(columns={'frame_id': 'league_id'})
+    table = PartitionedTable(args.out_dir, UNIT_COLUMNS)
+    years = [year for year in YEARS if args.since is None or year >= args.since]
+    cache = None if args.no_cache else ResponseCache(args.cache, ttl=args.ttl, offline=args.offline)
+    with Fetcher(rate=args.rate, burst=args.burst, max_workers=args.workers, retries=args.retries,
+                 cache=cache) as fetcher:
+        failed_units = fetch_partitions(fetcher, table, years, resume=args.resume)
+    if failed_units:
+        raise RuntimeError(f'failed to fetch {len(failed_units)} units, run again with --resume: {failed_units}')
+
+    out_df = table.read_all()
+    out_df = out_df[['year', 'league_id', 'team_name', 'player_name', 'apps', 'minutes', 'goals']]
     out_df.to_csv(args.out, index=False)
     LOGGER.info(f'saved stats in {args.out}')
 
@@ -138,6 +287,18 @@ def main():
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='J.LEAGUE Data Siteから出場記録を取得する')
     parser.add_argument('-o', '--out', help='出力ファイル名', default='./data/stats_raw.csv')
+    parser.add_argument('-p', '--out-dir', help='シーズンごとのパーティションの出力先', default='./data/stats_raw')
+    parser.add_argument('--since', help='この年以降のシーズンのみ取得する', type=int)
+    parser.add_argument('--resume', action='store_true', help='取得済みのユニットを飛ばす（今シーズンを除く）')
+    parser.add_argument('-r', '--rate', help='ホストごとの最大リクエスト数 (毎秒)', type=float, default=1.0)
+    parser.add_argument('-b', '--burst', help='ホストごとの最大同時リクエスト数', type=int, default=1)
+    parser.add_argument('-w', '--workers', help='並列数', type=int, default=4)
+    parser.add_argument('--retries', help='リトライ回数', type=int, default=3)
+    parser.add_argument('--cache', help='レスポンスのキャッシュディレクトリ', default=HTTP_CACHE)
+    parser.add_argument('--ttl', help='キャッシュの有効期間 (秒)。過去シーズンのキャッシュは常に有効', type=int,
+                        default=24 * 60 * 60)
+    parser.add_argument('--offline', action='store_true', help='リクエストを送信せずにキャッシュのみを使う')
+    parser.add_argument('--no-cache', action='store_true', help='キャッシュを使わない')
     parser.add_argument('-v', '--verbose', action='store_true')
     args = parser.parse_args()
     init_logger(args.verbose)
@@ -1,28 +1,30 @@
 import argparse
+import os
 from logging import getLogger
 
+import numpy as np
 import pandas as pd
 
-from mydash.utils.canonicalize import canonicalize_player, canonicalize_team
-from mydash.utils.categorize import categorize_team
-from mydash.utils.common import clean_name, clean_text
+from mydash.utils.canonicalize import CANONICAL_MEMO, CanonicalMemo, canonicalize_column
+from mydash.utils.df import add_rookie_columns
 from mydash.utils.log import init_logger
+from mydash.utils.snapshot import write_snapshot
 
 LOGGER = getLogger(__name__)
 
 
-def update_columns(rookie_df):
+def update_columns(rookie_df, memo=None):
     p_rookie_df = rookie_df.copy()
 
     for col in ['player_name']:
-        p_rookie_df[col] = p_rookie_df[col].apply(lambda x: canonicalize_player(clean_name(x)))
+        p_rookie_df[col] = canonicalize_column(p_rookie_df[col], 'player', memo)
         LOGGER.info(f'updated \"{col}\" column')
 
     for col in ['team_name', 'prev_team_name']:
-        p_rookie_df[col] = p_rookie_df[col].apply(lambda x: canonicalize_team(clean_text(x)))
+        p_rookie_df[col] = canonicalize_column(p_rookie_df[col], 'team', memo)
         LOGGER.info(f'updated \"{col}\" column')
 
-    p_rookie_df['prev_team_category'] = p_rookie_df['prev_team_name'].apply(lambda x: categorize_team(x).name)
+    p_rookie_df['prev_team_category'] = canonicalize_column(p_rookie_df['prev_team_name'], 'team_category', memo)
     LOGGER.info('added \"prev_team_category\" column')
 
     return p_rookie_df
@@ -35,25 +37,60 @@ def add_rookie(rookie_df, add_df):
     return p_rookie_df
 
 
+def assign_player_id(rookie_df, prev_rookie_df=None):
+    """
+    assign a stable integer `player_id` to each rookie identified by (year, player_name, birth).
+    IDs in the previous output are kept, and new rookies get new IDs in order of rows.
+    """
+
+    key = ['year', 'player_name', 'birth']
+    p_rookie_df = rookie_df.drop(columns=['player_id'], errors='ignore')
+    if prev_rookie_df is not None and 'player_id' in prev_rookie_df.columns:
+        p_rookie_df = pd.merge(p_rookie_df, prev_rookie_df[key + ['player_id']], on=key, how='left')
+        next_id = int(prev_rookie_df['player_id'].max()) + 1
+    else:
+        p_rookie_df['player_id'] = np.nan
+        next_id = 1
+    p_rookie_df.index = rookie_df.index
+
+    is_new = p_rookie_df['player_id'].isna()
+    p_rookie_df.loc[is_new, 'player_id'] = np.arange(next_id, next_id + is_new.sum())
+    p_rookie_df['player_id'] = p_rookie_df['player_id'].astype(int)
+    assert not p_rookie_df['player_id'].duplicated().any()
+    LOGGER.info(f'assigned player_id: #kept={(~is_new).sum()}, #new={is_new.sum()}')
+    return p_rookie_df
+
+
 def main():
     rookie_df = pd.read_csv(args.rookie)
     add_df = pd.read_csv(args.add)
+    prev_rookie_df = pd.read_csv(args.out) if os.path.exists(args.out) else None
 
-    rookie_df = update_columns(rookie_df)
+    memo = CanonicalMemo(args.memo)
+    rookie_df = update_columns(rookie_df, memo)
+    memo.save()
     rookie_df = rookie_df[['year', 'league_id', 'player_name', 'team_name', 'prev_team_name', 'prev_team_category',
                            'birth', 'position']]
     rookie_df = add_rookie(rookie_df, add_df)
     rookie_df = rookie_df.sort_values(by=['year', 'league_id', 'team_name', 'player_name'])
+    rookie_df = assign_player_id(rookie_df, prev_rookie_df)
+    rookie_df = rookie_df[['player_id'] + [col for col in rookie_df.columns if col != 'player_id']]
 
     rookie_df.to_csv(args.out, index=False)
     LOGGER.info(f'saved {args.out}')
 
+    if args.snapshot:
+        write_snapshot(add_rookie_columns(rookie_df.reset_index(drop=True)), args.snapshot)
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='ダウンロードした新卒選手一覧の前処理を行う')
     parser.add_argument('-r', '--rookie', help='fetch_rookie.pyで取得したrookieファイル', default='./data/rookie_raw.csv')
     parser.add_argument('-a', '--add', help='追加するルーキーを登録したファイル', default='./data/rookie_add.csv')
     parser.add_argument('-o', '--out', help='出力ファイル', default='./data/rookie.csv')
+    parser.add_argument('-s', '--snapshot', help='アプリ用スナップショットの出力先（空文字列で出力しない）',
+                        default='./data/rookie.snapshot')
+    parser.add_argument('-m', '--memo', help='正規化結果のキャッシュファイル（空文字列で保存しない）', default=CANONICAL_MEMO)
     parser.add_argument('-v', '--verbose', action='store_true')
     args = parser.parse_args()
     init_logger(args.verbose)
@@ -1,38 +1,59 @@
 import argparse
+import os
 from logging import getLogger
 
 import pandas as pd
 
-from mydash.utils.canonicalize import canonicalize_team, canonicalize_player
-from mydash.utils.common import clean_text, clean_name
+from mydash.utils.canonicalize import CANONICAL_MEMO, CanonicalMemo, canonicalize_column
+from mydash.utils.cube import StatsCube
+from mydash.utils.df import add_rookie_columns, add_stats_columns, get_data_version
 from mydash.utils.log import init_logger
+from mydash.utils.partition import PartitionCache, PartitionedTable, hash_df
+from mydash.utils.snapshot import write_snapshot
 
 LOGGER = getLogger(__name__)
 
+RAW_COLUMNS = ['year', 'league_id', 'team_name', 'player_name', 'apps', 'minutes', 'goals']
+OUT_COLUMNS = ['year', 'league_id', 'team_name', 'player_id', 'player_name', 'apps', 'minutes', 'goals']
+DROP_COLUMNS = ['player_name', 'year', 'team_name']
 
-def update_columns(stats_df):
+
+def update_columns(stats_df, memo=None):
     p_stats_df = stats_df.copy()
 
     for col in ['player_name']:
-        p_stats_df[col] = p_stats_df[col].apply(lambda x: canonicalize_player(clean_name(x)))
+        p_stats_df[col] = canonicalize_column(p_stats_df[col], 'player', memo)
         LOGGER.info(f'updated \"{col}\" column')
 
     for col in ['team_name']:
-        p_stats_df[col] = p_stats_df[col].apply(lambda x: canonicalize_team(clean_text(x)))
+        p_stats_df[col] = canonicalize_column(p_stats_df[col], 'team', memo)
         LOGGER.info(f'updated \"{col}\" column')
 
     return p_stats_df
 
 
 def filter_rookie(stats_df, rookie_df):
-    p_stats_df = pd.merge(stats_df, rookie_df[['player_name']], on='player_name')
-    LOGGER.info('filtered rookie stats: {} -> {}'.format(len(stats_df), len(p_stats_df)))
-    return p_stats_df
+    """
+    keep stats of rookies and assign their `player_id`. When rookies share the same name, stats are assigned to the
+    rookie who joined last in or before the stats year, or to the earliest one if all of them joined after that.
+    """
+
+    candidate_df = pd.merge(stats_df.reset_index(drop=True).reset_index(),
+                            rookie_df[['player_id', 'player_name', 'year']].rename(columns={'year': 'joined_year'}),
+                            on='player_name')
+    candidate_df['joined'] = candidate_df['joined_year'] <= candidate_df['year']
+    candidate_df['priority'] = candidate_df['joined_year'].where(candidate_df['joined'], -candidate_df['joined_year'])
+    p_stats_df = candidate_df.sort_values(by=['index', 'joined', 'priority'], ascending=[True, False, False]) \
+        .drop_duplicates(subset=['index'], keep='first') \
+        .drop(columns=['index', 'joined_year', 'joined', 'priority'])
+    LOGGER.info('filtered rookie stats: {} -> {} (#homonyms={})'.format(
+        len(stats_df), len(p_stats_df), len(candidate_df) - len(p_stats_df)))
+    return p_stats_df.reset_index(drop=True)
 
 
 def drop_stats(stats_df, drop_df):
     drop_df['drop'] = True
-    p_stats_df = pd.merge(stats_df, drop_df, on=['player_name', 'year', 'team_name'], how='left')
+    p_stats_df = pd.merge(stats_df, drop_df, on=DROP_COLUMNS, how='left')
     p_stats_df['drop'] = p_stats_df['drop'].fillna(False)
     p_stats_df = p_stats_df[~p_stats_df['drop']]
     p_stats_df = p_stats_df.drop(['drop'], axis=1)
@@ -42,32 +63,150 @@ def drop_stats(stats_df, drop_df):
 
 
 def merge_stats(stats_df):
-    p_stats_df = stats_df.groupby(['year', 'league_id', 'team_name', 'player_name']).sum().reset_index()
+    p_stats_df = stats_df.groupby(['year', 'league_id', 'team_name', 'player_name', 'player_id']).sum().reset_index()
     LOGGER.info('merged separated stats: {} -> {}'.format(len(stats_df), len(p_stats_df)))
     return p_stats_df
 
 
-def main():
-    stats_df = pd.read_csv(args.stats)
-    rookie_df = pd.read_csv(args.rookie)
-    drop_df = pd.read_csv(args.drop)
-
-    stats_df = update_columns(stats_df)  # update column first to canonicalize player names before joining
+def process_stats(stats_df, rookie_df, drop_df, memo=None):
+    stats_df = update_columns(stats_df, memo)  # update column first to canonicalize player names before joining
     stats_df = filter_rookie(stats_df, rookie_df)
     stats_df = drop_stats(stats_df, drop_df)
     stats_df = merge_stats(stats_df)
-    stats_df = stats_df[['year', 'league_id', 'team_name', 'player_name', 'apps', 'minutes', 'goals']]
+    return stats_df[OUT_COLUMNS]
+
+
+def process_stats_chunked(chunks, rookie_df, drop_df, memo=None):
+    """
+    same as `process_stats` over the concatenation of `chunks`, e.g. `pd.read_csv(..., chunksize=...)`, but yields
+    the processed stats year by year as soon as a later year is read, so that they can be written out incrementally.
+    `chunks` must be sorted by year, as `fetch_stats.py` writes them. Retained are a chunk, the merged stats of the
+    year being read, and key sets of rookies and dropped stats, which do not grow with the stats.
+
+    :return: generator of processed stats, whose concatenation equals the output of `process_stats`
+    """
+
+    rookie_names = set(rookie_df['player_name'])
+    drop_keys = pd.MultiIndex.from_frame(drop_df[DROP_COLUMNS])
+    open_df = None  # merged stats of the years which may continue in the next chunk
+    last_year = None
+    n_rows, n_dropped, n_out = 0, 0, 0
+    for chunk_df in chunks:
+        if len(chunk_df) == 0:
+            continue
+        n_rows += len(chunk_df)
+        years = chunk_df['year']
+        if not years.is_monotonic_increasing or (last_year is not None and years.iloc[0] < last_year):
+            raise ValueError('stats must be sorted by year to be processed in chunks')
+        last_year = years.iloc[-1]
+
+        chunk_df = update_columns(chunk_df[RAW_COLUMNS], memo)
+        chunk_df = chunk_df[chunk_df['player_name'].isin(rookie_names)]
+        if len(chunk_df) > 0:
+            chunk_df = filter_rookie(chunk_df, rookie_df)
+            is_dropped = pd.MultiIndex.from_frame(chunk_df[DROP_COLUMNS]).isin(drop_keys)
+            n_dropped += int(is_dropped.sum())
+            chunk_df = chunk_df[~is_dropped]
+            open_df = merge_stats(chunk_df if open_df is None else pd.concat([open_df, chunk_df]))
+
+        if open_df is not None:
+            is_closed = open_df['year'] < last_year
+            if is_closed.any():
+                n_out += int(is_closed.sum())
+                yield open_df[is_closed][OUT_COLUMNS].reset_index(drop=True)
+                open_df = open_df[~is_closed].reset_index(drop=True)
+
+    if open_df is not None and len(open_df) > 0:
+        n_out += len(open_df)
+        yield open_df[OUT_COLUMNS]
+    assert n_dropped == len(drop_df)
+    LOGGER.info(f'processed stats in chunks: {n_rows} -> {n_out}')
+
+
+def write_stats_chunked(chunks, rookie_df, drop_df, path, memo=None):
+    """
+    write the output of `process_stats_chunked` to a csv file year by year
+
+    :return: number of written rows
+    """
+
+    n_out = 0
+    with open(path, 'w', newline='') as f:
+        pd.DataFrame(columns=OUT_COLUMNS).to_csv(f, index=False)
+        for stats_df in process_stats_chunked(chunks, rookie_df, drop_df, memo):
+            stats_df.to_csv(f, index=False, header=False)
+            n_out += len(stats_df)
+    return n_out
+
+
+def process_partitions(stats_df, rookie_df, drop_df, cache: PartitionCache, memo: CanonicalMemo):
+    """
+    process stats season by season, and rebuild only seasons whose raw stats, rookies or dropped stats are changed,
+    or all seasons when the normalization rules are changed
+    """
+
+    rookie_hash = hash_df(rookie_df)
+    stats_dfs = []
+    for year, year_stats_df in stats_df.groupby('year', sort=True):
+        year_stats_df = year_stats_df.reset_index(drop=True)
+        year_drop_df = drop_df[drop_df['year'] == year].reset_index(drop=True)
+        input_hash = '-'.join([hash_df(year_stats_df), rookie_hash, hash_df(year_drop_df), memo.version])
+        stats_dfs.append(cache.get_or_build(
+            year, input_hash, lambda: process_stats(year_stats_df, rookie_df, year_drop_df, memo)))
+    return pd.concat(stats_dfs, ignore_index=True)
 
-    stats_df.to_csv(args.out, index=False)
+
+def main():
+    rookie_df = pd.read_csv(args.rookie)
+    drop_df = pd.read_csv(args.drop)
+    memo = CanonicalMemo(args.memo)
+
+    if args.chunksize:
+        chunks = pd.read_csv(args.stats, usecols=RAW_COLUMNS, chunksize=args.chunksize)
+        write_stats_chunked(chunks, rookie_df, drop_df, args.out, memo)
+        memo.save()
+        # processed stats are much smaller than raw stats and are needed as a whole for the snapshot and the cube
+        stats_df = pd.read_csv(args.out)
+    else:
+        if os.path.isdir(args.stats):
+            stats_df = PartitionedTable(args.stats, ['year']).read_all()
+        else:
+            stats_df = pd.read_csv(args.stats)
+        stats_df = stats_df[RAW_COLUMNS]
+        if args.parts:
+            stats_df = process_partitions(stats_df, rookie_df, drop_df, PartitionCache(args.parts), memo)
+        else:
+            stats_df = process_stats(stats_df, rookie_df, drop_df, memo)
+        memo.save()
+        stats_df.to_csv(args.out, index=False)
     LOGGER.info(f'saved {args.out}')
 
+    app_rookie_df = add_rookie_columns(rookie_df)
+    app_stats_df = add_stats_columns(stats_df, app_rookie_df)
+    if args.snapshot:
+        write_snapshot(app_stats_df, args.snapshot)
+    if args.cube:
+        # same version as the app computes from the files, so that the app can detect a stale cube
+        data_version = get_data_version(stats_snapshot_path=args.snapshot, rookie_csv_path=args.rookie,
+                                        stats_csv_path=args.out)
+        StatsCube.build(app_rookie_df, app_stats_df).save(args.cube, data_version=data_version)
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='ダウンロードした出場記録の前処理を行う')
-    parser.add_argument('-s', '--stats', help='fetch_stats.pyで取得したstatsファイル', default='./data/stats_raw.csv')
+    parser.add_argument('-s', '--stats', help='fetch_stats.pyで取得したstatsファイル、またはパーティションのディレクトリ',
+                        default='./data/stats_raw.csv')
     parser.add_argument('-r', '--rookie', help='処理済みのrookieファイル', default='./data/rookie.csv')
     parser.add_argument('-d', '--drop', help='除くべきstatsを定義したファイル（同姓同名など）', default='./data/stats_drop.csv')
     parser.add_argument('-o', '--out', help='出力ファイル', default='./data/stats.csv')
+    parser.add_argument('-p', '--parts', help='シーズンごとの処理結果の保存先（空文字列で全シーズンを処理する）',
+                        default='./.pipeline_cache/stats')
+    parser.add_argument('-k', '--chunksize', help='statsファイルをこの行数ずつ読み込んで処理する（年順のcsvのみ）', type=int)
+    parser.add_argument('-n', '--snapshot', help='アプリ用スナップショットの出力先（空文字列で出力しない）',
+                        default='./data/stats.snapshot')
+    parser.add_argument('-c', '--cube', help='平均選手用の集計キューブの出力先（空文字列で出力しない）',
+                        default='./data/stats.cube.npz')
+    parser.add_argument('-m', '--memo', help='正規化結果のキャッシュファイル（空文字列で保存しない）', default=CANONICAL_MEMO)
     parser.add_argument('-v', '--verbose', action='store_true')
     args = parser.parse_args()
     init_logger(args.verbose)
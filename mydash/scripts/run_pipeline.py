@@ -0,0 +1,65 @@
+import argparse
+from logging import getLogger
+
+from mydash.utils.log import init_logger
+from mydash.utils.pipeline import PIPELINE_STATE, Pipeline, Stage
+
+LOGGER = getLogger(__name__)
+
+# modules used by the processing scripts
+PROCESS_MODULES = ['mydash.utils.canonicalize', 'mydash.utils.categorize', 'mydash.utils.common',
+                   'mydash.utils.constants', 'mydash.utils.df', 'mydash.utils.snapshot']
+
+STAGES = [
+    Stage(
+        name='fetch_rookie',
+        command=['-m', 'mydash.scripts.fetch_rookie', '--out', './data/rookie_raw.csv', '--resume'],
+        outputs=['./data/rookie_raw.csv'],
+        always=True
+    ),
+    Stage(
+        name='fetch_stats',
+        command=['-m', 'mydash.scripts.fetch_stats', '--out', './data/stats_raw.csv', '--resume'],
+        outputs=['./data/stats_raw.csv'],
+        always=True
+    ),
+    Stage(
+        name='process_rookie',
+        command=['-m', 'mydash.scripts.process_rookie', '--out', './data/rookie.csv'],
+        inputs=['./data/rookie_raw.csv', './data/rookie_add.csv'],
+        outputs=['./data/rookie.csv', './data/rookie.snapshot'],
+        modules=['mydash.scripts.process_rookie'] + PROCESS_MODULES
+    ),
+    Stage(
+        name='process_stats',
+        command=['-m', 'mydash.scripts.process_stats', '--out', './data/stats.csv'],
+        inputs=['./data/stats_raw.csv', './data/rookie.csv', './data/stats_drop.csv'],
+        outputs=['./data/stats.csv', './data/stats.snapshot', './data/stats.cube.npz'],
+        modules=['mydash.scripts.process_stats', 'mydash.utils.cube', 'mydash.utils.partition'] + PROCESS_MODULES
+    ),
+]
+FETCH_STAGES = ['fetch_rookie', 'fetch_stats']
+
+
+def main():
+    names = args.stages or [stage.name for stage in STAGES if args.fetch or stage.name not in FETCH_STAGES]
+    unknown_names = set(names) - {stage.name for stage in STAGES}
+    if unknown_names:
+        raise ValueError(f'unknown stages: {unknown_names}')
+    pipeline = Pipeline(STAGES, args.state)
+    ran = pipeline.run(names, max_workers=args.jobs, force=args.force, dry_run=args.dry_run)
+    LOGGER.info(f'done: #ran={len(ran)} {ran}, #skipped={len(names) - len(ran)}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='データの取得・前処理を入力が変わったステージのみ実行する')
+    parser.add_argument('stages', nargs='*', help='実行するステージ（省略時は全ステージ）')
+    parser.add_argument('-f', '--fetch', action='store_true', help='データの取得も行う')
+    parser.add_argument('--force', action='store_true', help='入力が変わっていないステージも実行する')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='実行するステージを表示するのみ')
+    parser.add_argument('-j', '--jobs', help='並列に実行するステージ数', type=int, default=2)
+    parser.add_argument('--state', help='前回の実行状態を保存するファイル', default=PIPELINE_STATE)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    init_logger(args.verbose)
+    main()
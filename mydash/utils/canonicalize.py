@@ -1,4 +1,18 @@
-from mydash.utils.common import reverse_list_map
+import hashlib
+import json
+import os
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+from mydash.utils import categorize, common
+from mydash.utils.categorize import categorize_team
+from mydash.utils.common import clean_name, clean_text, reverse_list_map
+
+LOGGER = getLogger(__name__)
+
+CANONICAL_MEMO = './.pipeline_cache/canonicalize.json'
 
 TEAM_TO_ALIASES = {
     'JFAアカデミー福島': ['JFAアカデミー福島U18', 'JFAアカデミー福島U-18'],
@@ -47,3 +61,89 @@ def canonicalize_team(team_name):
 
 def canonicalize_player(player_name):
     return ALIAS_TO_PLAYER.get(player_name, player_name)
+
+
+def normalize_player(player_name):
+    return canonicalize_player(clean_name(player_name))
+
+
+def normalize_team(team_name):
+    return canonicalize_team(clean_text(team_name))
+
+
+def normalize_team_category(team_name):
+    return categorize_team(team_name).name
+
+
+NORMALIZERS = {
+    'player': normalize_player,
+    'team': normalize_team,
+    'team_category': normalize_team_category,
+}
+
+
+def get_rules_version():
+    """
+    :return: hash of the modules which define the normalization rules, to invalidate memos when they are edited
+    """
+
+    digest = hashlib.sha1()
+    for path in [common.__file__, categorize.__file__, __file__]:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class CanonicalMemo:
+    """
+    Memo of normalized values for each normalizer in `NORMALIZERS`, optionally persisted in a JSON file.
+    The memo is discarded when the normalization rules are changed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.version = get_rules_version()
+        self.values = {name: dict() for name in NORMALIZERS}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') == self.version:
+                self.values.update(data['values'])
+            else:
+                LOGGER.info(f'discarded memo of old rules: {path}')
+
+    def normalize(self, name, values):
+        """
+        :return: normalized `values`, computing only values which are not in the memo
+        """
+
+        memo = self.values[name]
+        func = NORMALIZERS[name]
+        missing = [value for value in values if value not in memo]
+        for value in missing:
+            memo[value] = func(value)
+        LOGGER.debug(f'normalized {name}: #values={len(values)}, #computed={len(missing)}')
+        return [memo[value] for value in values]
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': self.version, 'values': self.values}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def canonicalize_column(series, name, memo=None):
+    """
+    normalize each distinct value of `series` once by `NORMALIZERS[name]`, and map the results back by codes
+
+    :param memo: `CanonicalMemo` shared among columns and runs, or None
+    """
+
+    if memo is None:
+        memo = CanonicalMemo()
+    codes, uniques = pd.factorize(series)
+    normalized = np.array(memo.normalize(name, uniques.tolist()) + [np.nan], dtype=object)
+    return pd.Series(normalized[codes], index=series.index, name=series.name)
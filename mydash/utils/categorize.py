@@ -26,10 +26,39 @@ TEAM_NAME_TO_CATEGORY = {
 }
 
 
+class SuffixTrie:
+    """
+    Trie of reversed suffixes, which finds the value of the first matching suffix in the given order
+    by walking a string backwards once
+    """
+
+    def __init__(self, suffix_to_value):
+        self.root = dict()
+        for priority, (suffix, value) in enumerate(suffix_to_value.items()):
+            node = self.root
+            for c in reversed(suffix):
+                node = node.setdefault(c, dict())
+            node.setdefault(None, (priority, value))  # `None` marks the end of a suffix
+
+    def match(self, s, default=None):
+        matched = None
+        node = self.root
+        for c in reversed(s):
+            node = node.get(c)
+            if node is None:
+                break
+            if None in node and (matched is None or node[None][0] < matched[0]):
+                matched = node[None]
+        return default if matched is None else matched[1]
+
+
+SUFFIX_TRIE = SuffixTrie(SUFFIX_TO_TEAM_CATEGORY)
+
+
 def categorize_team(team_name) -> TeamCategory:
-    for suffix, category in SUFFIX_TO_TEAM_CATEGORY.items():
-        if team_name.endswith(suffix):
-            return category
+    category = SUFFIX_TRIE.match(team_name)
+    if category is not None:
+        return category
     if team_name in TEAM_NAME_TO_CATEGORY:
         return TEAM_NAME_TO_CATEGORY.get(team_name)
     return TeamCategory.OTHER
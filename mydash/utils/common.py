@@ -4,6 +4,17 @@ import urllib
 import jaconv
 
 
+# formal school names to abbreviations used in team names, longer ones first
+SCHOOL_ABBREVIATIONS = {
+    '高等専門学校': '高専',
+    '高等学校': '高',
+    '短期大学': '短大',
+    '大学': '大',
+    '高校': '高',
+}
+RE_SCHOOL_NAME = re.compile('|'.join(SCHOOL_ABBREVIATIONS))
+
+
 def clean_name(s):
     return ''.join(s.strip().split())
 
@@ -13,6 +24,19 @@ def clean_text(s):
     return (re.split(r'\(|（', s)[0]).strip()
 
 
+def normalize_search_text(s):
+    """
+    normalize names and search queries so that they match regardless of width, kana, case, spaces, punctuation
+    (e.g. "U-18" and "u18") and formal school names abbreviated in team names (e.g. "明治大学" and "明治大")
+    """
+
+    s = clean_text(s)
+    s = jaconv.h2z(s, kana=True, ascii=False, digit=False)
+    s = jaconv.hira2kata(s)
+    s = RE_SCHOOL_NAME.sub(lambda m: SCHOOL_ABBREVIATIONS[m.group(0)], s)
+    return re.sub(r'[\s\-.・]', '', s.lower())
+
+
 def build_url(base_url, query_dict):
     query = urllib.parse.urlencode(query_dict)
     return f'{base_url}?{query}'
@@ -0,0 +1,175 @@
+import json
+import os
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+from mydash.utils.constants import LAST_YEAR
+from mydash.utils.df import assert_columns
+
+LOGGER = getLogger(__name__)
+
+STATS_CUBE = './data/stats.cube.npz'
+
+# rookie dimensions which can be filtered in the app, and corresponding filter arguments of `filter_rookie_df`
+ROOKIE_DIMS = ['joined_year', 'joined_league_id', 'position', 'prev_team_category']
+DIM_TO_FILTER = {
+    'joined_league_id': 'joined_league_ids',
+    'position': 'positions',
+    'prev_team_category': 'prev_categories',
+}
+
+
+class StatsCube:
+    """
+    Pre-aggregated stats for the "Avg." player, i.e. summed stats over
+    joined_year x joined_league_id x position x prev_team_category x rookie_year x league_id, and player counts over
+    joined_year x joined_league_id x position x prev_team_category.
+
+    The avg stats for filters which only use these dimensions are answered by summing cells without scanning rows.
+    """
+
+    def __init__(self, axes, stats_cols, sums, stats_counts, player_counts, data_version=None):
+        """
+        :param axes: dimension name -> labels, for `ROOKIE_DIMS` + ['rookie_year', 'league_id']
+        :param sums: summed stats of shape (*rookie dims, rookie_year, league_id, stats_cols)
+        :param stats_counts: number of stats rows of shape (*rookie dims, rookie_year, league_id)
+        :param player_counts: number of players of shape (*rookie dims)
+        :param data_version: `get_data_version` of the data which the cube is built from, if known
+        """
+
+        self.axes = axes
+        self.stats_cols = stats_cols
+        self.sums = sums
+        self.stats_counts = stats_counts
+        self.player_counts = player_counts
+        self.data_version = data_version
+
+    @classmethod
+    def build(cls, rookie_df, stats_df, stats_cols=None, data_version=None):
+        if stats_cols is None:
+            stats_cols = ['minutes', 'apps', 'goals']
+        assert_columns(rookie_df, ROOKIE_DIMS)
+        assert_columns(stats_df, ['player_id', 'rookie_year', 'league_id'] + stats_cols)
+
+        # stats rows before joining a team (rookie_year <= 0) are never used in the avg stats
+        max_rookie_year = LAST_YEAR - int(rookie_df['joined_year'].min()) + 1
+        stats_df = stats_df[(stats_df['rookie_year'] >= 1) & (stats_df['rookie_year'] <= max_rookie_year)]
+        stats_df = pd.merge(stats_df.drop(columns=ROOKIE_DIMS, errors='ignore'),
+                            rookie_df[['player_id'] + ROOKIE_DIMS], on='player_id')
+
+        axes = dict()
+        rookie_codes, stats_codes = [], []
+        for dim in ROOKIE_DIMS:
+            axes[dim] = sorted(rookie_df[dim].unique().tolist())
+            rookie_codes.append(pd.Index(axes[dim]).get_indexer(rookie_df[dim]))
+            stats_codes.append(pd.Index(axes[dim]).get_indexer(stats_df[dim]))
+        axes['rookie_year'] = list(range(1, max_rookie_year + 1))
+        axes['league_id'] = sorted(stats_df['league_id'].unique().tolist())
+        for dim in ['rookie_year', 'league_id']:
+            stats_codes.append(pd.Index(axes[dim]).get_indexer(stats_df[dim]))
+
+        shape = tuple(len(axes[dim]) for dim in ROOKIE_DIMS)
+        player_counts = np.zeros(shape, dtype=np.int64)
+        np.add.at(player_counts, tuple(rookie_codes), 1)
+
+        shape = tuple(len(labels) for labels in axes.values())
+        stats_counts = np.zeros(shape, dtype=np.int64)
+        np.add.at(stats_counts, tuple(stats_codes), 1)
+        sums = np.zeros(shape + (len(stats_cols),), dtype=np.float64)
+        for i, col in enumerate(stats_cols):
+            np.add.at(sums[..., i], tuple(stats_codes), stats_df[col].values)
+
+        LOGGER.info(f'built stats cube: shape={sums.shape}')
+        return cls(axes, stats_cols, sums, stats_counts, player_counts, data_version=data_version)
+
+    def save(self, path, data_version=None):
+        """
+        :param data_version: `get_data_version` of the data which the cube is built from, checked on load
+        """
+
+        self.data_version = data_version or self.data_version
+        meta = json.dumps({'axes': self.axes, 'stats_cols': self.stats_cols, 'data_version': self.data_version},
+                          ensure_ascii=False)
+        np.savez(path, meta=np.array(meta), sums=self.sums, stats_counts=self.stats_counts,
+                 player_counts=self.player_counts)
+        LOGGER.info(f'saved stats cube in {path}')
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(meta['axes'], meta['stats_cols'], data['sums'], data['stats_counts'], data['player_counts'],
+                       data_version=meta.get('data_version'))
+
+    @staticmethod
+    def supports(joined_teams=None, prev_teams=None, player_names=None, player_ids=None, **kwargs):
+        """
+        :return: whether filters can be answered by the cube, i.e. no filters on teams or players are given
+        """
+
+        return not joined_teams and not prev_teams and not player_names and player_ids is None
+
+    def _select(self, dim, joined_year_range=None, **kwargs):
+        labels = np.asarray(self.axes[dim])
+        if dim == 'joined_year':
+            if not joined_year_range:
+                return None
+            return (labels >= joined_year_range[0]) & (labels <= joined_year_range[1])
+        values = kwargs.get(DIM_TO_FILTER[dim])
+        if not values:
+            return None
+        return np.isin(labels, values)
+
+    def get_avg_stats_df(self, **kwargs):
+        """
+        same as `get_avg_stats_df(filter_rookie_df(rookie_df, **kwargs), stats_df)` but without row scans
+        """
+
+        sums, stats_counts, player_counts = self.sums, self.stats_counts, self.player_counts
+        joined_years = np.asarray(self.axes['joined_year'])
+        for axis, dim in enumerate(ROOKIE_DIMS):
+            selected = self._select(dim, **kwargs)
+            if selected is not None:
+                if dim == 'joined_year':
+                    joined_years = joined_years[selected]
+                sums = sums.compress(selected, axis=axis)
+                stats_counts = stats_counts.compress(selected, axis=axis)
+                player_counts = player_counts.compress(selected, axis=axis)
+        rookie_axes = tuple(range(len(ROOKIE_DIMS)))
+        sums = sums.sum(axis=rookie_axes)
+        stats_counts = stats_counts.sum(axis=rookie_axes)
+        year_counts = player_counts.sum(axis=rookie_axes[1:])
+
+        # players with cur_rookie_year=3 are available for rookie_year=[1,2,3], for example
+        rookie_years = np.asarray(self.axes['rookie_year'])
+        cur_rookie_years = LAST_YEAR - joined_years + 1
+        count_by_rookie_year = np.array([year_counts[cur_rookie_years >= y].sum() for y in rookie_years])
+
+        i, j = np.nonzero((stats_counts > 0) & (count_by_rookie_year > 0)[:, None])
+        avg_stats_df = pd.DataFrame({
+            'rookie_year': rookie_years[i],
+            'league_id': np.asarray(self.axes['league_id'])[j],
+        })
+        player_count = count_by_rookie_year[i]
+        for k, col in enumerate(self.stats_cols):
+            avg_stats_df[col] = sums[i, j, k] / player_count
+        avg_stats_df['player_count'] = player_count
+        return avg_stats_df
+
+
+def load_stats_cube(rookie_df, stats_df, path=STATS_CUBE, data_version=None):
+    """
+    :param data_version: `get_data_version` of the loaded data frames. If given, a cube of another version (e.g. left
+        on disk when the stats are regenerated without the cube) is not used.
+    """
+
+    if path and os.path.exists(path):
+        cube = StatsCube.load(path)
+        if data_version is None or cube.data_version == data_version:
+            return cube
+        LOGGER.warning(f'stats cube is stale ({cube.data_version} != {data_version}), build from stats: {path}')
+    else:
+        LOGGER.warning(f'stats cube does not exist, build from stats: {path}')
+    return StatsCube.build(rookie_df, stats_df, data_version=data_version)
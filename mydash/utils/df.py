@@ -1,7 +1,19 @@
+import hashlib
+import math
+from logging import getLogger
+
 import numpy as np
 import pandas as pd
 
 from mydash.utils.constants import LAST_YEAR
+from mydash.utils.snapshot import read_snapshot, read_snapshot_meta
+
+LOGGER = getLogger(__name__)
+
+ROOKIE_CSV = './data/rookie.csv'
+STATS_CSV = './data/stats.csv'
+ROOKIE_SNAPSHOT = './data/rookie.snapshot'
+STATS_SNAPSHOT = './data/stats.snapshot'
 
 
 def assert_columns(df, columns):
@@ -9,28 +21,84 @@ def assert_columns(df, columns):
         assert col in df.columns, f'column does not exist: \'{col}\' not in  {list(df.columns)}'
 
 
-def load_rookie_df():
-    rookie_df = pd.read_csv('./data/rookie.csv')
+def add_rookie_columns(rookie_df):
+    """
+    convert a rookie data frame saved by `process_rookie` into the one used in the app
+    """
+
     rookie_df = rookie_df.rename(
         columns=dict([(col, f'joined_{col}') for col in ['year', 'league_id', 'team_name']])
     )
-    rookie_df['joined_league'] = rookie_df['joined_league_id'].map(lambda x: f'J{x}')
-    rookie_df['player_label'] = rookie_df.apply(lambda x: '{0}({1})<br>{2}<br>{3}'.format(
-        x['player_name'], x['joined_year'], x['joined_team_name'], x['prev_team_name']), axis=1)
+    rookie_df['joined_league'] = 'J' + rookie_df['joined_league_id'].astype(str)
+    rookie_df['player_label'] = rookie_df['player_name'] + '(' + rookie_df['joined_year'].astype(str) + ')<br>' + \
+        rookie_df['joined_team_name'] + '<br>' + rookie_df['prev_team_name']
     rookie_df['cur_rookie_year'] = LAST_YEAR - rookie_df['joined_year'] + 1
     return rookie_df
 
 
-def load_stats_df(rookie_df):
-    stats_df = pd.read_csv('./data/stats.csv')
-    stats_df['league'] = stats_df['league_id'].map(lambda x: f'J{x}')
-    stats_df = pd.merge(stats_df, rookie_df[['player_name', 'joined_year']], on='player_name')
+def add_stats_columns(stats_df, rookie_df):
+    """
+    convert a stats data frame saved by `process_stats` into the one used in the app
+
+    :param rookie_df: rookie data frame converted by `add_rookie_columns`
+    """
+
+    stats_df = stats_df.copy()
+    stats_df['league'] = 'J' + stats_df['league_id'].astype(str)
+    stats_df = pd.merge(stats_df, rookie_df[['player_id', 'joined_year']], on='player_id')
     stats_df['rookie_year'] = stats_df['year'] - stats_df['joined_year'] + 1
-    stats_df['stats_label'] = stats_df.apply(lambda x: '{0}({1})'.format(x['team_name'], x['year']), axis=1)
+    stats_df['stats_label'] = stats_df['team_name'] + '(' + stats_df['year'].astype(str) + ')'
     return stats_df
 
 
-def filter_rookie_df(df, joined_teams=None, prev_teams=None, player_names=None,
+def load_rookie_df(csv_path=ROOKIE_CSV, snapshot_path=ROOKIE_SNAPSHOT):
+    if snapshot_path:
+        try:
+            return read_snapshot(snapshot_path)
+        except (FileNotFoundError, ValueError) as e:
+            LOGGER.warning(f'failed to read snapshot, fall back to {csv_path}: {e}')
+    return add_rookie_columns(pd.read_csv(csv_path))
+
+
+def load_stats_df(rookie_df, csv_path=STATS_CSV, snapshot_path=STATS_SNAPSHOT):
+    if snapshot_path:
+        try:
+            return read_snapshot(snapshot_path)
+        except (FileNotFoundError, ValueError) as e:
+            LOGGER.warning(f'failed to read snapshot, fall back to {csv_path}: {e}')
+    return add_stats_columns(pd.read_csv(csv_path), rookie_df)
+
+
+def get_data_version(rookie_snapshot_path=ROOKIE_SNAPSHOT, stats_snapshot_path=STATS_SNAPSHOT,
+                     rookie_csv_path=ROOKIE_CSV, stats_csv_path=STATS_CSV):
+    """
+    :return: identifier of the loaded data, which changes whenever the data is updated
+    """
+
+    try:
+        if not rookie_snapshot_path or not stats_snapshot_path:
+            raise FileNotFoundError('snapshot is not given')
+        return '-'.join(read_snapshot_meta(path)['data_version'] for path in [rookie_snapshot_path, stats_snapshot_path])
+    except (FileNotFoundError, ValueError):
+        digest = hashlib.sha1()
+        for path in [rookie_csv_path, stats_csv_path]:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+
+def get_table_page(df, rows, page_current, page_size, columns):
+    """
+    :param rows: row positions of the filtered table in `df`
+    :return: records of the page and the number of pages
+    """
+
+    assert_columns(df, columns)
+    page_rows = rows[page_current * page_size:(page_current + 1) * page_size]
+    return df.iloc[page_rows][columns].to_dict('records'), math.ceil(len(rows) / page_size)
+
+
+def filter_rookie_df(df, joined_teams=None, prev_teams=None, player_names=None, player_ids=None,
                      joined_league_ids=None, prev_categories=None, positions=None, joined_year_range=None):
     mask = np.ones(len(df)).astype(bool)
     if joined_teams:
@@ -39,6 +107,8 @@ def filter_rookie_df(df, joined_teams=None, prev_teams=None, player_names=None,
         mask &= df['prev_team_name'].isin(prev_teams)
     if player_names:
         mask &= df['player_name'].isin(player_names)
+    if player_ids is not None:
+        mask &= np.isin(df['player_id'].values, player_ids)
     if joined_league_ids:
         mask &= df['joined_league_id'].isin(joined_league_ids)
     if positions:
@@ -51,7 +121,8 @@ def filter_rookie_df(df, joined_teams=None, prev_teams=None, player_names=None,
     return df[mask]
 
 
-def filter_stats_df(df, rookie_year_range=None, league_id=None, minutes_range=None, player_names=None):
+def filter_stats_df(df, rookie_year_range=None, league_id=None, minutes_range=None, player_names=None,
+                    player_ids=None):
     mask = np.ones(len(df)).astype(bool)
     if rookie_year_range:
         mask &= df['rookie_year'] >= rookie_year_range[0]
@@ -63,6 +134,8 @@ def filter_stats_df(df, rookie_year_range=None, league_id=None, minutes_range=No
         mask &= df['minutes'] <= minutes_range[1]
     if player_names:
         mask &= df['player_name'].isin(player_names)
+    if player_ids is not None:
+        mask &= np.isin(df['player_id'].values, player_ids)
     return df[mask]
 
 
@@ -72,22 +145,36 @@ def get_avg_stats_df(rookie_df, stats_df, stats_cols=None):
     assert_columns(rookie_df, ['cur_rookie_year'])
     assert_columns(stats_df, ['rookie_year', 'league_id'] + stats_cols)
 
-    # calculate player_count for each rookie_year
-    agg_rookie_df = rookie_df.groupby('cur_rookie_year').size().reset_index() \
-        .rename(columns={'cur_rookie_year': 'rookie_year', 0: 'player_count'})
-    count_df = pd.DataFrame({'rookie_year': range(1, 8)})  # max 7 as of 2021
-    count_df = pd.merge(count_df, agg_rookie_df, on='rookie_year', how='left').fillna(0).astype(int)
+    # calculate player_count for each rookie_year in [0, max cur_rookie_year]
+    cur_rookie_years = rookie_df['cur_rookie_year'].values
+    max_rookie_year = int(cur_rookie_years.max()) if len(cur_rookie_years) > 0 else 0
+    player_counts = np.bincount(cur_rookie_years[cur_rookie_years >= 1], minlength=max_rookie_year + 1)
     # reverse cumsum here to make players with cur_rookie_year=3 available for rookie_year=[1,2,3], for example
-    count_df['player_count'] = count_df['player_count'][::-1].cumsum()[::-1]
-    count_df = count_df[count_df['player_count'] > 0]
-    assert_columns(count_df, ['rookie_year', 'player_count'])
+    player_counts = player_counts[::-1].cumsum()[::-1]
+
+    # sum stats for each (rookie_year, league_id) cell, i.e. rookie_year * n_leagues + league_id
+    rookie_years = stats_df['rookie_year'].values
+    league_ids = stats_df['league_id'].values
+    mask = (rookie_years >= 1) & (rookie_years <= max_rookie_year)
+    n_leagues = int(league_ids.max()) + 1 if len(league_ids) > 0 else 1
+    cells = rookie_years[mask] * n_leagues + league_ids[mask]
+    n_cells = (max_rookie_year + 1) * n_leagues
+    stats_counts = np.bincount(cells, minlength=n_cells)
+    sums = np.empty((n_cells, len(stats_cols)), dtype=np.float64)
+    for i, col in enumerate(stats_cols):
+        sums[:, i] = np.bincount(cells, weights=stats_df[col].values[mask], minlength=n_cells)
 
     # calculate avg stats
-    agg_stats_df = stats_df.groupby(['rookie_year', 'league_id'])[stats_cols].sum() \
-        .reset_index()
-    agg_stats_df = pd.merge(agg_stats_df, count_df, on='rookie_year')
-    for col in stats_cols:
-        agg_stats_df[col] = agg_stats_df[col] / agg_stats_df['player_count']
+    cells = np.flatnonzero(stats_counts)
+    cells = cells[player_counts[cells // n_leagues] > 0]
+    agg_stats_df = pd.DataFrame({
+        'rookie_year': cells // n_leagues,
+        'league_id': cells % n_leagues
+    })
+    agg_player_counts = player_counts[agg_stats_df['rookie_year'].values]
+    for i, col in enumerate(stats_cols):
+        agg_stats_df[col] = sums[cells, i] / agg_player_counts
+    agg_stats_df['player_count'] = agg_player_counts
     assert_columns(agg_stats_df, ['rookie_year', 'league_id'] + stats_cols)
 
     return agg_stats_df
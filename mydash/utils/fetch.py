@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mydash.utils.http_cache import build_cache_key
+
+LOGGER = getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket which allows `rate` requests per second on average and bursts of `capacity` requests.
+    """
+
+    def __init__(self, rate, capacity=1):
+        assert rate > 0 and capacity >= 1
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """
+    Concurrent HTTP client for the scrapers.
+
+    Each worker thread keeps its own keep-alive session, every request waits for a token of the per-host bucket,
+    and connection errors or retryable statuses (429, 5xx) are retried with exponential backoff.
+    Responses are stored in, and replayed from, `ResponseCache` if given.
+    """
+
+    def __init__(self, rate=1.0, burst=1, max_workers=4, retries=3, backoff=1.0, timeout=30, cache=None):
+        """
+        :param rate: max number of requests per second for each host
+        :param burst: max number of requests which can be sent at once for each host
+        :param max_workers: number of worker threads used by `map`
+        :param retries: max number of retries for each request
+        :param backoff: seconds to wait before the first retry, doubled on every retry
+        :param timeout: seconds to wait for a response
+        :param cache: `ResponseCache` or None
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self._buckets = dict()
+        self._sessions = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+    def _get_session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _get_bucket(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def _get_wait(self, attempt, response=None):
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return int(response.headers['Retry-After'])
+        return self.backoff * 2 ** attempt
+
+    def request(self, method, url, immutable=False, **kwargs):
+        """
+        :param immutable: whether the response never changes (e.g. pages of closed seasons), so that its cache is
+            used without revalidation
+        """
+
+        if self.cache is None:
+            return self._send(method, url, **kwargs)
+
+        key = build_cache_key(method, url, kwargs.get('data'))
+        entry = self.cache.get_entry(key)
+        if entry is not None and self.cache.is_fresh(entry, immutable):
+            LOGGER.debug(f'use cached response of {url}')
+            return self.cache.load(entry)
+        if self.cache.offline:
+            raise FileNotFoundError(f'response is not cached: {method} {url} {kwargs.get("data")}')
+        if entry is not None:
+            kwargs['headers'] = dict(self.cache.get_validators(entry), **kwargs.get('headers', dict()))
+
+        response = self._send(method, url, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            LOGGER.debug(f'cached response of {url} is not modified')
+            return self.cache.load(self.cache.touch(key, entry))
+        self.cache.save(key, response)
+        return response
+
+    def _send(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        bucket = self._get_bucket(url)
+        session = self._get_session()
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                wait = self._get_wait(attempt)
+                LOGGER.warning(f'failed to fetch {url}, retry in {wait}s: {e}')
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    response.raise_for_status()
+                    return response
+                wait = self._get_wait(attempt, response)
+                LOGGER.warning(f'failed to fetch {url}, retry in {wait}s: status={response.status_code}')
+            time.sleep(wait)
+
+    def get(self, url, immutable=False, **kwargs):
+        return self.request('GET', url, immutable=immutable, **kwargs)
+
+    def post(self, url, data=None, immutable=False, **kwargs):
+        return self.request('POST', url, immutable=immutable, data=data, **kwargs)
+
+    def map(self, func, items):
+        """
+        apply `func` to `items` in the worker threads, and return the results in the same order as `items`
+        """
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, items))
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import time
+from logging import getLogger
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+LOGGER = getLogger(__name__)
+
+HTTP_CACHE = './.http_cache'
+
+# response headers kept in the cache
+CACHED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified']
+
+
+def build_cache_key(method, url, data=None):
+    payload = json.dumps(sorted((str(k), str(v)) for k, v in (data or dict()).items()), ensure_ascii=False)
+    s = f'{method.upper()} {url} {payload}'
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of HTTP responses keyed by method, URL and payload.
+
+    Bodies are content-addressed, i.e. saved under the hash of their content in `bodies/`, and each request holds
+    an entry in `entries/` which refers to its body with the validators (ETag, Last-Modified) of the response.
+    """
+
+    def __init__(self, path=HTTP_CACHE, ttl=24 * 60 * 60, offline=False):
+        """
+        :param ttl: seconds in which cached responses are used without revalidation, except immutable ones
+        :param offline: never send requests, and replay cached responses regardless of their age
+        """
+
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        os.makedirs(os.path.join(path, 'entries'), exist_ok=True)
+        os.makedirs(os.path.join(path, 'bodies'), exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, 'entries', key[:2], f'{key}.json')
+
+    def _body_path(self, digest):
+        return os.path.join(self.path, 'bodies', digest[:2], digest)
+
+    @staticmethod
+    def _write(path, content):
+        # write into a temporary file first so that concurrent readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{id(content)}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def get_entry(self, key):
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def is_fresh(self, entry, immutable=False):
+        return self.offline or immutable or time.time() - entry['fetched_at'] < self.ttl
+
+    def get_validators(self, entry):
+        headers = dict()
+        if entry['headers'].get('ETag'):
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    def load(self, entry):
+        with open(self._body_path(entry['body']), 'rb') as f:
+            content = f.read()
+        response = requests.Response()
+        response._content = content
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = entry['url']
+        response.encoding = entry['encoding']
+        return response
+
+    def save(self, key, response):
+        digest = hashlib.sha1(response.content).hexdigest()
+        body_path = self._body_path(digest)
+        if not os.path.exists(body_path):
+            self._write(body_path, response.content)
+        entry = {
+            'url': response.url,
+            'status_code': response.status_code,
+            'headers': {k: response.headers[k] for k in CACHED_HEADERS if k in response.headers},
+            'encoding': response.encoding,
+            'body': digest,
+            'fetched_at': time.time()
+        }
+        self._write(self._entry_path(key), json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        return entry
+
+    def touch(self, key, entry):
+        entry = dict(entry, fetched_at=time.time())
+        self._write(self._entry_path(key), json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        return entry
@@ -0,0 +1,130 @@
+import heapq
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from mydash.utils.canonicalize import TEAM_TO_ALIASES
+from mydash.utils.common import normalize_search_text
+from mydash.utils.df import assert_columns
+
+# filter argument of `filter_rookie_df` -> indexed column
+FILTER_TO_COLUMN = {
+    'joined_teams': 'joined_team_name',
+    'prev_teams': 'prev_team_name',
+    'joined_league_ids': 'joined_league_id',
+    'positions': 'position',
+    'prev_categories': 'prev_team_category',
+}
+
+
+class RookieIndex:
+    """
+    Bitmap indexes for `filter_rookie_df`, built once at load time.
+
+    Each distinct value of the filter columns, and each joined year, holds a packed bitset of matching rows.
+    Filtering is OR within a column and AND across columns.
+    """
+
+    def __init__(self, rookie_df):
+        assert_columns(rookie_df, list(FILTER_TO_COLUMN.values()) + ['joined_year'])
+        self.size = len(rookie_df)
+        self.bitmaps = dict()
+        for col in FILTER_TO_COLUMN.values():
+            self.bitmaps[col] = self._build_bitmaps(rookie_df[col].values)
+        self.year_bitmaps = self._build_bitmaps(rookie_df['joined_year'].values)
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+        self._none = np.zeros_like(self._all)
+
+    def _build_bitmaps(self, values):
+        codes, uniques = pd.factorize(values)
+        bitmaps = dict()
+        for code, value in enumerate(uniques):
+            bitmaps[value.item() if hasattr(value, 'item') else value] = np.packbits(codes == code)
+        return bitmaps
+
+    def _any_of(self, bitmaps, values):
+        bits = self._none.copy()
+        for value in values:
+            if value in bitmaps:
+                np.bitwise_or(bits, bitmaps[value], out=bits)
+        return bits
+
+    def filter_bits(self, joined_teams=None, prev_teams=None, joined_league_ids=None, prev_categories=None,
+                    positions=None, joined_year_range=None):
+        bits = self._all.copy()
+        filters = dict(joined_teams=joined_teams, prev_teams=prev_teams, joined_league_ids=joined_league_ids,
+                       prev_categories=prev_categories, positions=positions)
+        for name, values in filters.items():
+            if values:
+                np.bitwise_and(bits, self._any_of(self.bitmaps[FILTER_TO_COLUMN[name]], values), out=bits)
+        if joined_year_range:
+            years = [y for y in self.year_bitmaps if joined_year_range[0] <= y <= joined_year_range[1]]
+            np.bitwise_and(bits, self._any_of(self.year_bitmaps, years), out=bits)
+        return bits
+
+    def filter_mask(self, **kwargs):
+        return np.unpackbits(self.filter_bits(**kwargs), count=self.size).astype(bool)
+
+    def filter_rows(self, **kwargs):
+        """
+        :return: row positions matching the filters, in the same order as `filter_rookie_df`
+        """
+
+        return np.flatnonzero(self.filter_mask(**kwargs))
+
+
+def get_ngrams(key):
+    """
+    :return: bigrams of `key`, or `key` itself if it has one character
+    """
+
+    return {key[i:i + 2] for i in range(len(key) - 1)} or {key}
+
+
+class TeamNameIndex:
+    """
+    Search index of team names for dropdowns, built once at load time.
+
+    Each name and its aliases in `TEAM_TO_ALIASES` are normalized by `normalize_search_text`, and every character and
+    bigram of them holds the set of matching keys. A query intersects the postings of its bigrams, so that only
+    candidates are checked for the substring. Matches are ranked by the position of the query (i.e. prefix matches
+    first) and then by the number of rookies of the team.
+    """
+
+    def __init__(self, team_names):
+        """
+        :param team_names: team name of each rookie, where the number of rookies is used for ranking
+        """
+
+        counts = pd.Series(team_names).dropna().value_counts(sort=False)
+        counts = counts.iloc[np.lexsort((counts.index.values, -counts.values))]
+        self.names = counts.index.tolist()
+        self.counts = counts.values.tolist()
+        self.keys = []  # (normalized name or alias, position of the name)
+        self.postings = defaultdict(set)
+        for i, name in enumerate(self.names):
+            for key in {normalize_search_text(x) for x in [name] + TEAM_TO_ALIASES.get(name, [])}:
+                for gram in set(key) | get_ngrams(key):
+                    self.postings[gram].add(len(self.keys))
+                self.keys.append((key, i))
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=20):
+        """
+        :return: at most `limit` team names matching `query`, or the teams with the most rookies if `query` is empty
+        """
+
+        query = normalize_search_text(query or '')
+        if not query:
+            return self.names[:limit]
+        postings = sorted([self.postings.get(x, set()) for x in get_ngrams(query)], key=len)
+        ranks = dict()
+        for k in postings[0].intersection(*postings[1:]):
+            key, i = self.keys[k]
+            position = key.find(query)
+            if position >= 0:
+                ranks[i] = min(ranks.get(i, position), position)
+        return [self.names[i] for i in heapq.nsmallest(limit, ranks, key=lambda i: (ranks[i], i))]
@@ -0,0 +1,158 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from logging import getLogger
+
+import flask
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, \
+    multiprocess
+
+LOGGER = getLogger(__name__)
+
+CALLBACK_PATH = '/_dash-update-component'
+METRICS_PATH = '/metrics'
+UNKNOWN_CALLBACK = 'unknown'
+
+BYTES_BUCKETS = [2 ** i for i in range(8, 26, 2)]  # 256B - 16MB
+
+CALLBACK_SECONDS = Histogram('mydash_callback_seconds', 'Latency of callback requests', ['callback'])
+PHASE_SECONDS = Histogram('mydash_callback_phase_seconds', 'Time spent in each phase of callbacks',
+                          ['callback', 'phase'])
+CALLBACK_REQUESTS = Counter('mydash_callback_requests', 'Callback requests by status code', ['callback', 'status'])
+REQUEST_BYTES = Histogram('mydash_callback_request_bytes', 'Size of callback request bodies', ['callback'],
+                          buckets=BYTES_BUCKETS)
+RESPONSE_BYTES = Histogram('mydash_callback_response_bytes', 'Size of callback response bodies', ['callback'],
+                           buckets=BYTES_BUCKETS)
+CACHE_LOOKUPS = Counter('mydash_cache_lookups', 'Lookups of server-side caches', ['cache', 'result'])
+
+# phase -> seconds of the callback running in the current context, or None outside callbacks
+_phases = ContextVar('phases', default=None)
+
+
+@contextmanager
+def phase(name):
+    """
+    add the time spent in the block to phase `name` (e.g. "filter", "aggregate", "figure", "serialize") of the
+    running callback. Nothing is recorded outside callbacks.
+    """
+
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.) + time.perf_counter() - start
+
+
+def get_callback_name(output):
+    """
+    :param output: output of a callback in `/_dash-update-component`, e.g. "..a.figure...b.data.."
+    :return: IDs of the output components joined by "+", e.g. "a+b"
+    """
+
+    parts = output[2:-2].split('...') if output.startswith('..') else [output]
+    return '+'.join(x.rsplit('.', 1)[0] for x in parts)
+
+
+def _wrap_function(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        phases = _phases.get()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if phases is not None:
+                phases['function'] = time.perf_counter() - start
+
+    return wrapper
+
+
+def _wrap_dispatch(name, dispatch):
+    """
+    wrap the function which Dash calls for a request, i.e. the callback with validation and JSON encoding of outputs
+    """
+
+    @wraps(dispatch)
+    def wrapper(*args, **kwargs):
+        phases = dict()
+        token = _phases.set(phases)
+        start = time.perf_counter()
+        try:
+            return dispatch(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _phases.reset(token)
+            # time out of the callback function is spent by Dash, mostly for encoding outputs
+            phases['serialize'] = phases.get('serialize', 0.) + seconds - phases.pop('function', seconds)
+            for phase_name, phase_seconds in phases.items():
+                PHASE_SECONDS.labels(name, phase_name).observe(phase_seconds)
+
+    return wrapper
+
+
+def _get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ or 'prometheus_multiproc_dir' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def instrument_app(app):
+    """
+    record metrics of the callbacks of a Dash app, and serve them in the Prometheus text format at `/metrics`.
+    This must be called before registering callbacks, since `app.callback` is wrapped to time callback functions.
+
+    Gunicorn workers share metrics if `PROMETHEUS_MULTIPROC_DIR` is set.
+    """
+
+    register = app.callback
+
+    def callback(*args, **kwargs):
+        callback_ids = set(app.callback_map)
+        decorator = register(*args, **kwargs)
+        callback_ids = set(app.callback_map) - callback_ids
+
+        def wrap(func):
+            decorator(_wrap_function(func))
+            for callback_id in callback_ids:
+                spec = app.callback_map[callback_id]
+                spec['callback'] = _wrap_dispatch(get_callback_name(callback_id), spec['callback'])
+            return func
+
+        return wrap
+
+    app.callback = callback
+
+    server = app.server
+
+    @server.before_request
+    def start_timer():
+        if flask.request.path.endswith(CALLBACK_PATH):
+            flask.g.callback_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        if 'callback_start' in flask.g:
+            body = flask.request.get_json(silent=True) or dict()
+            output = body.get('output') if isinstance(body, dict) else None
+            # label only registered callbacks, so that clients cannot add label values without bound
+            is_registered = isinstance(output, str) and output in app.callback_map
+            name = get_callback_name(output) if is_registered else UNKNOWN_CALLBACK
+            CALLBACK_SECONDS.labels(name).observe(time.perf_counter() - flask.g.callback_start)
+            CALLBACK_REQUESTS.labels(name, str(response.status_code)).inc()
+            REQUEST_BYTES.labels(name).observe(flask.request.content_length or 0)
+            RESPONSE_BYTES.labels(name).observe(response.calculate_content_length() or 0)
+        return response
+
+    @server.route(METRICS_PATH)
+    def metrics():
+        return flask.Response(generate_latest(_get_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+    return app
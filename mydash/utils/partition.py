@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import time
+from logging import getLogger
+
+import pandas as pd
+
+LOGGER = getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def hash_df(df):
+    digest = hashlib.sha1(json.dumps(list(map(str, df.columns))).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, obj):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _write_csv(df, path):
+    tmp_path = f'{path}.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+class PartitionedTable:
+    """
+    Raw data partitioned by season, i.e. a directory which contains `{year}.csv` and `manifest.json`.
+
+    Rows are fetched by units (e.g. year x competition x team), and the manifest records the units which have been
+    fetched completely, so that an interrupted refresh can be resumed without fetching them again.
+    """
+
+    def __init__(self, path, unit_columns):
+        """
+        :param unit_columns: columns which identify a unit, starting with "year"
+        """
+
+        assert unit_columns[0] == 'year'
+        self.path = path
+        self.unit_columns = unit_columns
+        os.makedirs(path, exist_ok=True)
+        self.manifest = _read_json(os.path.join(path, MANIFEST_FILE), {'units': dict()})
+
+    @staticmethod
+    def unit_key(unit):
+        return '/'.join(str(v) for v in unit)
+
+    def is_complete(self, unit):
+        return self.unit_key(unit) in self.manifest['units']
+
+    def years(self):
+        return sorted(int(name[:-4]) for name in os.listdir(self.path) if name.endswith('.csv'))
+
+    def _partition_path(self, year):
+        return os.path.join(self.path, f'{year}.csv')
+
+    def read(self, year):
+        path = self._partition_path(year)
+        if not os.path.exists(path):
+            return None
+        return pd.read_csv(path)
+
+    def read_all(self):
+        dfs = [self.read(year) for year in self.years()]
+        if not dfs:
+            raise FileNotFoundError(f'no partitions in {self.path}')
+        return pd.concat(dfs, ignore_index=True)
+
+    def write_units(self, year, unit_dfs):
+        """
+        replace rows of the given units in the partition of `year`, and mark them as complete
+
+        :param unit_dfs: unit -> data frame of its rows, which contains `unit_columns`
+        """
+
+        if not unit_dfs:
+            return
+        units = list(unit_dfs.keys())
+        assert all(unit[0] == year for unit in units)
+        new_df = pd.concat(unit_dfs.values(), ignore_index=True)
+        df = self.read(year)
+        if df is not None:
+            keys = df[self.unit_columns].astype(str).agg('/'.join, axis=1)
+            df = df[~keys.isin([self.unit_key(unit) for unit in units])]
+            new_df = pd.concat([df, new_df], ignore_index=True)
+        new_df = new_df.sort_values(by=self.unit_columns, kind='stable')
+        _write_csv(new_df, self._partition_path(year))
+
+        now = time.time()
+        for unit, unit_df in unit_dfs.items():
+            self.manifest['units'][self.unit_key(unit)] = {'rows': len(unit_df), 'fetched_at': now}
+        _write_json(os.path.join(self.path, MANIFEST_FILE), self.manifest)
+        LOGGER.info(f'saved {len(units)} units in partition {year}: #rows={len(new_df)}')
+
+
+class PartitionCache:
+    """
+    Processed partitions, i.e. `{name}.csv` with hashes of their inputs in `manifest.json`.
+    A partition is rebuilt only when the hash of its inputs changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest = _read_json(os.path.join(path, MANIFEST_FILE), dict())
+
+    def get_or_build(self, name, input_hash, build):
+        """
+        :param build: function which builds the processed data frame of the partition
+        """
+
+        path = os.path.join(self.path, f'{name}.csv')
+        if self.manifest.get(str(name)) == input_hash and os.path.exists(path):
+            LOGGER.info(f'use processed partition {name}')
+            return pd.read_csv(path)
+
+        df = build()
+        _write_csv(df, path)
+        self.manifest[str(name)] = input_hash
+        _write_json(os.path.join(self.path, MANIFEST_FILE), self.manifest)
+        LOGGER.info(f'rebuilt processed partition {name}: #rows={len(df)}')
+        return df
@@ -0,0 +1,136 @@
+import hashlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import List
+
+LOGGER = getLogger(__name__)
+
+PIPELINE_STATE = './.pipeline_cache/pipeline.json'
+
+
+@dataclass
+class Stage:
+    name: str
+    command: List[str]
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    modules: List[str] = field(default_factory=list)  # modules whose code affects the outputs
+    always: bool = False  # run regardless of inputs, e.g. stages which fetch data from the network
+
+
+def hash_path(digest, path):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+                hash_path(digest, file_path)
+    elif os.path.exists(path):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    else:
+        digest.update(b'<missing>')
+
+
+def hash_stage(stage: Stage):
+    """
+    :return: hash of the command, the input files and the code of the modules of `stage`
+    """
+
+    digest = hashlib.sha1(json.dumps(stage.command).encode('utf-8'))
+    for path in stage.inputs:
+        digest.update(path.encode('utf-8'))
+        hash_path(digest, path)
+    for module in stage.modules:
+        digest.update(module.encode('utf-8'))
+        hash_path(digest, importlib.util.find_spec(module).origin)
+    return digest.hexdigest()[:16]
+
+
+class Pipeline:
+    """
+    Runner of stages which depend on each other through files. A stage runs after all the stages which write its
+    inputs, and is skipped when the hash of its inputs is the same as the last successful run.
+    Stages whose dependencies are done run in parallel.
+    """
+
+    def __init__(self, stages, state_path=PIPELINE_STATE):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.state = dict()
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                self.state = json.load(f)
+
+        producers = {output: stage.name for stage in stages for output in stage.outputs}
+        self.dependencies = {
+            stage.name: {producers[path] for path in stage.inputs if path in producers} - {stage.name}
+            for stage in stages
+        }
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def is_up_to_date(self, stage: Stage, stage_hash):
+        return not stage.always and self.state.get(stage.name) == stage_hash and \
+            all(os.path.exists(path) for path in stage.outputs)
+
+    def _run_stage(self, stage: Stage, force=False, dry_run=False):
+        """
+        :return: whether the stage was run
+        """
+
+        stage_hash = hash_stage(stage)
+        if not force and self.is_up_to_date(stage, stage_hash):
+            LOGGER.info(f'skip {stage.name}: inputs are unchanged')
+            return False
+        LOGGER.info(f'run {stage.name}: {" ".join(stage.command)}')
+        if dry_run:
+            return True
+        subprocess.run([sys.executable] + stage.command, check=True)
+        # hash again, since a stage may update its own inputs (e.g. previous outputs)
+        self.state[stage.name] = hash_stage(stage)
+        return True
+
+    def run(self, names=None, max_workers=2, force=False, dry_run=False):
+        """
+        :param names: names of stages to run, or None for all stages. Dependencies which are not in `names` are
+            regarded as done.
+        :return: names of stages which were run
+        """
+
+        names = list(self.stages) if names is None else names
+        pending = {name: self.dependencies[name] & set(names) for name in names}
+        ran = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = dict()
+            try:
+                while pending or running:
+                    for name in [name for name, deps in pending.items() if not deps]:
+                        del pending[name]
+                        running[executor.submit(self._run_stage, self.stages[name], force, dry_run)] = name
+                    if not running:
+                        raise ValueError(f'circular dependencies among stages: {list(pending)}')
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        if future.result():
+                            ran.append(name)
+                        for deps in pending.values():
+                            deps.discard(name)
+            finally:
+                if not dry_run:
+                    self._save_state()
+        return ran
@@ -0,0 +1,142 @@
+import cProfile
+import hashlib
+import json
+import os
+import pstats
+import re
+import time
+from logging import getLogger
+
+import flask
+
+from mydash.utils.metrics import CALLBACK_PATH, UNKNOWN_CALLBACK, get_callback_name
+
+LOGGER = getLogger(__name__)
+
+PROFILE_DIR_ENV = 'MYDASH_PROFILE_DIR'
+PROFILE_KEEP_ENV = 'MYDASH_PROFILE_KEEP'
+PROFILE_TOKEN_ENV = 'MYDASH_PROFILE_TOKEN'
+PROFILE_HEADER = 'X-Mydash-Profile'
+PROFILE_PARAM = 'profile'
+TOP_FUNCTIONS = 30
+MAX_NAME_LENGTH = 100
+
+# characters of callback names which are not safe in file names, e.g. "/" and "." of a hostile `output`
+RE_UNSAFE_NAME = re.compile(r'[^A-Za-z0-9_+-]')
+
+
+def hash_inputs(body):
+    s = json.dumps([body.get('inputs'), body.get('state')], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()[:16]
+
+
+def get_top_functions(profile, n=TOP_FUNCTIONS):
+    """
+    :return: list of the `n` functions with the largest cumulative time, as dictionaries
+    """
+
+    stats = pstats.Stats(profile)
+    rows = []
+    for (file_name, line, func_name), (_, n_calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': f'{file_name}:{line}({func_name})', 'calls': n_calls,
+                     'tottime': tottime, 'cumtime': cumtime})
+    return sorted(rows, key=lambda x: -x['cumtime'])[:n]
+
+
+class ProfileDumper:
+    """
+    Rotating directory of profiles of callback requests, i.e. `{name}.prof` (readable by `pstats` or snakeviz)
+    and `{name}.json` with the callback, the digest of its inputs and the top functions. Only the latest `keep`
+    profiles are kept.
+    """
+
+    def __init__(self, path, keep=100):
+        self.path = path
+        self.keep = keep
+        os.makedirs(path, exist_ok=True)
+
+    def dump(self, profile, body, seconds):
+        """
+        :param body: JSON body of the callback request
+        :return: name of the profile
+        """
+
+        output = body.get('output')
+        callback = get_callback_name(output) if isinstance(output, str) else UNKNOWN_CALLBACK
+        inputs_digest = hash_inputs(body)
+        safe_callback = RE_UNSAFE_NAME.sub('_', callback)[:MAX_NAME_LENGTH]
+        name = f'{time.time_ns()}-{os.getpid()}-{safe_callback}-{inputs_digest}'
+        profile.dump_stats(os.path.join(self.path, f'{name}.prof'))
+        meta = {
+            'callback': callback,
+            'output': body.get('output'),
+            'inputs_digest': inputs_digest,
+            'inputs': body.get('inputs'),
+            'state': body.get('state'),
+            'changed_prop_ids': body.get('changedPropIds'),
+            'seconds': seconds,
+            'top_functions': get_top_functions(profile)
+        }
+        with open(os.path.join(self.path, f'{name}.json'), 'w') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1, default=str)
+        LOGGER.info(f'saved profile of {callback} in {self.path}: {name}, {seconds:.3f}s')
+        self._rotate()
+        return name
+
+    def _rotate(self):
+        names = sorted(x[:-5] for x in os.listdir(self.path) if x.endswith('.prof'))
+        for name in names[:max(0, len(names) - self.keep)]:
+            for ext in ['.prof', '.json']:
+                try:
+                    os.remove(os.path.join(self.path, f'{name}{ext}'))
+                except FileNotFoundError:
+                    pass
+
+
+def install_profiler(server, path=None, keep=None, token=None):
+    """
+    profile callback requests which have the `X-Mydash-Profile` header or the `profile` query parameter, and dump
+    them in `path`. Profiling is disabled unless `path` or the environment variable `MYDASH_PROFILE_DIR` is given.
+
+    :param token: if given, the header or the parameter must be equal to it (`MYDASH_PROFILE_TOKEN` by default)
+    :return: `ProfileDumper` or None if disabled
+    """
+
+    path = path or os.environ.get(PROFILE_DIR_ENV)
+    if not path:
+        return None
+    keep = keep or int(os.environ.get(PROFILE_KEEP_ENV, 100))
+    token = token or os.environ.get(PROFILE_TOKEN_ENV)
+    dumper = ProfileDumper(path, keep)
+
+    def is_requested():
+        value = flask.request.headers.get(PROFILE_HEADER) or flask.request.args.get(PROFILE_PARAM)
+        return bool(value) and (token is None or value == token)
+
+    @server.before_request
+    def start_profile():
+        if flask.request.path.endswith(CALLBACK_PATH) and is_requested():
+            flask.g.profile = cProfile.Profile()
+            flask.g.profile_start = time.perf_counter()
+            flask.g.profile.enable()
+
+    @server.after_request
+    def dump_profile(response):
+        profile = flask.g.pop('profile', None)
+        if profile is not None:
+            profile.disable()
+            seconds = time.perf_counter() - flask.g.profile_start
+            body = flask.request.get_json(silent=True)
+            if not isinstance(body, dict):  # malformed requests, which dash answers with an error
+                body = dict()
+            response.headers[PROFILE_HEADER] = dumper.dump(profile, body, seconds)
+        return response
+
+    @server.teardown_request
+    def stop_profile(_):
+        profile = flask.g.pop('profile', None)
+        if profile is not None:  # the request failed before `after_request`
+            profile.disable()
+
+    LOGGER.info(f'profiling of callbacks is enabled: {path}')
+    return dumper
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+from logging import getLogger
+
+import numpy as np
+import pandas as pd
+
+LOGGER = getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+META_FILE = 'meta.json'
+
+
+def write_snapshot(df, path):
+    """
+    Save a data frame as a columnar binary snapshot, i.e. a directory which contains one `.npy` file per column
+    and `meta.json`. Numeric columns are stored as they are, and the other columns are dictionary-encoded, where
+    missing values (NaN/None) have the code -1.
+    """
+
+    os.makedirs(path, exist_ok=True)
+    digest = hashlib.sha1()
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        file_name = f'{i:02d}.npy'
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            array = np.ascontiguousarray(values.values)
+            columns.append({'name': col, 'kind': 'numeric', 'file': file_name})
+        else:
+            codes, categories = pd.factorize(values)  # -1 for missing values
+            array = codes.astype(np.int32)
+            categories = [str(x) for x in categories]
+            columns.append({'name': col, 'kind': 'string', 'file': file_name, 'categories': categories})
+            digest.update(json.dumps(categories, ensure_ascii=False).encode('utf-8'))
+        np.save(os.path.join(path, file_name), array, allow_pickle=False)
+        digest.update(col.encode('utf-8'))
+        digest.update(array.tobytes())
+
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'length': len(df),
+        'data_version': digest.hexdigest()[:16],
+        'columns': columns
+    }
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    LOGGER.info(f'saved snapshot in {path}: #rows={len(df)}, data_version={meta["data_version"]}')
+
+
+def read_snapshot_meta(path):
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f'snapshot does not exist: {path}')
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f'unsupported snapshot version: {meta.get("version")} != {SNAPSHOT_VERSION}')
+    return meta
+
+
+def read_snapshot(path):
+    """
+    Load a snapshot saved by `write_snapshot`. Numeric columns are memory-mapped (read-only) and shared in the
+    page cache among processes, and string columns are decoded from their dictionaries without parsing.
+    """
+
+    meta = read_snapshot_meta(path)
+    data = dict()
+    for column in meta['columns']:
+        array = np.load(os.path.join(path, column['file']), mmap_mode='r', allow_pickle=False)
+        if column['kind'] == 'string':
+            # the code -1 of missing values refers to NaN at the end
+            array = np.asarray(column['categories'] + [np.nan], dtype=object)[array]
+        data[column['name']] = array
+    df = pd.DataFrame(data, copy=False)
+    assert len(df) == meta['length']
+    return df
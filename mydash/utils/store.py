@@ -0,0 +1,142 @@
+import hashlib
+import json
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+
+import numpy as np
+
+from mydash.utils.metrics import CACHE_LOOKUPS
+
+LOGGER = getLogger(__name__)
+
+NUMBER = (int, float)
+# filter name -> type of the value, where `[t]` is a list of `t` and a dictionary is a nested filter
+ROOKIE_FILTER_TYPES = {
+    'joined_teams': [str],
+    'prev_teams': [str],
+    'joined_league_ids': [int],
+    'prev_categories': [str],
+    'positions': [str],
+    'joined_year_range': [int],
+    'histogram': {'rookie_year': int, 'league_id': int, 'minutes_range': [NUMBER]},
+}
+
+
+def normalize_filters(**filters):
+    """
+    normalize filter arguments so that equivalent filters (e.g. `None` and `[]`, or differently ordered lists)
+    are mapped to the same dictionary
+    """
+
+    normalized = dict()
+    for name, value in sorted(filters.items()):
+        if value is None or (isinstance(value, (list, tuple, set)) and len(value) == 0):
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(value)
+        if isinstance(value, dict):
+            value = normalize_filters(**value)
+        normalized[name] = value
+    return normalized
+
+
+def validate_filters(filters, types, name='filters'):
+    """
+    check that `filters` (e.g. sent back by a client) only has the keys and the value types in `types`
+
+    :raise ValueError: if not
+    """
+
+    if isinstance(types, dict):
+        if not isinstance(filters, dict):
+            raise ValueError(f'invalid filter: {name}={filters!r}')
+        unknown = set(filters) - set(types)
+        if unknown:
+            raise ValueError(f'unknown filters in {name}: {sorted(unknown)}')
+        for key, value in filters.items():
+            validate_filters(value, types[key], f'{name}.{key}')
+    elif isinstance(types, list):
+        if not isinstance(filters, list):
+            raise ValueError(f'invalid filter: {name}={filters!r}')
+        for value in filters:
+            validate_filters(value, types[0], name)
+    elif not isinstance(filters, types) or isinstance(filters, bool):
+        raise ValueError(f'invalid filter: {name}={filters!r}')
+
+
+def hash_filters(filters):
+    s = json.dumps(filters, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()[:16]
+
+
+class FilterResultStore:
+    """
+    LRU store of filter results, i.e. row positions into a global data frame, keyed by hash of normalized filters.
+
+    Only a small handle `{'key': ..., 'filters': ...}` is sent to the browser. The handle carries normalized
+    filters as well, so that a worker which has not seen the key (or has evicted it) can recompute the result.
+    Handles come back from clients, so the key is always recomputed from the filters and the one in the handle is
+    never trusted.
+    """
+
+    def __init__(self, resolver, max_size=256, name='filter', filter_types=None):
+        """
+        :param resolver: function which receives normalized filters and returns row positions
+        :param max_size: max number of results to keep
+        :param name: name of the store in metrics
+        :param filter_types: if given, filters are validated by `validate_filters` with the types
+        """
+
+        self.resolver = resolver
+        self.filter_types = filter_types
+        self.max_size = max_size
+        self._hit_counter = CACHE_LOOKUPS.labels(name, 'hit')
+        self._miss_counter = CACHE_LOOKUPS.labels(name, 'miss')
+        self._results = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def _normalize(self, filters):
+        if self.filter_types is not None:
+            validate_filters(filters, self.filter_types)
+        elif not isinstance(filters, dict):
+            raise ValueError(f'invalid filters: {filters!r}')
+        filters = normalize_filters(**filters)
+        return hash_filters(filters), filters
+
+    def put(self, filters):
+        key, filters = self._normalize(filters)
+        self._get_or_resolve(key, filters)
+        return {'key': key, 'filters': filters}
+
+    def get_key(self, handle):
+        """
+        :return: key of the filters in `handle`, computed on the server regardless of `handle['key']`
+        """
+
+        return self._normalize(handle['filters'])[0]
+
+    def resolve(self, handle):
+        key, filters = self._normalize(handle['filters'])
+        return self._get_or_resolve(key, filters)
+
+    def _get_or_resolve(self, key, filters):
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self._hit_counter.inc()
+                return self._results[key]
+        self._miss_counter.inc()
+
+        rows = np.asarray(self.resolver(filters), dtype=np.int64)
+        rows.setflags(write=False)
+        with self._lock:
+            self._results[key] = rows
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        LOGGER.debug(f'resolved filter result: key={key}, #rows={len(rows)}')
+        return rows
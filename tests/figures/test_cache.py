@@ -0,0 +1,30 @@
+import plotly.graph_objects as go
+
+from mydash.figures.cache import FigureCache
+
+
+def build_figure(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def test_figure_cache():
+    cache = FigureCache()
+    fig = cache.get_or_build('a', lambda: build_figure(3))
+    assert isinstance(fig, go.Figure)
+    fig = cache.get_or_build('a', lambda: build_figure(100))
+    assert fig['data'][0]['x'] == [0, 1, 2]
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_figure_cache_eviction():
+    cache = FigureCache()
+    cache.put('a', build_figure(3))
+    cache.max_bytes = cache.nbytes * 2
+    cache.put('b', build_figure(3))
+    cache.get('a')  # `b` becomes the least recently used
+    cache.put('c', build_figure(3))
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.nbytes <= cache.max_bytes
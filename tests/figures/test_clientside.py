@@ -0,0 +1,46 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pandas as pd
+import plotly.io as pio
+import pytest
+
+from mydash.figures import do_bar_plot_player_count, get_bar_plot_template, get_player_counts, BAR_COLOR_COLUMNS
+
+CLIENTSIDE_JS = os.path.join(os.path.dirname(__file__), '..', '..', 'assets', 'clientside.js')
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+
+
+def call_clientside(function_name, *args):
+    script = 'const f = require(process.argv[1]);' \
+             'const args = JSON.parse(require("fs").readFileSync(0, "utf-8"));' \
+             f'process.stdout.write(JSON.stringify(f.{function_name}(...args)));'
+    output = subprocess.run(['node', '-e', script, os.path.abspath(CLIENTSIDE_JS)], input=json.dumps(args),
+                            capture_output=True, check=True, text=True).stdout
+    return json.loads(output)
+
+
+def build_rookie_df():
+    return pd.DataFrame({
+        'player_name': ['A', 'B', 'C', 'D', 'E', 'F'],
+        'joined_year': [2016, 2015, 2016, 2021, 2015, 2016],
+        'joined_league': ['J2', 'J1', 'J2', 'J3', 'J2', 'J2'],
+        'prev_team_category': ['UNIV', 'OTHER', 'HIGH', 'UNIV', 'UNIV', 'YOUTH'],
+        'position': ['DF', 'MF', 'GK', 'FW', 'DF', 'MF'],
+    })
+
+
+@pytest.mark.parametrize('color_column', list(BAR_COLOR_COLUMNS))
+def test_update_player_count_plot(color_column):
+    rookie_df = build_rookie_df()
+    template = pio.templates[pio.templates.default].to_plotly_json()
+    templates = {'template': template, 'columns': {x: get_bar_plot_template(x) for x in BAR_COLOR_COLUMNS}}
+
+    for rows in [[0, 1, 2, 3, 4, 5], [0, 2, 5], [3], []]:
+        handle = {'count': len(rows), 'counts': get_player_counts(rookie_df.iloc[rows])}
+        fig = call_clientside('updatePlayerCountPlot', handle, color_column, templates)
+        expected = json.loads(pio.to_json(do_bar_plot_player_count(rookie_df.iloc[rows], color_column)))
+        assert fig == expected
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from mydash.figures import do_scatter_plot_play_time, do_histogram_play_time, HistogramConfig
+from mydash.figures import compact
+from mydash.figures.cache import FigureCache
+from mydash.figures.compact import compact_figure, dedup_customdata, round_values, to_json
+
+
+def build_scatter_plot():
+    rookie_df = pd.DataFrame({'player_id': [1, 2], 'player_label': ['A(2019)', 'B(2020)']})
+    stats_df = pd.DataFrame({
+        'player_id': [1, 1, 2],
+        'rookie_year': [1, 2, 1],
+        'league_id': [1, 1, 2],
+        'minutes': [900.123, 1800.0, 45.5],
+        'goals': [1 / 3, 2., 0.],
+        'stats_label': ['X(2019)', 'Y(2020)', 'Z(2020)'],
+    })
+    stats_df['league'] = 'J' + stats_df['league_id'].astype(str)
+    hover_data = {'minutes': ':.1f', 'goals': ':.1f', 'rookie_year': False, 'y': False, 'league': False}
+    return do_scatter_plot_play_time(rookie_df, stats_df, hover_name='stats_label', hover_data=hover_data)
+
+
+def test_round_values():
+    assert round_values({'a': [1.234, 2.0, np.array([0.5, 3.0])], 'b': 'x', 'c': True}, 1) == \
+        {'a': [1.2, 2, [0.5, 3]], 'b': 'x', 'c': True}
+
+
+def test_dedup_customdata():
+    trace = {'x': [1, 2], 'marker': {'size': [10, 20]}, 'customdata': [[10, 0.5, 'J1'], [20, 1.5, 'J1']],
+             'hovertemplate': 'minutes=%{customdata[0]:.1f}<br>goals=%{customdata[1]:.1f}'}
+    trace = dedup_customdata(trace)
+    assert trace['hovertemplate'] == 'minutes=%{marker.size:.1f}<br>goals=%{customdata[0]:.1f}'
+    assert trace['customdata'] == [[0.5], [1.5]]
+
+    trace = dedup_customdata({'x': [1], 'customdata': [[1, 'J1']], 'hovertemplate': 'x=%{customdata[0]}'})
+    assert trace['hovertemplate'] == 'x=%{x}' and 'customdata' not in trace
+
+
+def test_compact_figure():
+    fig = build_scatter_plot()
+    c_fig = compact_figure(fig)
+    go.Figure(c_fig)  # valid figure
+    assert len(to_json(c_fig)) < len(to_json(fig)) / 2
+
+    trace = c_fig['data'][0]
+    assert trace['marker']['size'] == [900.12, 1800]
+    assert trace['customdata'] == [[0.33], [2]]
+    assert trace['hovertemplate'] == fig['data'][0]['hovertemplate'] \
+        .replace('customdata[0]', 'marker.size').replace('customdata[1]', 'customdata[0]')
+    assert set(c_fig['layout']['template']['data']) == {'scatter'}
+    assert 'scene' not in c_fig['layout']['template']['layout']
+    assert c_fig['layout']['yaxis'] == fig['layout']['yaxis']
+
+    fig = do_histogram_play_time(pd.DataFrame({'league_id': [1, 2], 'minutes': [0, 150]}), HistogramConfig())
+    c_fig = compact_figure(fig)
+    go.Figure(c_fig)
+    assert [x['name'] for x in c_fig['data']] == ['J1', 'J2', 'J3']
+    assert c_fig['data'][1]['customdata'][1] == [100, 199]
+    assert set(c_fig['layout']['template']['data']) == {'bar'}
+
+
+def test_to_json(monkeypatch):
+    fig = compact_figure(build_scatter_plot())
+    expected = json.loads(to_json(fig))
+    monkeypatch.setattr(compact, 'orjson', None)
+    assert json.loads(to_json(fig)) == expected == json.loads(json.dumps(fig))
+
+
+def test_figure_cache_precision():
+    cache = FigureCache(precision=1)
+    fig = cache.get_or_build('a', build_scatter_plot)
+    assert fig['data'][0]['marker']['size'] == [900.1, 1800]
+    assert cache.get_or_build('a', build_scatter_plot) == fig
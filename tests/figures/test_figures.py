@@ -0,0 +1,55 @@
+import json
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+from mydash.figures import do_scatter_plot_play_time, do_histogram_play_time, HistogramConfig, \
+    get_histogram_minutes_range
+from mydash.utils.constants import FIRST_YEAR, LAST_YEAR
+
+
+def test_do_scatter_plot_play_time():
+    rookie_df = pd.DataFrame({'player_id': [1, 2], 'player_label': ['A(2019)', 'B(2020)']})
+    stats_df = pd.DataFrame({
+        'player_id': [1, 1, 2, 2],
+        'rookie_year': [1, 2, 1, 2],
+        'league_id': [2, 1, 3, 3],
+        'minutes': [900.0, 1800.0, 0.0, 45.5],
+        'goals': [1, 2, 0, 0],
+        'stats_label': ['X(2019)', 'Y(2020)', 'Z(2020)', 'Z(2021)'],
+    })
+    stats_df['league'] = 'J' + stats_df['league_id'].astype(str)
+    hover_data = {'minutes': ':.1f', 'goals': ':.1f', 'rookie_year': False, 'y': False, 'league': False}
+    fig = do_scatter_plot_play_time(rookie_df, stats_df, hover_name='stats_label', hover_data=hover_data)
+
+    # figure built by plotly.express as a reference
+    p_stats_df = stats_df.merge(pd.DataFrame({'player_id': [1, 2], 'player_index': [0, 1]}))
+    p_stats_df['y'] = 4 * p_stats_df['player_index'] + p_stats_df['league_id']
+    expected = px.scatter(p_stats_df, x='rookie_year', y='y', size='minutes', color='league',
+                          category_orders={'league': ['J1', 'J2', 'J3']}, height=240,
+                          hover_name='stats_label', hover_data=hover_data)
+    expected.update_yaxes(range=[8, 0])
+    expected.update_xaxes(range=[0.5, LAST_YEAR - FIRST_YEAR + 1.5])
+    expected.update_traces(marker=dict(sizemode='area', sizeref=2. * 3600 / (30. ** 2)))
+    expected.update_layout(yaxis=dict(title_text='', ticktext=rookie_df['player_label'], tickvals=[2, 6]),
+                           xaxis=dict(title_text='rookie year'))
+
+    assert json.loads(pio.to_json(fig, validate=False)) == json.loads(pio.to_json(expected))
+
+
+def test_do_histogram_play_time():
+    stats_df = pd.DataFrame({'league_id': [1, 1, 1, 2, 1], 'minutes': [0, 99, 100, 500, 3600]})
+    fig = do_histogram_play_time(stats_df, HistogramConfig())
+    assert [x.name for x in fig.data] == ['J1', 'J2', 'J3']
+    counts = list(fig.data[0].y)
+    assert len(counts) == 36
+    assert counts[0] == 2 and counts[1] == 1 and counts[-1] == 1 and sum(counts) == 4
+    assert sum(fig.data[1].y) == 1 and sum(fig.data[2].y) == 0
+
+
+def test_get_histogram_minutes_range():
+    start, end = get_histogram_minutes_range([160, 380])
+    assert start == 200 and 399 < end < 400
+    assert get_histogram_minutes_range([3460, 3700]) == [3500, 3600]
+    assert get_histogram_minutes_range([10, 20]) == [10, 20]
@@ -0,0 +1,140 @@
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import build_rookie_page
+from mydash.scripts import fetch_rookie
+from mydash.utils.constants import LEAGUE_IDS, YEARS
+from mydash.utils.fetch import Fetcher
+from mydash.utils.partition import PartitionedTable
+
+META_HTML = '''
+<div class="player_data"><table><tr>
+<th>ポジション</th><td>{position}</td><th>身長/体重</th><td>180cm/70kg</td>
+<th>生年月日</th><td>{birth}</td><th>前所属</th><td> {prev} </td>
+</tr></table></div>
+'''
+
+# before 2017, teams are "group_title" and players are "mini_jpn_title" in "main_contents"
+OLD_HTML = f'''
+<html><body>
+<div class="side_contents"><div class="group_title"><span class="gt_j">ランキング</span></div></div>
+<div class="main_contents">
+<div class="group_title clearfix"><span class="gt_j">ベガルタ仙台</span><span class="gt_e">SENDAI</span></div>
+<div class="mini_jpn_title"> 茂木 駿佑 </div>
+{META_HTML.format(position='MF', birth='1996.10.02', prev='仙台ユース')}
+<div class="mini_jpn_title">西村 拓真</div>
+{META_HTML.format(position='FW', birth='1996.10.22', prev='富山第一高')}
+<div class="group_title"><span class="gt_j">鹿島アントラーズ</span></div>
+<div class="mini_jpn_title">鈴木 優磨</div>
+{META_HTML.format(position='FW', birth='1996.04.26', prev='鹿島ユース')}
+</div>
+</body></html>
+'''
+
+# after 2017, teams are "cp_middletitle" and players are "group_title" in "full_contents"
+NEW_HTML = f'''
+<html><body>
+<div class="full_contents">
+<div class="cp_middletitle"> 北海道コンサドーレ札幌 </div>
+<div class="group_title"><span class="gt_j">菅 大輝</span><span class="gt_e">SUGA</span></div>
+{META_HTML.format(position='MF', birth='1998.09.10', prev='札幌U-18')}
+<div class="comment"><p>コメント</p></div>
+</div>
+</body></html>
+'''
+
+
+def test_parse_players():
+    records = fetch_rookie.parse_players(OLD_HTML, 2015, 1)
+    assert [(r['team_name'], r['player_name']) for r in records] == [
+        ('ベガルタ仙台', '茂木 駿佑'), ('ベガルタ仙台', '西村 拓真'), ('鹿島アントラーズ', '鈴木 優磨')]
+    assert records[0] == {'year': 2015, 'league_id': 1, 'team_name': 'ベガルタ仙台', 'player_name': '茂木 駿佑',
+                          'position': 'MF', 'birth': '1996.10.02', 'prev_team_name': '仙台ユース'}
+
+    assert fetch_rookie.parse_players(NEW_HTML, 2017, 1) == [
+        {'year': 2017, 'league_id': 1, 'team_name': '北海道コンサドーレ札幌', 'player_name': '菅 大輝',
+         'position': 'MF', 'birth': '1998.09.10', 'prev_team_name': '札幌U-18'}]
+
+
+def contains_class(div, class_name):
+    return class_name in div.attrs.get('class', [])
+
+
+def extract_text_bs4(div):
+    if contains_class(div, 'group_title'):
+        return div.find(class_='gt_j').text.strip()
+    return div.text.strip()
+
+
+def parse_players_bs4(html, year, league_id):
+    """
+    `fetch_rookie.fetch_players` before the XPath parser, which walks all divs of a BeautifulSoup tree,
+    kept as the reference
+    """
+
+    soup = BeautifulSoup(html, features="lxml")
+
+    if soup.find(class_='main_contents'):
+        main_tag, team_tag, player_tag = 'main_contents', 'group_title', 'mini_jpn_title'
+    elif soup.find(class_='full_contents'):  # after 2017
+        main_tag, team_tag, player_tag = 'full_contents', 'cp_middletitle', 'group_title'
+    else:
+        raise ValueError('failed to find main/full_contents')
+
+    records = []
+    team_name = None
+    divs = soup.find(class_=main_tag).find_all('div')
+    for i, div in enumerate(divs):
+        if contains_class(div, team_tag):
+            team_name = extract_text_bs4(div)
+        if contains_class(div, player_tag):
+            assert team_name
+            record = {
+                'year': year,
+                'league_id': league_id,
+                'team_name': team_name,
+                'player_name': extract_text_bs4(div)
+            }
+            cells = divs[i + 1].find('table').find_all('td')
+            record.update({
+                'position': cells[0].text.strip(),
+                'birth': cells[2].text.strip(),
+                'prev_team_name': cells[3].text.strip()
+            })
+            records.append(record)
+    return records
+
+
+def test_parse_players_bs4():
+    pages = [(OLD_HTML, 2015, 1), (NEW_HTML, 2017, 1)]
+    rookie_raw_df = pd.read_csv('./data/rookie_raw.csv')
+    # both layouts of the pages, before and after 2017
+    for year in [2016, 2017, YEARS[-1]]:
+        for league_id in LEAGUE_IDS:
+            pages.append((build_rookie_page(rookie_raw_df, year, league_id), year, league_id))
+    for page in pages:
+        records = fetch_rookie.parse_players(*page)
+        assert records == parse_players_bs4(*page), page[1:]
+    assert sum(len(fetch_rookie.parse_players(*page)) for page in pages[2:]) > 0
+
+
+def test_parse_pages():
+    pages = [(OLD_HTML, 2015, 1), ('<html></html>', 2015, 2), (NEW_HTML, 2017, 1)]
+    records_list = fetch_rookie.parse_pages(pages)
+    assert [None if records is None else len(records) for records in records_list] == [3, None, 1]
+
+
+def test_fetch_partitions(stub_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(fetch_rookie, 'BASE_URL', stub_server.url)
+    monkeypatch.setattr(fetch_rookie, 'LEAGUE_IDS', [1, 2])
+    pages = {'/2016_j_newcomers.php': OLD_HTML, '/2016_j2_newcomers.php': NEW_HTML}
+    for path, html in pages.items():
+        stub_server.routes[path] = lambda r, html=html: (200, {'Content-Type': 'text/html; charset=utf-8'}, html)
+
+    table = PartitionedTable(str(tmp_path), fetch_rookie.UNIT_COLUMNS)
+    with Fetcher(rate=100, burst=10, retries=0) as fetcher:
+        failed_units = fetch_rookie.fetch_partitions(fetcher, table, [2016, 2017], processes=2)
+    assert failed_units == [(2017, 1), (2017, 2)]
+    rookie_df = table.read_all()
+    assert rookie_df['player_name'].tolist() == ['茂木 駿佑', '西村 拓真', '鈴木 優磨', '菅 大輝']
+    assert rookie_df['league_id'].tolist() == [1, 1, 1, 2]
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from mydash.scripts import fetch_stats
+from mydash.utils.fetch import Fetcher
+from mydash.utils.partition import PartitionedTable
+
+STATS_HTML = '''
+<table>
+<tr><th>No</th><th>選手名</th><th>出場</th><th>時間</th><th>得点</th></tr>
+<tr><td>1</td><td> {name} </td><td>3</td><td>120</td><td>1</td></tr>
+</table>
+<table><tr><td>other</td></tr></table>
+'''
+
+
+def test_parse_stats():
+    html = '''
+    <html><head><meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS"></head><body>
+    <table><thead><tr><th>No</th><th>選手名</th><th>出場</th><th>時間</th><th>得点</th></tr></thead>
+    <tbody>
+    <tr><td>1</td><td><a href="#">
+      六反　勇治
+    </a></td><td>15</td><td>1,350</td><td>0</td></tr>
+    <tr><td>2</td><td>鎌田  次郎</td><td>11</td><td>972</td><td>1</td></tr>
+    </tbody></table>
+    <table><tr><td><table><tr><td>other</td></tr></table></td></tr></table>
+    </body></html>
+    '''
+    for content, encoding in [(html, None), (html.encode('shift_jis'), None), (html.encode('shift_jis'), 'cp932')]:
+        stats = fetch_stats.parse_stats(content, encoding)
+        assert stats['player_name'].tolist() == ['六反　勇治', '鎌田 次郎']
+        assert stats['minutes'].tolist() == [1350, 972]
+        assert stats['minutes'].dtype == 'int64'
+        assert stats['goals'].tolist() == [0, 1]
+
+    header = '<tr><th>No</th><th>選手名</th><th>出場</th><th>時間</th><th>得点</th></tr>'
+    other = '<table><tr><td>other</td></tr></table>'
+    assert fetch_stats.parse_stats(f'<table>{header}</table>{other}')['apps'].tolist() == []
+    for content in ['<html><body>no table</body></html>', f'<table>{header}</table>',
+                    f'<table>{header}</table>{other * 2}']:
+        with pytest.raises(ValueError, match='tables'):
+            fetch_stats.parse_stats(content)
+    assert fetch_stats.count_tables(b'<TABLE><tr><td><table></table></td></tr></TABLE><table></table>') == 2
+    assert fetch_stats.slice_first_table(b'<p><TABLE><tr><td><table></table></td></tr></TABLE></p>') == \
+        b'<TABLE><tr><td><table></table></td></tr></TABLE>'
+
+
+def test_parse_stats_ragged_row():
+    other = '<table><tr><td>other</td></tr></table>'
+    header = '<tr><th>No</th><th>選手名</th><th>出場</th><th>時間</th><th>得点</th></tr>'
+    rows = ['<tr><td>1</td><td>六反 勇治</td><td>15</td><td>1,350</td><td>0</td></tr>',
+            '<tr><td>2</td><td>鎌田 次郎</td><td>11</td><td>972</td></tr>']
+    for table in [f'<table>{header}{"".join(rows)}</table>', f'<table>{"".join(rows)}</table>',
+                  f'<table>{header}{"".join(rows[::-1])}</table>']:
+        with pytest.raises(ValueError, match='cells'):
+            fetch_stats.parse_stats(table + other)
+    with pytest.raises(ValueError, match='columns'):
+        fetch_stats.parse_stats('<table><tr><th>No</th></tr><tr><td>1</td></tr></table>' + other)
+
+
+def setup_stub(stub_server, monkeypatch, failing_team_ids=()):
+    monkeypatch.setattr(fetch_stats, 'BASE_URL', stub_server.url)
+    monkeypatch.setattr(fetch_stats, 'LEAGUE_IDS', [1, 2])
+    monkeypatch.setattr(fetch_stats, 'LAST_YEAR', 2021)
+
+    def competitions(r):
+        query = dict(kv.split('=') for kv in r.body.split('&'))
+        comp_id = int(query['competition_year']) % 100 * 100 + int(query['competition_frame_id']) * 10
+        items = [{'selectValue': str(comp_id), 'displayName': f'J{query["competition_frame_id"]}'}]
+        return 200, {}, json.dumps({'competitionList': items})
+
+    def teams(r):
+        comp_id = int(r.body.split('=')[1])
+        items = [{'selectValue': str(comp_id + i), 'displayName': f'team{comp_id + i}'} for i in range(2)]
+        return 200, {}, json.dumps({'teamList': items})
+
+    def stats(r):
+        team_id = r.path.split('team_id=')[1]
+        if int(team_id) in failing_team_ids:
+            return 404, {}, 'not found'
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, STATS_HTML.format(name=f'player{team_id}')
+
+    stub_server.routes['/createCompetitions'] = competitions
+    stub_server.routes['/createTeams'] = teams
+    stub_server.routes['/search'] = stats
+
+
+def count_stats_requests(stub_server):
+    return sum(path.startswith('/search') for _, path in stub_server.requests)
+
+
+def test_fetch_partitions(stub_server, monkeypatch, tmp_path):
+    setup_stub(stub_server, monkeypatch, failing_team_ids=[2011])
+    table = PartitionedTable(str(tmp_path), fetch_stats.UNIT_COLUMNS)
+    with Fetcher(rate=100, burst=10, max_workers=4, retries=0) as fetcher:
+        failed_units = fetch_stats.fetch_partitions(fetcher, table, [2020, 2021])
+    assert failed_units == [(2020, 2010, 2011)]
+    assert count_stats_requests(stub_server) == 8
+
+    stats_df = table.read_all()
+    assert stats_df['player_name'].tolist() == ['player2010', 'player2020', 'player2021',
+                                                'player2110', 'player2111', 'player2120', 'player2121']
+    assert stats_df.iloc[0].to_dict() == {'year': 2020, 'league_id': 1, 'comp_id': 2010, 'team_id': 2010,
+                                          'team_name': 'team2010', 'player_name': 'player2010', 'apps': 3,
+                                          'minutes': 120, 'goals': 1}
+
+    # resume fetches the failed unit and the current season only
+    setup_stub(stub_server, monkeypatch)
+    with Fetcher(rate=100, burst=10, max_workers=4, retries=0) as fetcher:
+        assert fetch_stats.fetch_partitions(fetcher, table, [2020, 2021], resume=True) == []
+    assert count_stats_requests(stub_server) == 8 + 1 + 4
+    assert table.read(2020)['player_name'].tolist() == ['player2010', 'player2011', 'player2020', 'player2021']
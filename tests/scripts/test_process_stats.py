@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from mydash.scripts.process_stats import process_stats, process_stats_chunked, write_stats_chunked
+
+
+def build_dfs():
+    rookie_df = pd.DataFrame({
+        'player_id': [1, 2, 3],
+        'player_name': ['山田太郎', '佐藤次郎', '佐藤次郎'],
+        'year': [2015, 2015, 2019],
+    })
+    stats_df = pd.DataFrame({
+        'year': [2015, 2015, 2015, 2016, 2016, 2019, 2019, 2020],
+        'league_id': [1, 1, 1, 2, 2, 1, 1, 1],
+        'team_name': ['仙台', '仙台', '鹿島', 'Ｃ大阪', 'Ｃ大阪', '鹿島', '鹿島', '鹿島'],
+        'player_name': ['山田　太郎', '山田太郎', '鈴木三郎', '山田太郎', '佐藤次郎', '佐藤次郎', '佐藤次郎', '佐藤次郎'],
+        'apps': [1, 2, 3, 4, 5, 6, 7, 8],
+        'minutes': [10, 20, 30, 40, 50, 60, 70, 80],
+        'goals': [0, 1, 0, 1, 0, 1, 0, 1],
+    })
+    drop_df = pd.DataFrame({'player_name': ['佐藤次郎'], 'year': [2020], 'team_name': ['鹿島']})
+    return stats_df, rookie_df, drop_df
+
+
+def test_process_stats():
+    stats_df, rookie_df, drop_df = build_dfs()
+    p_stats_df = process_stats(stats_df, rookie_df, drop_df)
+    assert p_stats_df[['year', 'team_name', 'player_id', 'apps']].values.tolist() == [
+        [2015, '仙台', 1, 3],  # separated stats are merged
+        [2016, 'C大阪', 2, 5],  # homonyms are assigned to the latest rookie joined in or before the year
+        [2016, 'C大阪', 1, 4],
+        [2019, '鹿島', 3, 13],
+    ]
+
+
+def split_chunks(df, chunksize):
+    return [df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize)]
+
+
+def test_process_stats_chunked(tmp_path):
+    stats_df, rookie_df, drop_df = build_dfs()
+    expected_df = process_stats(stats_df, rookie_df, drop_df.copy())
+    for chunksize in [1, 2, 3, 5, 100]:
+        p_stats_dfs = list(process_stats_chunked(split_chunks(stats_df, chunksize), rookie_df, drop_df))
+        assert pd.concat(p_stats_dfs, ignore_index=True).equals(expected_df)
+        # stats of a year are yielded once a later year is read, not retained until the end
+        years = [df['year'].unique().tolist() for df in p_stats_dfs]
+        assert sum(years, []) == [2015, 2016, 2019]
+        if chunksize == 1:
+            assert years == [[2015], [2016], [2019]]
+
+        path = tmp_path / f'stats_{chunksize}.csv'
+        assert write_stats_chunked(split_chunks(stats_df, chunksize), rookie_df, drop_df, path) == len(expected_df)
+        assert pd.read_csv(path).equals(expected_df)
+
+    path = tmp_path / 'stats_empty.csv'
+    assert write_stats_chunked([], rookie_df, drop_df.iloc[:0], path) == 0
+    assert pd.read_csv(path).columns.tolist() == expected_df.columns.tolist()
+
+    with pytest.raises(ValueError):
+        list(process_stats_chunked(split_chunks(stats_df.iloc[::-1], 3), rookie_df, drop_df))
@@ -0,0 +1,51 @@
+import contextvars
+import json
+import shutil
+import warnings
+
+import dash
+import pytest
+
+from tests.figures.test_clientside import call_clientside
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', FutureWarning)
+    import app
+
+
+def run_callback(func, *args):
+    def run():
+        dash._callback_context.context_value.set(dash._utils.AttributeDict(triggered_inputs=[]))
+        return func(*args)
+
+    return contextvars.copy_context().run(run)
+
+
+def test_initial_state():
+    state = app.initial_state
+    handle = run_callback(app.update_filtered_rookie_handle, None, None, None, None, None,
+                          app.default_joined_year_range, None, None)
+    assert state['filtered-rookie-handle']['data'] == handle
+    assert 'rows' not in handle and len(json.dumps(handle)) < 4096
+
+    table_records, page_count = app.update_player_table(handle, 0, app.table_page_size)
+    assert state['player-table'] == {'data': table_records, 'page_count': page_count}
+    assert state['play-time-plot']['figure'] == app.update_play_time_plot(handle, table_records)
+    histogram, histogram_config = app.update_play_time_histogram(handle, None)
+    assert state['play-time-histogram']['figure'] == histogram
+    assert state['histogram-config-json']['data'] == histogram_config
+
+    # callbacks are not fired on page load
+    dependencies = app.server.test_client().get('/_dash-dependencies').get_json()
+    assert all(x['prevent_initial_call'] for x in dependencies)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_initial_player_count_plot():
+    handle = app.initial_state['filtered-rookie-handle']['data']
+    fig = call_clientside('updatePlayerCountPlot', handle, app.count_plot_options[0]['value'],
+                          app.player_count_templates)
+    expected = app.initial_state['player-count-plot']['figure']
+    assert [(x['name'], x['x'], x['y']) for x in fig['data']] == \
+        [(x['name'], x['x'], x['y']) for x in expected['data']]
+    assert fig['layout']['title'] == expected['layout']['title']
@@ -1,4 +1,6 @@
-from mydash.utils.canonicalize import canonicalize_team, canonicalize_player
+import pandas as pd
+
+from mydash.utils.canonicalize import canonicalize_team, canonicalize_player, canonicalize_column, CanonicalMemo
 
 
 def test_canonicalize_team():
@@ -10,3 +12,19 @@ def test_canonicalize_team():
 def test_canonicalize_player():
     assert canonicalize_player('川崎裕大') == '川﨑裕大'
     assert canonicalize_player('ランダム') == 'ランダム'
+
+
+def test_canonicalize_column(tmp_path):
+    series = pd.Series(['川崎　裕大', ' 湘南ユース', '川崎　裕大', None], index=[3, 2, 1, 0])
+    memo = CanonicalMemo(str(tmp_path / 'memo.json'))
+    player = canonicalize_column(series, 'player', memo)
+    assert player.tolist()[:3] == ['川﨑裕大', '湘南ユース', '川﨑裕大'] and pd.isna(player[0])
+    assert list(player.index) == [3, 2, 1, 0]
+    assert canonicalize_column(series.dropna(), 'team', memo).tolist() == ['川崎 裕大', '湘南U-18', '川崎 裕大']
+    memo.save()
+
+    memo = CanonicalMemo(str(tmp_path / 'memo.json'))
+    assert memo.values['player'] == {'川崎　裕大': '川﨑裕大', ' 湘南ユース': '湘南ユース'}
+    memo.version = 'old'
+    memo.save()
+    assert CanonicalMemo(str(tmp_path / 'memo.json')).values['player'] == dict()
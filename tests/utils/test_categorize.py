@@ -1,4 +1,4 @@
-from mydash.utils.categorize import categorize_team, TeamCategory
+from mydash.utils.categorize import categorize_team, TeamCategory, SuffixTrie
 
 
 def test_canonicalize_team():
@@ -7,3 +7,12 @@ def test_canonicalize_team():
     assert categorize_team('湘南ユース') == TeamCategory.YOUTH
     assert categorize_team('星槎国際高湘南') == TeamCategory.HIGH
     assert categorize_team('ランダム') == TeamCategory.OTHER
+
+
+def test_suffix_trie():
+    trie = SuffixTrie({'高校': 'HIGH', '大学': 'UNIV', '学': 'OTHER', '大': 'UNIV'})
+    assert trie.match('神奈川大学') == 'UNIV'  # '大学' comes before '学'
+    assert trie.match('付属中学') == 'OTHER'
+    assert trie.match('神奈川大') == 'UNIV'
+    assert trie.match('ユース') is None
+    assert trie.match('', default='NONE') == 'NONE'
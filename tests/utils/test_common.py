@@ -1,4 +1,4 @@
-from mydash.utils.common import clean_name, clean_text, build_url
+from mydash.utils.common import clean_name, clean_text, build_url, normalize_search_text
 
 
 def test_clean_name():
@@ -11,6 +11,15 @@ def test_clean_text():
     assert clean_text('山形ユース') == '山形ユース'
 
 
+def test_normalize_search_text():
+    assert normalize_search_text('  名古屋U-18（2018プロ契約） ') == '名古屋u18'
+    assert normalize_search_text('Ｃ大阪 Ｕ１８') == 'c大阪u18'
+    assert normalize_search_text('ﾕｰｽ') == normalize_search_text('ゆーす') == 'ユース'
+    assert normalize_search_text('明治大学') == normalize_search_text('明治大') == '明治大'
+    assert normalize_search_text('市立船橋高等学校') == normalize_search_text('市立船橋高校') == '市立船橋高'
+    assert normalize_search_text('流通経済大学付属柏高校') == '流通経済大付属柏高'
+
+
 def test_build_url():
     url = 'https://google.com'
     query = {'foo': 1, 'bar': 2}
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from mydash.utils.cube import StatsCube, load_stats_cube
+from mydash.utils.df import filter_rookie_df, get_avg_stats_df
+
+
+def build_dfs():
+    rookie_df = pd.DataFrame({
+        'player_id': [1, 2, 3, 4],
+        'joined_year': [2019, 2019, 2020, 2021],
+        'joined_league_id': [1, 2, 1, 3],
+        'position': ['DF', 'MF', 'DF', 'FW'],
+        'prev_team_category': ['UNIV', 'HIGH', 'YOUTH', 'UNIV'],
+    })
+    rookie_df['cur_rookie_year'] = 2021 - rookie_df['joined_year'] + 1
+    stats_df = pd.DataFrame({
+        'player_id': [1, 1, 1, 2, 2, 3, 3, 4],
+        'year': [2019, 2020, 2021, 2019, 2020, 2019, 2020, 2021],
+        'league_id': [1, 1, 2, 2, 3, 1, 1, 3],
+        'minutes': [900, 1800, 300, 90, 0, 45, 450, 2000],
+        'apps': [10, 20, 5, 1, 0, 1, 5, 25],
+        'goals': [1, 2, 0, 0, 0, 0, 1, 3],
+    })
+    stats_df = pd.merge(stats_df, rookie_df[['player_id', 'joined_year']], on='player_id')
+    stats_df['rookie_year'] = stats_df['year'] - stats_df['joined_year'] + 1
+    return rookie_df, stats_df
+
+
+def test_stats_cube(tmp_path):
+    rookie_df, stats_df = build_dfs()
+    path = str(tmp_path / 'stats.cube.npz')
+    StatsCube.build(rookie_df, stats_df).save(path)
+    cube = StatsCube.load(path)
+
+    for kwargs in [
+        dict(),
+        dict(joined_league_ids=[1]),
+        dict(positions=['DF'], joined_year_range=[2020, 2021]),
+        dict(prev_categories=['UNIV', 'HIGH']),
+    ]:
+        f_rookie_df = filter_rookie_df(rookie_df, **kwargs)
+        f_stats_df = pd.merge(stats_df, f_rookie_df['player_id'], on='player_id')
+        expected = get_avg_stats_df(f_rookie_df, f_stats_df)
+        pd.testing.assert_frame_equal(cube.get_avg_stats_df(**kwargs), expected)
+
+
+def test_stats_cube_supports():
+    assert StatsCube.supports(positions=['DF'], joined_year_range=[2015, 2021])
+    assert not StatsCube.supports(joined_teams=['FC東京'])
+    assert not StatsCube.supports(prev_teams=['流通経済大'])
+
+
+def test_load_stats_cube(tmp_path):
+    rookie_df, stats_df = build_dfs()
+    path = str(tmp_path / 'stats.cube.npz')
+    StatsCube.build(rookie_df, stats_df).save(path, data_version='v1')
+    assert load_stats_cube(rookie_df, stats_df, path, data_version='v1').data_version == 'v1'
+
+    # stale cube, e.g. the stats are regenerated without the cube
+    stale_stats_df = stats_df.assign(minutes=stats_df['minutes'] * 2)
+    cube = load_stats_cube(rookie_df, stale_stats_df, path, data_version='v2')
+    assert cube.data_version == 'v2'
+    f_stats_df = pd.merge(stale_stats_df, rookie_df['player_id'], on='player_id')
+    pd.testing.assert_frame_equal(cube.get_avg_stats_df(), get_avg_stats_df(rookie_df, f_stats_df))
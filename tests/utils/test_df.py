@@ -0,0 +1,36 @@
+import pandas as pd
+
+from mydash.utils.df import get_avg_stats_df, get_table_page
+
+
+def test_get_avg_stats_df():
+    rookie_df = pd.DataFrame({'cur_rookie_year': [1, 2, 2, 9]})
+    stats_df = pd.DataFrame({
+        'rookie_year': [0, 1, 1, 1, 2, 2, 9],
+        'league_id': [1, 1, 2, 1, 1, 3, 2],
+        'minutes': [90, 900, 400, 100, 600, 0, 1000],
+        'apps': [1, 10, 5, 1, 7, 0, 12],
+        'goals': [0, 1, 0, 0, 2, 0, 3],
+    })
+    avg_stats_df = get_avg_stats_df(rookie_df, stats_df, stats_cols=['minutes', 'goals'])
+    assert list(avg_stats_df.columns) == ['rookie_year', 'league_id', 'minutes', 'goals', 'player_count']
+    assert avg_stats_df[['rookie_year', 'league_id', 'player_count']].values.tolist() == [
+        [1, 1, 4], [1, 2, 4], [2, 1, 3], [2, 3, 3], [9, 2, 1]
+    ]
+    assert avg_stats_df['minutes'].tolist() == [250.0, 100.0, 200.0, 0.0, 1000.0]
+    assert avg_stats_df['goals'].tolist() == [0.25, 0.0, 2 / 3, 0.0, 3.0]
+
+
+def test_get_avg_stats_df_empty():
+    rookie_df = pd.DataFrame({'cur_rookie_year': pd.Series([], dtype=int)})
+    stats_df = pd.DataFrame({col: pd.Series([], dtype=int)
+                             for col in ['rookie_year', 'league_id', 'minutes', 'apps', 'goals']})
+    assert len(get_avg_stats_df(rookie_df, stats_df)) == 0
+
+
+def test_get_table_page():
+    df = pd.DataFrame({'player_id': [10, 11, 12, 13], 'player_name': ['A', 'B', 'C', 'D'], 'position': 'DF'})
+    records, page_count = get_table_page(df, [3, 1, 0], 1, 2, ['player_id', 'player_name'])
+    assert records == [{'player_id': 10, 'player_name': 'A'}] and type(records[0]['player_id']) is int
+    assert page_count == 2
+    assert get_table_page(df, [], 0, 2, ['player_id']) == ([], 0)
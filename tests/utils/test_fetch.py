@@ -0,0 +1,55 @@
+import time
+
+import pytest
+import requests
+
+from mydash.utils.fetch import Fetcher, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # 2 tokens at once, then 4 tokens at 20/s
+    assert time.monotonic() - start >= 0.19
+
+
+def test_fetcher_get_and_post(stub_server):
+    stub_server.routes['/get'] = lambda r: (200, {}, 'hello')
+    stub_server.routes['/post'] = lambda r: (200, {'Content-Type': 'application/json'}, f'{{"body": "{r.body}"}}')
+    with Fetcher(rate=100, burst=10, max_workers=2, backoff=0) as fetcher:
+        assert fetcher.get(f'{stub_server.url}/get').text == 'hello'
+        assert fetcher.post(f'{stub_server.url}/post', {'a': 1}).json() == {'body': 'a=1'}
+        with pytest.raises(requests.HTTPError):
+            fetcher.get(f'{stub_server.url}/missing')
+
+
+def test_fetcher_retry(stub_server):
+    calls = []
+
+    def flaky(r):
+        calls.append(r.path)
+        return (503, {}, 'busy') if len(calls) < 3 else (200, {}, 'ok')
+
+    stub_server.routes['/flaky'] = flaky
+    with Fetcher(rate=100, burst=10, retries=3, backoff=0) as fetcher:
+        assert fetcher.get(f'{stub_server.url}/flaky').text == 'ok'
+    assert len(calls) == 3
+
+    calls.clear()
+    with Fetcher(rate=100, burst=10, retries=1, backoff=0) as fetcher:
+        with pytest.raises(requests.HTTPError):
+            fetcher.get(f'{stub_server.url}/flaky')
+    assert len(calls) == 2
+
+
+def test_fetcher_map(stub_server):
+    stub_server.routes['/echo'] = lambda r: (200, {}, r.path.split('=')[1])
+    with Fetcher(rate=40, burst=1, max_workers=4) as fetcher:
+        start = time.monotonic()
+        texts = fetcher.map(lambda i: fetcher.get(f'{stub_server.url}/echo?i={i}').text, range(9))
+        elapsed = time.monotonic() - start
+    assert texts == [str(i) for i in range(9)]
+    assert elapsed >= 8 / 40 * 0.9  # rate limited per host
+    assert len(stub_server.connections) <= 4  # connections are kept alive in each worker
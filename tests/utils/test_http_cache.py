@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from mydash.utils.fetch import Fetcher
+from mydash.utils.http_cache import ResponseCache, build_cache_key
+
+
+def test_build_cache_key():
+    assert build_cache_key('get', 'http://a/b') == build_cache_key('GET', 'http://a/b')
+    assert build_cache_key('POST', 'http://a', {'x': 1, 'y': 2}) == build_cache_key('POST', 'http://a', {'y': 2, 'x': 1})
+    assert build_cache_key('POST', 'http://a', {'x': 1}) != build_cache_key('POST', 'http://a', {'x': 2})
+
+
+def test_response_cache(stub_server, tmp_path):
+    calls = []
+
+    def page(r):
+        calls.append(r.headers.get('If-None-Match'))
+        if r.headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, ''
+        return 200, {'ETag': '"v1"', 'Content-Type': 'text/html; charset=utf-8'}, 'ページ'
+
+    stub_server.routes['/page'] = page
+    url = f'{stub_server.url}/page'
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    with Fetcher(rate=100, burst=10, cache=cache) as fetcher:
+        assert fetcher.get(url).text == 'ページ'
+        assert fetcher.get(url).text == 'ページ'  # fresh
+        assert calls == [None]
+
+        cache.ttl = 0  # stale, revalidated by ETag
+        assert fetcher.get(url).text == 'ページ'
+        assert calls == [None, '"v1"']
+        assert fetcher.get(url, immutable=True).text == 'ページ'
+        assert len(calls) == 2
+
+    offline_cache = ResponseCache(str(tmp_path), ttl=0, offline=True)
+    with Fetcher(rate=100, burst=10, cache=offline_cache) as fetcher:
+        response = fetcher.get(url)
+        assert response.text == 'ページ' and response.headers['ETag'] == '"v1"'
+        with pytest.raises(FileNotFoundError):
+            fetcher.post(url, {'a': 1})
+    assert len(calls) == 2
+
+
+def test_response_cache_post(stub_server, tmp_path):
+    stub_server.routes['/post'] = lambda r: (200, {'Content-Type': 'application/json'}, f'{{"t": {time.time()}}}')
+    url = f'{stub_server.url}/post'
+    with Fetcher(rate=100, burst=10, cache=ResponseCache(str(tmp_path))) as fetcher:
+        t1 = fetcher.post(url, {'id': 1}).json()
+        assert fetcher.post(url, {'id': 1}).json() == t1
+        assert fetcher.post(url, {'id': 2}).json() != t1
+    assert len(stub_server.requests) == 2
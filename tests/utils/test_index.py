@@ -0,0 +1,49 @@
+import pandas as pd
+
+from mydash.utils.df import filter_rookie_df
+from mydash.utils.index import RookieIndex, TeamNameIndex
+
+
+def build_rookie_df():
+    return pd.DataFrame({
+        'joined_team_name': ['FC東京', 'FC東京', '川崎F', '川崎F', '鹿島', '鹿島', 'FC東京', '川崎F', '鹿島'],
+        'prev_team_name': ['A高', 'B大', 'C大', 'A高', '鹿島ユース', 'B大', 'C大', 'D大', 'A高'],
+        'joined_league_id': [1, 1, 2, 2, 3, 3, 1, 2, 3],
+        'position': ['GK', 'DF', 'MF', 'FW', 'DF', 'MF', 'FW', 'GK', 'DF'],
+        'prev_team_category': ['HIGH', 'UNIV', 'UNIV', 'HIGH', 'YOUTH', 'UNIV', 'UNIV', 'UNIV', 'HIGH'],
+        'joined_year': [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2015, 2016],
+    })
+
+
+def test_rookie_index():
+    rookie_df = build_rookie_df()
+    index = RookieIndex(rookie_df)
+    for kwargs in [
+        dict(),
+        dict(joined_teams=['FC東京', '鹿島']),
+        dict(prev_teams=['A高'], joined_league_ids=[1, 3]),
+        dict(positions=['DF', 'MF'], prev_categories=['UNIV']),
+        dict(joined_year_range=[2016, 2019], positions=['DF']),
+        dict(joined_teams=['unknown']),
+    ]:
+        expected = list(filter_rookie_df(rookie_df, **kwargs).index)
+        assert list(index.filter_rows(**kwargs)) == expected
+
+
+def test_team_name_index():
+    index = TeamNameIndex(['B大', 'A高', 'A高', 'C大', 'A大', '大宮U18', None])
+    assert len(index) == 5
+    assert index.search('') == ['A高', 'A大', 'B大', 'C大', '大宮U18']  # by the number of rookies
+    assert index.search('', limit=2) == ['A高', 'A大']
+    assert index.search('大') == ['大宮U18', 'A大', 'B大', 'C大']  # prefix matches first
+    assert index.search('ａ') == ['A高', 'A大']
+    assert index.search('u-18') == ['大宮U18']
+    assert index.search('大宮ユース') == ['大宮U18']  # alias
+    assert index.search('D大') == index.search('zzz') == []
+
+
+def test_team_name_index_school_name():
+    index = TeamNameIndex(['明治大', '明治大', '市立船橋高', '明秀日立高'])
+    assert index.search('明治大学') == index.search('明治大') == ['明治大']  # full names of schools
+    assert index.search('市立船橋高等学校') == index.search('市立船橋高校') == ['市立船橋高']
+    assert index.search('明') == ['明治大', '明秀日立高']
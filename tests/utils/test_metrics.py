@@ -0,0 +1,75 @@
+import dash
+from dash import dcc, html, Input, Output
+from prometheus_client import REGISTRY
+
+from mydash.utils.metrics import instrument_app, phase, get_callback_name
+
+
+def build_app():
+    app = dash.Dash(__name__)
+    instrument_app(app)
+    app.layout = html.Div([dcc.Input(id='metrics-input'), html.Div(id='metrics-output'),
+                           html.Div(id='metrics-length')])
+
+    @app.callback(
+        Output('metrics-output', 'children'),
+        Output('metrics-length', 'children'),
+        Input('metrics-input', 'value')
+    )
+    def update_output(value):
+        with phase('filter'):
+            value = value.upper()
+        return value, len(value)
+
+    return app, update_output
+
+
+def get_sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_get_callback_name():
+    assert get_callback_name('a.data') == 'a'
+    assert get_callback_name('..a.figure...b.data..') == 'a+b'
+
+
+def test_instrument_app():
+    app, update_output = build_app()
+    assert update_output('a') == ('A', 1)  # callbacks are kept as they are
+
+    name = 'metrics-output+metrics-length'
+    count = get_sample('mydash_callback_seconds_count', callback=name)
+    filter_count = get_sample('mydash_callback_phase_seconds_count', callback=name, phase='filter')
+    serialize_count = get_sample('mydash_callback_phase_seconds_count', callback=name, phase='serialize')
+    client = app.server.test_client()
+    response = client.post('/_dash-update-component', json={
+        'output': '..metrics-output.children...metrics-length.children..',
+        'outputs': [{'id': 'metrics-output', 'property': 'children'},
+                    {'id': 'metrics-length', 'property': 'children'}],
+        'inputs': [{'id': 'metrics-input', 'property': 'value', 'value': 'abc'}],
+        'changedPropIds': ['metrics-input.value'],
+        'state': []
+    })
+    assert response.status_code == 200
+    assert response.get_json()['response'] == {'metrics-output': {'children': 'ABC'},
+                                               'metrics-length': {'children': 3}}
+
+    assert get_sample('mydash_callback_seconds_count', callback=name) == count + 1
+    assert get_sample('mydash_callback_phase_seconds_count', callback=name, phase='filter') == filter_count + 1
+    assert get_sample('mydash_callback_phase_seconds_count', callback=name, phase='serialize') == serialize_count + 1
+    assert get_sample('mydash_callback_requests_total', callback=name, status='200') >= 1
+    assert get_sample('mydash_callback_response_bytes_sum', callback=name) >= len(response.data)
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert f'mydash_callback_seconds_count{{callback="{name}"}}' in response.get_data(as_text=True)
+
+
+def test_instrument_app_unknown_callback():
+    app, _ = build_app()
+    client = app.server.test_client()
+    count = get_sample('mydash_callback_requests_total', callback='unknown', status='500')
+    for output in ['../../etc/x.children', ['a.b']]:
+        client.post('/_dash-update-component', json={'output': output, 'outputs': [], 'inputs': [], 'state': []})
+    assert get_sample('mydash_callback_requests_total', callback='unknown', status='500') == count + 2
+    assert '/etc/x' not in client.get('/metrics').get_data(as_text=True)
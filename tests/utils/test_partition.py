@@ -0,0 +1,37 @@
+import pandas as pd
+
+from mydash.utils.partition import PartitionCache, PartitionedTable, hash_df
+
+
+def test_partitioned_table(tmp_path):
+    table = PartitionedTable(str(tmp_path), ['year', 'team_id'])
+    table.write_units(2020, {
+        (2020, 2): pd.DataFrame({'year': [2020], 'team_id': [2], 'v': ['b']}),
+        (2020, 1): pd.DataFrame({'year': [2020, 2020], 'team_id': [1, 1], 'v': ['a', 'a']}),
+    })
+    table.write_units(2021, {(2021, 1): pd.DataFrame({'year': [2021], 'team_id': [1], 'v': ['c']})})
+    assert table.years() == [2020, 2021]
+    assert table.read(2020)['v'].tolist() == ['a', 'a', 'b']
+
+    # units are replaced, and the manifest is persisted
+    table = PartitionedTable(str(tmp_path), ['year', 'team_id'])
+    assert table.is_complete((2020, 1)) and not table.is_complete((2020, 3))
+    table.write_units(2020, {(2020, 1): pd.DataFrame({'year': [2020], 'team_id': [1], 'v': ['x']})})
+    assert table.read_all()['v'].tolist() == ['x', 'b', 'c']
+
+
+def test_partition_cache(tmp_path):
+    cache = PartitionCache(str(tmp_path))
+    calls = []
+
+    def build():
+        calls.append(1)
+        return pd.DataFrame({'a': [1, 2]})
+
+    df = pd.DataFrame({'a': [1, 2]})
+    assert hash_df(df) == hash_df(df.copy()) != hash_df(pd.DataFrame({'a': [1, 3]}))
+    assert cache.get_or_build(2020, hash_df(df), build).equals(df)
+    assert PartitionCache(str(tmp_path)).get_or_build(2020, hash_df(df), build).equals(df)
+    assert len(calls) == 1
+    cache.get_or_build(2020, 'changed', build)
+    assert len(calls) == 2
@@ -0,0 +1,45 @@
+import pytest
+
+from mydash.utils.pipeline import Pipeline, Stage
+
+
+def build_stages(tmp_path):
+    def copy(src, dst):
+        return ['-c', f'import shutil; shutil.copy({str(src)!r}, {str(dst)!r})']
+
+    a, b, c, d = [str(tmp_path / name) for name in 'abcd']
+    return [
+        Stage(name='b', command=copy(a, b), inputs=[a], outputs=[b]),
+        Stage(name='c', command=copy(a, c), inputs=[a], outputs=[c], modules=['mydash.utils.common']),
+        Stage(name='d', command=['-c', f'open({d!r}, "w").write(open({b!r}).read() + open({c!r}).read())'],
+              inputs=[b, c], outputs=[d]),
+    ]
+
+
+def test_pipeline(tmp_path):
+    (tmp_path / 'a').write_text('x')
+    state_path = str(tmp_path / 'state.json')
+    stages = build_stages(tmp_path)
+    assert Pipeline(stages, state_path).dependencies == {'b': set(), 'c': set(), 'd': {'b', 'c'}}
+
+    ran = Pipeline(stages, state_path).run()
+    assert sorted(ran[:2]) == ['b', 'c'] and ran[2] == 'd'
+    assert (tmp_path / 'd').read_text() == 'xx'
+    assert Pipeline(stages, state_path).run() == []
+
+    (tmp_path / 'a').write_text('y')
+    assert sorted(Pipeline(stages, state_path).run(['b', 'c'], dry_run=True)) == ['b', 'c']
+    assert (tmp_path / 'd').read_text() == 'xx'
+    assert len(Pipeline(stages, state_path).run()) == 3
+    assert (tmp_path / 'd').read_text() == 'yy'
+
+    (tmp_path / 'd').unlink()  # missing outputs are rebuilt
+    assert Pipeline(stages, state_path).run() == ['d']
+
+
+def test_pipeline_failure(tmp_path):
+    state_path = str(tmp_path / 'state.json')
+    stages = build_stages(tmp_path)  # input "a" does not exist
+    with pytest.raises(Exception):
+        Pipeline(stages, state_path).run()
+    assert not (tmp_path / 'd').exists()
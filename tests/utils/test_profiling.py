@@ -0,0 +1,91 @@
+import cProfile
+import json
+import os
+import pstats
+
+import dash
+from dash import dcc, html, Input, Output
+
+from mydash.utils.profiling import install_profiler, PROFILE_HEADER, ProfileDumper
+
+CALLBACK_BODY = {
+    'output': 'profiling-output.children',
+    'outputs': {'id': 'profiling-output', 'property': 'children'},
+    'inputs': [{'id': 'profiling-input', 'property': 'value', 'value': 'abc'}],
+    'changedPropIds': ['profiling-input.value'],
+    'state': []
+}
+
+
+def build_app():
+    app = dash.Dash(__name__)
+    app.layout = html.Div([dcc.Input(id='profiling-input'), html.Div(id='profiling-output')])
+
+    @app.callback(Output('profiling-output', 'children'), Input('profiling-input', 'value'))
+    def update_profiling_output(value):
+        return value.upper()
+
+    return app
+
+
+def list_profiles(path):
+    return sorted(x for x in os.listdir(path) if x.endswith('.prof'))
+
+
+def test_install_profiler_disabled(monkeypatch):
+    monkeypatch.delenv('MYDASH_PROFILE_DIR', raising=False)
+    assert install_profiler(build_app().server) is None
+
+
+def test_install_profiler(tmp_path):
+    app = build_app()
+    install_profiler(app.server, path=str(tmp_path), keep=2, token='secret')
+    client = app.server.test_client()
+
+    # not profiled without the header, or with a wrong token
+    assert client.post('/_dash-update-component', json=CALLBACK_BODY).status_code == 200
+    assert client.post('/_dash-update-component', json=CALLBACK_BODY, headers={PROFILE_HEADER: 'x'}).status_code == 200
+    assert list_profiles(tmp_path) == []
+
+    response = client.post('/_dash-update-component', json=CALLBACK_BODY, headers={PROFILE_HEADER: 'secret'})
+    assert response.get_json()['response'] == {'profiling-output': {'children': 'ABC'}}
+    name = response.headers[PROFILE_HEADER]
+    assert list_profiles(tmp_path) == [f'{name}.prof']
+    stats = pstats.Stats(str(tmp_path / f'{name}.prof'))
+    assert any(func_name == 'update_profiling_output' for _, _, func_name in stats.stats)
+    with open(tmp_path / f'{name}.json') as f:
+        meta = json.load(f)
+    assert meta['callback'] == 'profiling-output'
+    assert meta['inputs'] == CALLBACK_BODY['inputs']
+    cumtimes = [x['cumtime'] for x in meta['top_functions']]
+    assert cumtimes and cumtimes == sorted(cumtimes, reverse=True)
+
+    # only the latest profiles are kept
+    for _ in range(2):
+        client.post('/_dash-update-component?profile=secret', json=CALLBACK_BODY)
+    profiles = list_profiles(tmp_path)
+    assert len(profiles) == 2 and f'{name}.prof' not in profiles
+    assert len(os.listdir(tmp_path)) == 4
+
+
+def test_install_profiler_malformed_body(tmp_path):
+    app = build_app()
+    install_profiler(app.server, path=str(tmp_path))
+    client = app.server.test_client()
+    for body in [[1, 2], {**CALLBACK_BODY, 'output': ['profiling-output.children']}, {**CALLBACK_BODY, 'output': 1}]:
+        expected = client.post('/_dash-update-component', json=body).status_code
+        response = client.post('/_dash-update-component', json=body, headers={PROFILE_HEADER: '1'})
+        assert response.status_code == expected != 200
+        with open(tmp_path / f'{response.headers[PROFILE_HEADER]}.json') as f:
+            assert json.load(f)['callback'] == 'unknown'
+
+
+def test_profile_dumper_hostile_output(tmp_path):
+    dumper = ProfileDumper(str(tmp_path / 'profiles'))
+    profile = cProfile.Profile()
+    profile.runcall(sum, [1, 2])
+    for output in ['../../etc/x.children', 'a/b.c', '..' + 'x' * 300 + '.data...y.data..']:
+        name = dumper.dump(profile, {'output': output}, 0.1)
+        assert '/' not in name and '..' not in name and len(name) < 200
+        assert os.path.exists(tmp_path / 'profiles' / f'{name}.prof')
+    assert os.listdir(tmp_path) == ['profiles']
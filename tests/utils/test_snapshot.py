@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mydash.utils.snapshot import write_snapshot, read_snapshot, read_snapshot_meta
+
+
+def test_snapshot(tmp_path):
+    df = pd.DataFrame({
+        'year': [2015, 2016, 2016],
+        'minutes': [0.5, 90.0, 1.5],
+        'player_name': ['ニャン太郎', '鈴木', 'ニャン太郎'],
+    })
+    path = str(tmp_path / 'test.snapshot')
+    write_snapshot(df, path)
+
+    meta = read_snapshot_meta(path)
+    assert meta['length'] == 3
+    assert meta['columns'][2]['categories'] == ['ニャン太郎', '鈴木']
+
+    s_df = read_snapshot(path)
+    pd.testing.assert_frame_equal(s_df, df)
+    assert any(isinstance(b.values, np.memmap) for b in s_df._mgr.blocks)
+
+
+def test_snapshot_nan(tmp_path):
+    df = pd.DataFrame({'prev_team_name': ['A高', np.nan, 'B大', None], 'year': [2015, 2016, 2017, 2018]})
+    path = str(tmp_path / 'test.snapshot')
+    write_snapshot(df, path)
+    assert read_snapshot_meta(path)['columns'][0]['categories'] == ['A高', 'B大']
+
+    s_df = read_snapshot(path)
+    assert s_df['prev_team_name'].tolist()[0::2] == ['A高', 'B大']
+    assert s_df['prev_team_name'].isna().tolist() == [False, True, False, True]
+
+
+def test_snapshot_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_snapshot(str(tmp_path / 'missing.snapshot'))
@@ -0,0 +1,50 @@
+import pytest
+
+from mydash.utils.store import FilterResultStore, normalize_filters, hash_filters, validate_filters, \
+    ROOKIE_FILTER_TYPES
+
+
+def test_normalize_filters():
+    assert normalize_filters(positions=['MF', 'DF'], joined_teams=[], prev_teams=None) == {'positions': ['DF', 'MF']}
+    assert normalize_filters(histogram={'league_id': 1, 'minutes_range': None}) == {'histogram': {'league_id': 1}}
+    assert hash_filters(normalize_filters(positions=['MF', 'DF'])) == hash_filters(normalize_filters(positions=['DF', 'MF']))
+
+
+def test_filter_result_store():
+    calls = []
+
+    def resolver(filters):
+        calls.append(filters)
+        return [filters['n']]
+
+    store = FilterResultStore(resolver, max_size=2)
+    handle = store.put({'n': 1})
+    assert list(store.resolve(handle)) == [1]
+    assert len(calls) == 1
+
+    store.put({'n': 2})
+    store.put({'n': 3})  # evicts n=1
+    assert len(store) == 2
+    assert list(store.resolve(handle)) == [1]  # recomputed from filters in handle
+    assert len(calls) == 4
+
+
+def test_filter_result_store_forged_key():
+    store = FilterResultStore(lambda filters: [filters.get('n', 0)])
+    forged = {'key': hash_filters({}), 'filters': {'n': 99}}
+    assert list(store.resolve(forged)) == [99]
+    assert store.get_key(forged) == hash_filters({'n': 99})
+    assert list(store.resolve(store.put({}))) == [0]  # not poisoned by the forged key
+
+
+def test_validate_filters():
+    validate_filters({'positions': ['DF'], 'histogram': {'league_id': 1, 'minutes_range': [0, 1.5]}},
+                     ROOKIE_FILTER_TYPES)
+    for filters in [{'unknown': [1]}, {'positions': 'DF'}, {'joined_league_ids': ['1']},
+                    {'joined_league_ids': [True]}, {'histogram': {'league_id': 1, 'x': 1}}, ['positions']]:
+        with pytest.raises(ValueError):
+            validate_filters(filters, ROOKIE_FILTER_TYPES)
+
+    store = FilterResultStore(lambda filters: [], filter_types=ROOKIE_FILTER_TYPES)
+    with pytest.raises(ValueError):
+        store.resolve({'key': 'x', 'filters': {'positions': [{'$ne': 1}]}})